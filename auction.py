@@ -1,5 +1,7 @@
 import asyncio
 import json
+import logging
+from collections import deque
 import os
 import re
 import sqlite3
@@ -9,12 +11,22 @@ import random
 from typing import Dict, Any, Optional, Tuple, List
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update, Message, InputMediaVideo
 from telegram.constants import ParseMode
-from telegram.ext import CommandHandler, CallbackQueryHandler, MessageHandler, filters, ContextTypes, ChatMemberHandler, ApplicationBuilder
-
-DB_PATH = "auction_bot_data.json"
+from telegram.error import BadRequest, TelegramError
+from telegram.ext import CommandHandler, CallbackQueryHandler, MessageHandler, filters, ContextTypes, ChatMemberHandler, ApplicationBuilder, CallbackContext
+import gateway
+import metrics
+import models
+import tracing
+import side_effects
+import media
+import sharding
+
+DB_PATH = os.environ.get("AUCTION_DB_PATH") or "auction_bot_data.json"
 USERNAMES_DB_PREFERRED = "/mnt/data/usernames.db"
 DEFAULT_COUNTDOWN = 30
 
+logger = logging.getLogger(__name__)
+
 BOT_NAME = "ᎪᏟᎬᏴᏬᎠᎠᎽ"
 
 START_IMAGE_URL = "https://graph.org/file/5625ef0ddc921f51bdb8f-5f4ada8ed080305cc4.jpg"
@@ -42,6 +54,14 @@ SOLD_VIDEO_IDS = [
     "BAACAgUAAxkBAAIEVmlXjJoRJKNsgARDUZgVVmYaGLPWAAL3HwACpRG5VnvL32nMoX3KOAQ"
 ]
 
+media.register("start_image", "photo", url=START_IMAGE_URL)
+media.register("auction_done", "photo", url=AUCTION_DONE_IMAGE)
+media.register("end_closed", "photo", url=END_CLOSED_IMAGE)
+media.register("new_player", "video", NEW_PLAYER_VIDEO_IDS)
+media.register("unsold", "video", UNSOLD_VIDEO_IDS)
+media.register("bid_confirmed", "video", BID_CONFIRMED_VIDEO_IDS)
+media.register("sold", "video", SOLD_VIDEO_IDS)
+
 def _ensure_json_db():
     global DB_PATH
     dirpath = os.path.dirname(DB_PATH)
@@ -54,7 +74,13 @@ def _ensure_json_db():
         with open(DB_PATH, "w", encoding="utf-8") as f:
             json.dump({}, f)
 
+@metrics.track_io("load_db", "read", lambda: DB_PATH)
+@tracing.traced("load_db", "disk")
 def load_db() -> Dict[str, Any]:
+    data = _read_db()
+    return sharding.attach_shared(data) if sharding.enabled() else data
+
+def _read_db() -> Dict[str, Any]:
     _ensure_json_db()
     try:
         with open(DB_PATH, "r", encoding="utf-8") as f:
@@ -70,8 +96,12 @@ def load_db() -> Dict[str, Any]:
             pass
         return {}
 
+@metrics.track_io("save_db", "write", lambda: DB_PATH)
+@tracing.traced("save_db", "disk")
 def save_db(data: Dict[str, Any]) -> None:
     _ensure_json_db()
+    if sharding.enabled():
+        data = sharding.detach_shared(data)
     tmp = DB_PATH + ".tmp"
     with open(tmp, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
@@ -93,6 +123,7 @@ def _choose_usernames_db_path() -> str:
 
 USERNAMES_DB_PATH = _choose_usernames_db_path()
 
+@tracing.traced()
 def get_session(chat_id: int) -> Dict[str, Any]:
     db = load_db()
     sessions = db.get("auction_sessions", {})
@@ -137,7 +168,11 @@ def get_session(chat_id: int) -> Dict[str, Any]:
         save_db(db)
     return sessions[key]
 
+@tracing.traced()
 def save_session(chat_id: int, session: Dict[str, Any]) -> None:
+    q = auto_queues.get(chat_id)
+    if q and session.get("auto_queue_id") == q.queue_id:
+        session["auto_set_index"] = q.index
     db = load_db()
     sessions = db.get("auction_sessions", {})
     sessions[str(chat_id)] = session
@@ -174,6 +209,7 @@ def start_new_run(chat_id: int, session: Dict[str, Any]) -> str:
     save_session(chat_id, session)
     return run_id
 
+@tracing.traced()
 def get_run(chat_id: int, run_id: str) -> Optional[Dict[str, Any]]:
     db = load_db()
     history = db.get("auction_history", {})
@@ -183,6 +219,7 @@ def get_run(chat_id: int, run_id: str) -> Optional[Dict[str, Any]]:
             return r
     return None
 
+@tracing.traced()
 def save_run(chat_id: int, run: Dict[str, Any]) -> None:
     db = load_db()
     history = db.get("auction_history", {})
@@ -195,10 +232,25 @@ def save_run(chat_id: int, run: Dict[str, Any]) -> None:
     db["auction_history"] = history
     save_db(db)
 
+# chat_id -> (run_id, EventLog) of the run being logged, so a bid appends to
+# the columns in memory instead of decoding them again
+run_event_logs: Dict[int, Tuple[str, models.EventLog]] = {}
+
 def append_run_log(chat_id: int, run_id: str, log: Dict[str, Any]) -> None:
     run = get_run(chat_id, run_id)
     if not run:
         return
+    if log.get("event") in models.EVENT_KINDS:
+        cached = run_event_logs.get(chat_id)
+        if cached and cached[0] == run_id and len(cached[1]) == models.stored_length(run.get("events")):
+            events = cached[1]
+        else:
+            events = models.EventLog.from_dict(run.get("events"))
+            run_event_logs[chat_id] = (run_id, events)
+        if events.append_log(log):
+            run["events"] = events.to_dict()
+            save_run(chat_id, run)
+            return
     run_logs = run.get("logs", [])
     run_logs.append(log)
     run["logs"] = run_logs
@@ -240,6 +292,119 @@ def ensure_usernames_table(conn: sqlite3.Connection):
 
 countdown_tasks: Dict[int, asyncio.Task] = {}
 
+def _player_keys(p: Dict[str, Any]) -> Tuple[str, str]:
+    return str(p.get("user_id") or p.get("player_id") or ""), (p.get("username") or p.get("player_username") or "").lstrip("@").lower()
+
+class AutoQueue:
+    def __init__(self, queue_id: str, players: List[Dict[str, Any]], index: int = 0, run: Optional[Dict[str, Any]] = None, include_unsold: bool = False):
+        self.queue_id = queue_id
+        self.index = index
+        self.pending = deque(players[index:])
+        self.include_unsold = include_unsold
+        self.sold_ids = set()
+        self.sold_names = set()
+        self.unsold_ids = set()
+        self.done_ids = set()
+        self.done_names = set()
+        for s in (run or {}).get("sold_players") or []:
+            self.mark_sold(s)
+        if not include_unsold:
+            for s in (run or {}).get("unsold_players") or []:
+                self.mark_unsold(s)
+
+    def mark_sold(self, p: Dict[str, Any]):
+        pid, uname = _player_keys(p)
+        if pid:
+            self.sold_ids.add(pid)
+        if uname:
+            self.sold_names.add(uname)
+
+    def mark_unsold(self, p: Dict[str, Any]):
+        pid, _ = _player_keys(p)
+        if pid:
+            self.unsold_ids.add(pid)
+
+    def mark_done(self, p: Dict[str, Any]):
+        pid, uname = _player_keys(p)
+        if pid:
+            self.done_ids.add(pid)
+        if uname:
+            self.done_names.add(uname)
+
+    def _blocked(self, p: Dict[str, Any]) -> bool:
+        pid, uname = _player_keys(p)
+        if pid and (pid in self.sold_ids or pid in self.done_ids):
+            return True
+        if uname and (uname in self.sold_names or uname in self.done_names):
+            return True
+        if pid and pid in self.unsold_ids and not self.include_unsold:
+            return True
+        return False
+
+    def next(self) -> Optional[Dict[str, Any]]:
+        while self.pending:
+            p = self.pending.popleft()
+            self.index += 1
+            if p is None or self._blocked(p):
+                continue
+            return p
+        return None
+
+    def peek(self, n: int) -> List[Dict[str, Any]]:
+        out = []
+        for p in self.pending:
+            if len(out) >= n:
+                break
+            if p is not None and not self._blocked(p):
+                out.append(p)
+        return out
+
+    def __len__(self):
+        return len(self.pending)
+
+auto_queues: Dict[int, AutoQueue] = {}
+
+LOOKAHEAD_DEPTH = 3
+prepared_slots: Dict[int, Dict[str, Dict[str, Any]]] = {}
+
+completion_trackers: Dict[int, Dict[str, Any]] = {}
+
+player_tables: Dict[int, Dict[str, Any]] = {}
+
+def _new_auto_queue(chat_id: int, session: Dict[str, Any], players: List[Dict[str, Any]]) -> AutoQueue:
+    queue_id = uuid.uuid4().hex[:12]
+    run_id = session.get("current_run_id")
+    run = get_run(chat_id, run_id) if run_id else None
+    session["auto_set_list"] = players
+    session["auto_set_index"] = 0
+    session["auto_queue_id"] = queue_id
+    q = AutoQueue(queue_id, players, 0, run, include_unsold=bool(session.get("processing_unsold")))
+    auto_queues[chat_id] = q
+    return q
+
+def _get_auto_queue(chat_id: int, session: Dict[str, Any]) -> AutoQueue:
+    q = auto_queues.get(chat_id)
+    queue_id = session.get("auto_queue_id")
+    if q and queue_id and q.queue_id == queue_id:
+        return q
+    run_id = session.get("current_run_id")
+    run = get_run(chat_id, run_id) if run_id else None
+    if not queue_id:
+        queue_id = uuid.uuid4().hex[:12]
+        session["auto_queue_id"] = queue_id
+    q = AutoQueue(queue_id, session.get("auto_set_list") or [], int(session.get("auto_set_index") or 0), run, include_unsold=bool(session.get("processing_unsold")))
+    auto_queues[chat_id] = q
+    return q
+
+COUNTDOWN_MODES = ("messages", "edit")
+COUNTDOWN_EDIT_MARKS = (10, 5, 2)
+COUNTDOWN_MIN_EDIT_GAP = 1.5
+countdown_views: Dict[int, Dict[str, Any]] = {}
+
+BID_CONFIRM_WINDOW = 4
+CARD_LATE_SECONDS = 2
+bid_confirmations: Dict[int, Dict[str, Any]] = {}
+
 async def _send_message(bot, chat_id: int, text: str, reply_markup=None, parse_mode=ParseMode.HTML):
     try:
         return await bot.send_message(chat_id=chat_id, text=text, reply_markup=reply_markup, parse_mode=parse_mode)
@@ -256,6 +421,7 @@ async def _format_player_name_link(player: Dict[str, Any]) -> str:
             return display
     return display
 
+@tracing.traced()
 async def _prefetch_profile_for_player(chat_id: int, context: ContextTypes.DEFAULT_TYPE, player: Dict[str, Any]):
     try:
         if player.get("user_id"):
@@ -294,18 +460,23 @@ async def _prefetch_profile_for_player(chat_id: int, context: ContextTypes.DEFAU
         pass
     return player
 
-async def send_new_player_slot_message(chat_id: int, context: ContextTypes.DEFAULT_TYPE, player: Dict[str, Any], base_price):
-    session = get_session(chat_id)
+@tracing.traced()
+async def _post_pending_slot_card(chat_id: int, context: ContextTypes.DEFAULT_TYPE, caption: str, markup: InlineKeyboardMarkup):
+    sent = None
+    if media.has("new_player"):
+        try:
+            sent = await media.send(context.bot, chat_id, "new_player", caption=caption, parse_mode=ParseMode.HTML, reply_markup=markup)
+        except Exception:
+            sent = await _send_message(context.bot, chat_id, caption, reply_markup=markup)
+    else:
+        sent = await _send_message(context.bot, chat_id, caption, reply_markup=markup)
+    if sent and getattr(sent, "message_id", None):
+        await _pin_quietly(chat_id, context, sent.message_id)
+    return sent
+
+async def _render_pending_slot(pcopy: Dict[str, Any], base_price, budget) -> Dict[str, Any]:
+    pcopy["set_base_price"] = base_price if base_price is not None else pcopy.get("base_price") or budget or 0
     player_key = uuid.uuid4().hex
-    session_pending = session.get("pending_slots", {}) or {}
-    pcopy = dict(player)
-    if pcopy.get("profile_fullname") is None or pcopy.get("profile_username") is None:
-        await _prefetch_profile_for_player(chat_id, context, pcopy)
-    pcopy["set_base_price"] = base_price if base_price is not None else pcopy.get("base_price") or session.get("budget") or 0
-    session_pending[player_key] = pcopy
-    session["pending_slots"] = session_pending
-    session["last_sent_slot_key"] = player_key
-    save_session(chat_id, session)
     name_link = await _format_player_name_link(pcopy)
     profile_username = pcopy.get("profile_username") or pcopy.get("username") or ""
     caption = ("⟦ New Player Slot ⟧\n\n"
@@ -314,31 +485,78 @@ async def send_new_player_slot_message(chat_id: int, context: ContextTypes.DEFAU
                f"Player Type  : {pcopy.get('role') or 'None'}\n"
                f"Base Price   : {pcopy.get('set_base_price')}\n\n"
                "Hey host, please click on the start auction button below to begin this player bidding.")
+    return {"player": pcopy, "player_key": player_key, "caption": caption, "markup": build_start_player_keyboard(player_key), "base_price": base_price}
+
+async def _prepare_pending_slot(chat_id: int, context: ContextTypes.DEFAULT_TYPE, player: Dict[str, Any], base_price, budget) -> Dict[str, Any]:
+    pcopy = dict(player)
+    if pcopy.get("profile_fullname") is None or pcopy.get("profile_username") is None:
+        await _prefetch_profile_for_player(chat_id, context, pcopy)
+    return await _render_pending_slot(pcopy, base_price, budget)
+
+def _auto_base_price(session: Dict[str, Any], player: Dict[str, Any]):
+    return player.get("set_base_price") if player.get("set_base_price") is not None else session.get("budget") or player.get("base_price") or 0
+
+async def _prefetch_upcoming(chat_id: int, context: ContextTypes.DEFAULT_TYPE):
     try:
-        sent = None
-        vid = random.choice(NEW_PLAYER_VIDEO_IDS) if NEW_PLAYER_VIDEO_IDS else None
-        if vid:
-            try:
-                sent = await context.bot.send_video(chat_id=chat_id, video=vid, caption=caption, parse_mode=ParseMode.HTML, reply_markup=build_start_player_keyboard(player_key))
-            except Exception:
-                sent = await _send_message(context.bot, chat_id, caption, reply_markup=build_start_player_keyboard(player_key))
-        else:
-            sent = await _send_message(context.bot, chat_id, caption, reply_markup=build_start_player_keyboard(player_key))
-        try:
-            if sent and getattr(sent, "message_id", None):
-                try:
-                    await context.bot.pin_chat_message(chat_id=chat_id, message_id=sent.message_id, disable_notification=True)
-                except Exception:
-                    pass
-        except Exception:
-            pass
-        return sent
+        session = get_session(chat_id)
+        if not session.get("auto_mode"):
+            return
+        upcoming = _get_auto_queue(chat_id, session).peek(LOOKAHEAD_DEPTH)
+        cache = prepared_slots.setdefault(chat_id, {})
+        wanted = {}
+        for p in upcoming:
+            wanted["|".join(_player_keys(p))] = p
+        for k in [k for k in cache if k not in wanted]:
+            cache.pop(k, None)
+        missing = [(k, p) for k, p in wanted.items() if k not in cache]
+        if not missing:
+            return
+        budget = session.get("budget")
+        results = await asyncio.gather(*(_prepare_pending_slot(chat_id, context, p, _auto_base_price(session, p), budget) for _, p in missing), return_exceptions=True)
+        for (k, _), prepared in zip(missing, results):
+            if isinstance(prepared, dict):
+                cache[k] = prepared
+    except Exception:
+        return
+
+@tracing.traced()
+async def send_new_player_slot_message(chat_id: int, context: ContextTypes.DEFAULT_TYPE, player: Dict[str, Any], base_price):
+    session = get_session(chat_id)
+    prepared = prepared_slots.get(chat_id, {}).pop("|".join(_player_keys(player)), None)
+    if prepared and prepared.get("base_price") != base_price:
+        prepared = await _render_pending_slot(prepared["player"], base_price, session.get("budget"))
+    if not prepared:
+        prepared = await _prepare_pending_slot(chat_id, context, player, base_price, session.get("budget"))
+    pcopy = prepared["player"]
+    player_key = prepared["player_key"]
+    caption = prepared["caption"]
+    session_pending = session.get("pending_slots", {}) or {}
+    session_pending[player_key] = pcopy
+    session["pending_slots"] = session_pending
+    session["last_sent_slot_key"] = player_key
+    save_session(chat_id, session)
+    try:
+        return await side_effects.submit(chat_id, _post_pending_slot_card, chat_id, context, caption, prepared["markup"])
     except Exception:
         try:
-            return await _send_message(context.bot, chat_id, caption, reply_markup=build_start_player_keyboard(player_key))
+            return await _send_message(context.bot, chat_id, caption, reply_markup=prepared["markup"])
         except Exception:
             return None
 
+async def _slot_card_caption(session: Dict[str, Any], player: Dict[str, Any], start_price, footer: Optional[str] = None) -> str:
+    name_link = await _format_player_name_link(player)
+    if footer is None:
+        footer = (f"You have {get_countdown(session)} seconds to place your bid on this player.\n"
+                  f"Send your bid: /bid amount\n")
+    return ("📊 NEW PLAYER FOR AUCTION\n"
+            "━━━━━━━━━━━━━━━━━━━━━\n"
+            f"⭐️ Name.        : {name_link}\n"
+            f"🏏 Role Type : {player.get('role') or 'None'}\n"
+            f"⚡️ Base Price : {start_price} Cr\n"
+            "━━━━━━━━━━━━━━━━━━━━━\n"
+            + footer)
+
+@tracing.traced()
 async def start_player_slot(chat_id: int, context: ContextTypes.DEFAULT_TYPE, player: Dict[str, Any], start_price: float, by_host: bool = False, existing_msg: Optional[Message] = None):
     session = get_session(chat_id)
     if session.get("current_slot"):
@@ -347,66 +565,80 @@ async def start_player_slot(chat_id: int, context: ContextTypes.DEFAULT_TYPE, pl
     pcopy = dict(player)
     if pcopy.get("profile_fullname") is None or pcopy.get("profile_username") is None:
         await _prefetch_profile_for_player(chat_id, context, pcopy)
-    slot = {"player": pcopy, "start_price": start_price, "deadline": deadline, "highest": None, "last_bid": None, "mg_message": None, "started_at": int(time.time()), "announced": {}}
+    slot = {"player": pcopy, "start_price": start_price, "deadline": deadline, "highest": None, "last_bid": None, "mg_message": None, "started_at": int(time.time()), "slot_id": uuid.uuid4().hex[:12], "announced": {}}
     session["current_slot"] = slot
     save_session(chat_id, session)
+    countdown_tasks[chat_id] = asyncio.create_task(slot_countdown(chat_id, context))
     run_id = session.get("current_run_id") or start_new_run(chat_id, session)
     run = get_run(chat_id, run_id)
     if run:
         run["current_slot"] = {"player": pcopy, "start_price": start_price, "deadline": deadline, "highest": None, "started_at": int(time.time())}
         save_run(chat_id, run)
-    name_link = await _format_player_name_link(pcopy)
-    caption = ("📊 NEW PLAYER FOR AUCTION\n"
-               "━━━━━━━━━━━━━━━━━━━━━\n"
-               f"⭐️ Name.        : {name_link}\n"
-               f"🏏 Role Type : {pcopy.get('role') or 'None'}\n"
-               f"⚡️ Base Price : {start_price} Cr\n"
-               "━━━━━━━━━━━━━━━━━━━━━\n"
-               f"You have {get_countdown(session)} seconds to place your bid on this player.\n"
-               f"Send your bid: /bid amount\n")
+    caption = await _slot_card_caption(session, pcopy, start_price)
+    countdown_views[chat_id] = {"key": _slot_key(slot), "media": bool(existing_msg) or media.has("new_player"), "state": ("open", None), "last_edit": 0.0, "task": None, "fallback": False}
+    side_effects.submit(chat_id, _post_slot_card, chat_id, context, _slot_key(slot), caption, existing_msg)
+    if session.get("auto_mode"):
+        asyncio.create_task(_prefetch_upcoming(chat_id, context))
+    return True
+
+def _slot_key(slot: Dict[str, Any]):
+    return slot.get("slot_id") or slot.get("started_at")
+
+def _record_slot_message(chat_id: int, slot_key, message_id: int):
+    session = get_session(chat_id)
+    slot = session.get("current_slot")
+    if not slot or _slot_key(slot) != slot_key:
+        return
+    slot["mg_message"] = f"{chat_id}:{message_id}"
+    # a card that queued behind earlier side effects gets its full bidding window back
+    now = int(time.time())
+    if now - int(slot.get("started_at") or now) >= CARD_LATE_SECONDS:
+        deadline = max(int(slot.get("deadline") or 0), now + get_countdown(session))
+        if deadline != slot.get("deadline"):
+            slot["deadline"] = deadline
+            run = get_run(chat_id, session.get("current_run_id")) if session.get("current_run_id") else None
+            if run and run.get("current_slot"):
+                run["current_slot"]["deadline"] = deadline
+                save_run(chat_id, run)
+    save_session(chat_id, session)
+
+async def _pin_quietly(chat_id: int, context: ContextTypes.DEFAULT_TYPE, message_id: int):
+    try:
+        await context.bot.pin_chat_message(chat_id=chat_id, message_id=message_id, disable_notification=True)
+    except Exception:
+        pass
+
+@tracing.traced()
+async def _post_slot_card(chat_id: int, context: ContextTypes.DEFAULT_TYPE, slot_key, caption: str, existing_msg: Optional[Message] = None):
+    sent = None
     try:
         if existing_msg:
             try:
                 await existing_msg.edit_caption(caption, parse_mode=ParseMode.HTML)
-                try:
-                    await context.bot.pin_chat_message(chat_id=chat_id, message_id=existing_msg.message_id, disable_notification=True)
-                except Exception:
-                    pass
-                session["current_slot"]["mg_message"] = f"{chat_id}:{existing_msg.message_id}"
-                save_session(chat_id, session)
+                sent = existing_msg
             except Exception:
                 sent = await _send_message(context.bot, chat_id, caption, parse_mode=ParseMode.HTML)
-                session["current_slot"]["mg_message"] = f"{chat_id}:{sent.message_id}"
-                save_session(chat_id, session)
+                view = countdown_views.get(chat_id)
+                if view and view.get("key") == slot_key:
+                    view["media"] = False
         else:
-            vid = random.choice(NEW_PLAYER_VIDEO_IDS) if NEW_PLAYER_VIDEO_IDS else None
-            if vid:
-                sent = await context.bot.send_video(chat_id=chat_id, video=vid, caption=caption, parse_mode=ParseMode.HTML)
-                session["current_slot"]["mg_message"] = f"{chat_id}:{sent.message_id}"
-                save_session(chat_id, session)
-                try:
-                    await context.bot.pin_chat_message(chat_id=chat_id, message_id=sent.message_id, disable_notification=True)
-                except Exception:
-                    pass
+            if media.has("new_player"):
+                sent = await media.send(context.bot, chat_id, "new_player", caption=caption, parse_mode=ParseMode.HTML)
             else:
                 sent = await _send_message(context.bot, chat_id, caption, parse_mode=ParseMode.HTML)
-                session["current_slot"]["mg_message"] = f"{chat_id}:{sent.message_id}"
-                save_session(chat_id, session)
-                try:
-                    await context.bot.pin_chat_message(chat_id=chat_id, message_id=sent.message_id, disable_notification=True)
-                except Exception:
-                    pass
     except Exception:
-        sent = await _send_message(context.bot, chat_id, caption)
-        session["current_slot"]["mg_message"] = f"{chat_id}:{sent.message_id}"
-        save_session(chat_id, session)
         try:
-            await context.bot.pin_chat_message(chat_id=chat_id, message_id=sent.message_id, disable_notification=True)
+            sent = await _send_message(context.bot, chat_id, caption)
         except Exception:
-            pass
-    task = asyncio.create_task(slot_countdown(chat_id, context))
-    countdown_tasks[chat_id] = task
-    return True
+            sent = None
+        view = countdown_views.get(chat_id)
+        if view and view.get("key") == slot_key:
+            view["media"] = False
+    if sent is None or not getattr(sent, "message_id", None):
+        return sent
+    _record_slot_message(chat_id, slot_key, sent.message_id)
+    await _pin_quietly(chat_id, context, sent.message_id)
+    return sent
 
 async def start_auction(update: Update, context: ContextTypes.DEFAULT_TYPE):
     msg = update.effective_message
@@ -463,16 +695,14 @@ async def start_auction(update: Update, context: ContextTypes.DEFAULT_TYPE):
         for p in auto_sequence:
             if p.get("set_base_price") is None:
                 p["set_base_price"] = p.get("base_price") or session.get("budget") or 0
-        for p in auto_sequence:
-            await _prefetch_profile_for_player(chat_id, context, p)
         session["auto_mode"] = True
         session["auto_set_number"] = set_arg
-        session["auto_set_list"] = auto_sequence
         session["auto_sequence"] = [str((p.get("user_id") or p.get("username") or "")).strip() for p in auto_sequence]
-        session["auto_set_index"] = 0
         session["active"] = True
         session["processing_unsold"] = False
+        _new_auto_queue(chat_id, session, auto_sequence)
         save_session(chat_id, session)
+        asyncio.create_task(_prefetch_upcoming(chat_id, context))
         announcement = (f"<b>AUCTION SET {set_arg} IS STARTING NOW</b>\n\n"
                         "Captains, steel your nerves — slots will drop one-by-one from the set, randomly. Prepare your bids.\n\n"
                         "The first player will be placed up for auction shortly.")
@@ -484,13 +714,10 @@ async def start_auction(update: Update, context: ContextTypes.DEFAULT_TYPE):
         async def delayed_first_player():
             await asyncio.sleep(2)
             sess = get_session(chat_id)
-            players = sess.get("auto_set_list") or []
-            if not players:
+            player = _get_auto_queue(chat_id, sess).next()
+            if not player:
                 await _send_message(context.bot, chat_id, "No players available in the selected set.")
                 return
-            player = players.pop(0)
-            sess["auto_set_list"] = players
-            save_session(chat_id, sess)
             base_price = player.get("set_base_price") if player.get("set_base_price") is not None else session.get("budget") or player.get("base_price") or 0
             try:
                 await send_new_player_slot_message(chat_id, context, player, base_price)
@@ -534,7 +761,6 @@ async def start_auction(update: Update, context: ContextTypes.DEFAULT_TYPE):
             if unsold_base_price is not None:
                 p["set_base_price"] = unsold_base_price
                 p["base_price"] = unsold_base_price
-            await _prefetch_profile_for_player(chat_id, context, p)
             players.append(p)
 
         unique = []
@@ -548,15 +774,17 @@ async def start_auction(update: Update, context: ContextTypes.DEFAULT_TYPE):
             seen.add(key)
             unique.append(p)
         random.shuffle(unique)
+        if len(unique) > 1:
+            unique[0], unique[1] = unique[1], unique[0]
 
         session["auto_mode"] = True
         session["auto_set_number"] = "unsold"
-        session["auto_set_list"] = unique
         session["auto_sequence"] = [str((p.get("user_id") or p.get("username") or "")).strip() for p in unique]
-        session["auto_set_index"] = 0
         session["active"] = True
         session["processing_unsold"] = True
+        _new_auto_queue(chat_id, session, unique)
         save_session(chat_id, session)
+        asyncio.create_task(_prefetch_upcoming(chat_id, context))
         announcement = ("<b>UNSOLD PLAYERS AUCTION IS STARTING NOW</b>\n\n"
                         "Captains, unsold players from previous rounds will be placed up for auction randomly. Prepare your bids.")
         try:
@@ -567,15 +795,12 @@ async def start_auction(update: Update, context: ContextTypes.DEFAULT_TYPE):
         async def delayed_unsold_first():
             await asyncio.sleep(2)
             sess = get_session(chat_id)
-            players_local = sess.get("auto_set_list") or []
-            if not players_local:
+            player = _get_auto_queue(chat_id, sess).next()
+            if not player:
                 await _send_message(context.bot, chat_id, "No unsold players available.")
                 sess["processing_unsold"] = False
                 save_session(chat_id, sess)
                 return
-            player = players_local.pop(1 if len(players_local) > 1 else 0)
-            sess["auto_set_list"] = players_local
-            save_session(chat_id, sess)
             base_price = player.get("set_base_price") if player.get("set_base_price") is not None else session.get("budget") or player.get("base_price") or 0
             try:
                 await send_new_player_slot_message(chat_id, context, player, base_price)
@@ -601,6 +826,8 @@ async def start_auction(update: Update, context: ContextTypes.DEFAULT_TYPE):
     session["team_budgets"] = {}
     session["budget"] = None
     session["players_list"] = []
+    session["players_version"] = None
+    completion_trackers.pop(chat_id, None)
     session["current_slot"] = None
     session["paused"] = False
     session["pause_start"] = None
@@ -619,6 +846,8 @@ async def start_auction(update: Update, context: ContextTypes.DEFAULT_TYPE):
     session["auto_set_number"] = None
     session["auto_set_list"] = []
     session["auto_set_index"] = 0
+    session["auto_queue_id"] = None
+    prepared_slots.pop(chat_id, None)
     session["auto_sequence"] = []
     session["pending_slots"] = {}
     session["last_sent_slot_key"] = None
@@ -631,11 +860,12 @@ async def start_auction(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "To access full controls and manage the auction flow,\n"
             "please click on the \"I’m a Host\" button.")
 
-    if START_IMAGE_URL:
+    if media.has("start_image"):
         try:
-            sent = await context.bot.send_photo(
-                chat_id=chat_id,
-                photo=START_IMAGE_URL,
+            sent = await media.send(
+                context.bot,
+                chat_id,
+                "start_image",
                 caption=text,
                 parse_mode=ParseMode.HTML,
                 reply_markup=build_start_keyboard()
@@ -703,7 +933,7 @@ async def callback_router(update: Update, context: ContextTypes.DEFAULT_TYPE):
                             await query.message.delete()
                         except:
                             pass
-                    sent = await context.bot.send_photo(chat_id=chat_id, photo=START_IMAGE_URL, caption=new_text, parse_mode=ParseMode.HTML)
+                    sent = await media.send(context.bot, chat_id, "start_image", caption=new_text, parse_mode=ParseMode.HTML)
                     session["message_key"] = f"{chat_id}:{sent.message_id}"
                 except Exception:
                     try:
@@ -1017,7 +1247,9 @@ async def callback_router(update: Update, context: ContextTypes.DEFAULT_TYPE):
                         })
                     for p in players:
                         await _prefetch_profile_for_player(chat_id, context, p)
-                    session["players_list"] = players
+                    session["players_list"] = _normalize_loaded_players(players)
+                    session["players_version"] = uuid.uuid4().hex[:8]
+                    completion_trackers.pop(chat_id, None)
                     save_session(chat_id, session)
                     run_id = session.get("current_run_id") or start_new_run(chat_id, session)
                     run = get_run(chat_id, run_id)
@@ -1056,6 +1288,37 @@ async def callback_router(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     pass
                 return
 
+        if data.startswith("end_retry:"):
+            run_id = data.split(":", 1)[1]
+            run = get_run(chat_id, run_id)
+            if not run:
+                try:
+                    await query.answer("This auction run is no longer available.", show_alert=True)
+                except:
+                    pass
+                return
+            if user.id != run.get("host_id") and user.id != session.get("host_id"):
+                try:
+                    await query.answer("Only the host can retry squad delivery", show_alert=True)
+                except:
+                    pass
+                return
+            deliveries = _rebuild_squad_messages(run)
+            await _deliver_squads(context.bot, deliveries)
+            run["squad_delivery"] = _squad_status(deliveries)
+            save_run(chat_id, run)
+            failed = [d for d in deliveries.values() if not d.get("ok")]
+            try:
+                await query.message.delete()
+            except Exception:
+                pass
+            await _report_squad_failures(chat_id, context, run_id, deliveries)
+            try:
+                await query.answer("All squads delivered" if not failed else f"{len(failed)} squad DM(s) still failing")
+            except:
+                pass
+            return
+
         if data.startswith("end_confirm:"):
             parts = data.split(":")
             if len(parts) < 3:
@@ -1103,39 +1366,18 @@ async def callback_router(update: Update, context: ContextTypes.DEFAULT_TYPE):
                         owner_name = f"User {OWNER_TELEGRAM_ID}"
                     caption += f"\n\nMade by: <a href='tg://user?id={OWNER_TELEGRAM_ID}'>{owner_name}</a>"
                 try:
-                    sent = await context.bot.send_photo(chat_id=chat_id, photo=END_CLOSED_IMAGE, caption=caption, parse_mode=ParseMode.HTML)
+                    sent = await media.send(context.bot, chat_id, "end_closed", caption=caption, parse_mode=ParseMode.HTML)
                 except Exception:
                     await _send_message(context.bot, chat_id, caption)
                 if teams_snapshot:
-                    for tname, members in (teams_snapshot or {}).items():
-                        if not members:
-                            continue
-                        owner_id = members[0]
-                        if not owner_id:
-                            continue
-                        team_players = []
-                        total_spent = 0
-                        for l in logs_snapshot:
-                            if l.get("buyer_id") and ( (l.get("buyer_id") in (members or [])) or ( ( (getattr(session.get("assistants"),'items',None)) and (session.get("assistants") and list(session.get("assistants").values()) and l.get("buyer_id") in list(session.get("assistants").values()))) ) ):
-                                if l.get("price"):
-                                    team_players.append({"name": l.get("player_name"), "username": (l.get("player_username") or ""), "price": l.get("price")})
-                                    total_spent += int(l.get("price") or 0)
-                        total_players = len(team_players)
-                        lines = []
-                        idx = 1
-                        for p in team_players:
-                            lines.append(f"Player Name: {p.get('name')}\nUsername   : @{(p.get('username') or '')}\nBuy At     : Cr.{p.get('price')}\n")
-                            idx += 1
-                        squad_caption = f"⟦ YOUR FINAL TEAM SQUAD — {tname} ⟧\n\nTotal Players : {total_players}\n\nPlayers:\n\n"
-                        if lines:
-                            squad_caption += "\n".join(lines)
-                        else:
-                            squad_caption += "No players bought.\n\n"
-                        squad_caption += f"\nTotal Spent : Cr.{total_spent}\n\n— End of Squad —\n\nI hope your tournament goes well. Wishing you all the best!"
-                        try:
-                            await context.bot.send_message(chat_id=owner_id, text=squad_caption)
-                        except Exception:
-                            pass
+                    deliveries = _build_squad_messages(session, teams_snapshot, logs_snapshot)
+                    await _deliver_squads(context.bot, deliveries)
+                    if run:
+                        run["final_teams"] = teams_snapshot
+                        run["final_assistants"] = session.get("assistants") or {}
+                        run["squad_delivery"] = _squad_status(deliveries)
+                        save_run(chat_id, run)
+                    await _report_squad_failures(chat_id, context, run_id, deliveries)
                 try:
                     db = load_db()
                     sessions = db.get("auction_sessions", {})
@@ -1886,11 +2128,10 @@ async def load_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "base_price": set_base_price,
             "players": []
         }
-        for p in players:
-            p_copy = dict(p)
-            p_copy["set_base_price"] = set_base_price
-            p_copy["base_price"] = set_base_price
-            set_entry["players"].append(p_copy)
+        for p in _normalize_loaded_players([dict(p) for p in players]):
+            p["set_base_price"] = set_base_price
+            p["base_price"] = set_base_price
+            set_entry["players"].append(p)
         loaded_sets = session.get("loaded_sets", []) or []
         loaded_sets.append(set_entry)
         session["loaded_sets"] = loaded_sets
@@ -1918,7 +2159,10 @@ async def load_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     merged = list(existing_map.values())
     for p in merged:
         await _prefetch_profile_for_player(chat_id, context, p)
+    merged = _normalize_loaded_players(merged)
     session["players_list"] = merged
+    session["players_version"] = uuid.uuid4().hex[:8]
+    completion_trackers.pop(chat_id, None)
     save_session(chat_id, session)
     run_id = session.get("current_run_id") or start_new_run(chat_id, session)
     run = get_run(chat_id, run_id)
@@ -1938,6 +2182,8 @@ load_msg_handler = MessageHandler(filters.REPLY & ~filters.COMMAND & (filters.Ch
 load_reply_fallback_handler = load_msg_handler
 
 def _normalize_player_entry(p: Dict[str, Any]) -> Dict[str, Any]:
+    if p and p.get("pid"):
+        return p
     p = dict(p or {})
     if p.get("username"):
         p["username"] = str(p["username"]).lstrip("@")
@@ -1948,17 +2194,60 @@ def _normalize_player_entry(p: Dict[str, Any]) -> Dict[str, Any]:
             p["user_id"] = p["user_id"]
     return p
 
+def _normalize_loaded_players(players: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    out = []
+    for p in players:
+        if not p:
+            continue
+        if p.get("username"):
+            p["username"] = str(p["username"]).lstrip("@")
+        if p.get("user_id") is not None:
+            try:
+                p["user_id"] = int(p["user_id"])
+            except:
+                pass
+        if not p.get("pid"):
+            p["pid"] = uuid.uuid4().hex[:10]
+        out.append(p)
+    return out
+
+def _player_table(chat_id: int, session: Dict[str, Any]) -> Dict[str, Any]:
+    players = session.get("players_list") or []
+    version = session.get("players_version")
+    table = player_tables.get(chat_id)
+    if table and table["version"] == version and table["count"] == len(players):
+        return table
+    by_pid, by_username, by_user_id, by_code = {}, {}, {}, {}
+    for p in players:
+        if not p:
+            continue
+        if not p.get("pid"):
+            p = _normalize_player_entry(p)
+            p["pid"] = "u" + str(p["user_id"]) if p.get("user_id") else "n" + (p.get("username") or "").lower()
+        by_pid[p["pid"]] = p
+        if p.get("username"):
+            by_username.setdefault(p["username"].lower(), p)
+        if p.get("user_id"):
+            by_user_id.setdefault(str(p["user_id"]), p)
+        if p.get("player_code"):
+            by_code.setdefault(str(p["player_code"]), p)
+    table = {"version": version, "count": len(players), "by_pid": by_pid, "by_username": by_username, "by_user_id": by_user_id, "by_code": by_code}
+    player_tables[chat_id] = table
+    return table
+
+@tracing.traced()
 async def find_player_async(session: Dict[str, Any], identifier: str, chat_id: int, context: ContextTypes.DEFAULT_TYPE) -> Optional[Dict[str, Any]]:
     if not identifier:
         return None
     id_clean = str(identifier).strip()
     if id_clean.startswith("@"):
         id_clean = id_clean[1:]
-    players = session.get("players_list") or []
-    for p in players:
-        p2 = _normalize_player_entry(p)
-        uname = (p2.get("username") or "").lstrip("@")
-        if uname and uname.lower() == id_clean.lower():
+    table = _player_table(chat_id, session)
+    p = table["by_username"].get(id_clean.lower())
+    if p:
+        p2 = dict(p)
+        uname = p2.get("username")
+        if uname:
             db = load_db()
             try:
                 found_id = _recursive_find_userid_by_username(db, uname)
@@ -1996,9 +2285,10 @@ async def find_player_async(session: Dict[str, Any], identifier: str, chat_id: i
                 except Exception:
                     pass
             return p2
-    for p in players:
-        p2 = _normalize_player_entry(p)
-        if p2.get("player_code") and str(p2.get("player_code")) == id_clean:
+    p = table["by_code"].get(id_clean)
+    if p:
+        p2 = dict(p)
+        if p2.get("player_code"):
             if p2.get("user_id"):
                 try:
                     tg_chat = await context.bot.get_chat(int(p2.get("user_id")))
@@ -2030,14 +2320,14 @@ async def find_player_async(session: Dict[str, Any], identifier: str, chat_id: i
                 profile_username = None
                 profile_fullname = None
             if profile_username:
-                for p in players:
-                    p2 = _normalize_player_entry(p)
-                    if p2.get("username") and p2.get("username").lstrip("@").lower() == profile_username.lstrip("@").lower():
-                        p2["profile_username"] = profile_username.lstrip("@")
-                        if profile_fullname:
-                            p2["profile_fullname"] = profile_fullname
-                        p2["user_id"] = p2.get("user_id") or tg_id
-                        return p2
+                p = table["by_username"].get(profile_username.lstrip("@").lower())
+                if p:
+                    p2 = dict(p)
+                    p2["profile_username"] = profile_username.lstrip("@")
+                    if profile_fullname:
+                        p2["profile_fullname"] = profile_fullname
+                    p2["user_id"] = p2.get("user_id") or tg_id
+                    return p2
             if profile_username or profile_fullname:
                 return {"user_id": tg_id, "username": profile_username.lstrip("@") if profile_username else id_clean, "name": profile_fullname or profile_username or str(tg_id), "profile_username": profile_username.lstrip("@") if profile_username else None, "profile_fullname": profile_fullname}
             return None
@@ -2057,14 +2347,14 @@ async def find_player_async(session: Dict[str, Any], identifier: str, chat_id: i
             profile_username = None
             profile_fullname = None
         if profile_username:
-            for p in players:
-                p2 = _normalize_player_entry(p)
-                if p2.get("username") and p2.get("username").lstrip("@").lower() == profile_username.lstrip("@").lower():
-                    p2["profile_username"] = profile_username.lstrip("@")
-                    if profile_fullname:
-                        p2["profile_fullname"] = profile_fullname
-                    p2["user_id"] = p2.get("user_id") or found_id
-                    return p2
+            p = table["by_username"].get(profile_username.lstrip("@").lower())
+            if p:
+                p2 = dict(p)
+                p2["profile_username"] = profile_username.lstrip("@")
+                if profile_fullname:
+                    p2["profile_fullname"] = profile_fullname
+                p2["user_id"] = p2.get("user_id") or found_id
+                return p2
         return {"user_id": found_id, "username": profile_username.lstrip("@") if profile_username else id_clean, "name": profile_fullname or id_clean, "profile_username": profile_username.lstrip("@") if profile_username else None, "profile_fullname": profile_fullname}
     reg = _find_registration_by_username_or_code(db, id_clean)
     if reg:
@@ -2131,8 +2421,8 @@ async def _try_send_next_auto(chat_id: int, context: ContextTypes.DEFAULT_TYPE):
             return
         if session.get("current_slot"):
             return
-        players = session.get("auto_set_list") or []
-        if not players:
+        next_player = _get_auto_queue(chat_id, session).next()
+        if not next_player:
             set_num = session.get("auto_set_number") or 0
             host_id = session.get("host_id")
             host_name = session.get("host_name") or "Host"
@@ -2147,20 +2437,14 @@ async def _try_send_next_auto(chat_id: int, context: ContextTypes.DEFAULT_TYPE):
                     text = (f"⟦ SET {set_num} AUCTION COMPLETED ⟧\n\n"
                             f"{host_tag}, set {set_num} auction is completed. Please start the next set auction: /start_auction {next_set_num}\n\n"
                             f"Guideline: Use /start_auction {next_set_num} to auto-start the next set. You can also run /start_auction <set_number> anytime.")
-                    try:
-                        await _send_message(context.bot, chat_id, text, parse_mode=ParseMode.HTML)
-                    except:
-                        pass
+                    side_effects.submit(chat_id, _send_message, context.bot, chat_id, text, parse_mode=ParseMode.HTML)
                 else:
                     caption = ("⟦ AUCTION HAS OFFICIALLY COMPLETED ⟧\n\n"
                                "All bidding rounds are now closed, and no further bids will be accepted.\n"
                                "It’s time to finalize your squads and proceed with the final review.\n\n"
                                "To fully close the auction and complete all processes,\n"
                                "please send the command: /end_auction")
-                    try:
-                        sent = await context.bot.send_photo(chat_id=chat_id, photo=AUCTION_DONE_IMAGE, caption=caption, parse_mode=ParseMode.HTML)
-                    except Exception:
-                        await _send_message(context.bot, chat_id, caption)
+                    side_effects.submit(chat_id, _post_completion_photo, chat_id, context, caption)
                     session["completed"] = True
                     save_session(chat_id, session)
             else:
@@ -2169,52 +2453,14 @@ async def _try_send_next_auto(chat_id: int, context: ContextTypes.DEFAULT_TYPE):
                            "It’s time to finalize your squads and proceed with the final review.\n\n"
                            "To fully close the auction and complete all processes,\n"
                            "please send the command: /end_auction")
-                try:
-                    sent = await context.bot.send_photo(chat_id=chat_id, photo=AUCTION_DONE_IMAGE, caption=caption, parse_mode=ParseMode.HTML)
-                except Exception:
-                    await _send_message(context.bot, chat_id, caption)
+                side_effects.submit(chat_id, _post_completion_photo, chat_id, context, caption)
                 session["completed"] = True
                 save_session(chat_id, session)
             if session.get("processing_unsold"):
                 session["processing_unsold"] = False
                 save_session(chat_id, session)
             return
-        run = None
-        run_id = session.get("current_run_id")
-        if run_id:
-            run = get_run(chat_id, run_id)
-            sold_ids = {str(s.get("player_id")) for s in (run.get("sold_players") or []) if s.get("player_id")}
-            if session.get("processing_unsold"):
-                unsold_ids = set()
-            else:
-                unsold_ids = {str(s.get("player_id")) for s in (run.get("unsold_players") or []) if s.get("player_id")}
-        else:
-            sold_ids = set()
-            unsold_ids = set()
-        next_player = None
-        while players:
-            candidate = players.pop(0)
-            key_id = str(candidate.get("user_id") or "")
-            uname = (candidate.get("username") or "").lstrip("@").lower()
-            if (key_id and key_id in sold_ids):
-                continue
-            if (key_id and key_id in unsold_ids) and not session.get("processing_unsold"):
-                continue
-            if (uname and run):
-                for s in (run.get("sold_players") or []):
-                    if (s.get("player_username") or "").lstrip("@").lower() == uname:
-                        candidate = None
-                        break
-                if candidate is None:
-                    continue
-            next_player = candidate
-            break
-        session["auto_set_list"] = players
-        save_session(chat_id, session)
-        if not next_player:
-            await _try_send_next_auto(chat_id, context)
-            return
-        base_price = next_player.get("set_base_price") if next_player.get("set_base_price") is not None else session.get("budget") or next_player.get("base_price") or 0
+        base_price = _auto_base_price(session, next_player)
         try:
             await send_new_player_slot_message(chat_id, context, next_player, base_price)
         except Exception:
@@ -2225,21 +2471,14 @@ async def _try_send_next_auto(chat_id: int, context: ContextTypes.DEFAULT_TYPE):
     except Exception:
         return
 
-async def _remove_player_from_auto_and_pending(session: Dict[str, Any], player: Dict[str, Any]):
+async def _remove_player_from_auto_and_pending(chat_id: int, session: Dict[str, Any], player: Dict[str, Any], sold: bool = False):
     uid = player.get("user_id")
     uname = (player.get("username") or "").lstrip("@").lower()
-    new_auto = []
-    for p in session.get("auto_set_list", []) or []:
-        if p is None:
-            continue
-        if uid and p.get("user_id") and str(p.get("user_id")) == str(uid):
-            continue
-        if uname and p.get("username") and p.get("username").lstrip("@").lower() == uname:
-            continue
-        new_auto.append(p)
-    session["auto_set_list"] = new_auto
-    seq = [s for s in (session.get("auto_sequence") or []) if s != str(uid) and s != uname]
-    session["auto_sequence"] = seq
+    if session.get("auto_mode"):
+        q = _get_auto_queue(chat_id, session)
+        q.mark_done(player)
+        if sold:
+            q.mark_sold(player)
     pending = session.get("pending_slots", {}) or {}
     keys_to_rm = []
     for k, v in pending.items():
@@ -2253,6 +2492,7 @@ async def _remove_player_from_auto_and_pending(session: Dict[str, Any], player:
         pending.pop(k, None)
     session["pending_slots"] = pending
 
+@tracing.traced()
 async def _finalize_current_slot(chat_id: int, context: ContextTypes.DEFAULT_TYPE, by_host: bool = False):
     session = get_session(chat_id)
     slot = session.get("current_slot")
@@ -2262,6 +2502,7 @@ async def _finalize_current_slot(chat_id: int, context: ContextTypes.DEFAULT_TYP
     deadline = slot.get("deadline", now)
     if now < deadline:
         return False, "deadline extended"
+    await _settle_bid_confirmation(chat_id, context)
     player = slot.get("player") or {}
     highest = slot.get("highest") or slot.get("last_bid")
     run_id = session.get("current_run_id")
@@ -2282,26 +2523,16 @@ async def _finalize_current_slot(chat_id: int, context: ContextTypes.DEFAULT_TYP
                    f"👤 Buyer         : {buyer_link}\n"
                    f"🫂 Team          : {buyer_team or '—'}\n"
                    "━━━━━━━━━━━━━━━━━━━━━\n")
-        try:
-            vid = random.choice(SOLD_VIDEO_IDS) if SOLD_VIDEO_IDS else None
-            if vid:
-                sent = await context.bot.send_video(chat_id=chat_id, video=vid, caption=caption, parse_mode=ParseMode.HTML)
-                try:
-                    await context.bot.pin_chat_message(chat_id=chat_id, message_id=sent.message_id, disable_notification=True)
-                except Exception:
-                    pass
-            else:
-                sent = await context.bot.send_message(chat_id=chat_id, text=caption, parse_mode=ParseMode.HTML)
-        except Exception:
-            await context.bot.send_message(chat_id=chat_id, text=caption, parse_mode=ParseMode.HTML)
+        side_effects.submit(chat_id, _post_result_card, chat_id, context, caption, "sold")
         session["logs"].append({"ts": int(time.time()), "player_id": player.get("user_id"), "player_name": player.get("name"), "price": price, "buyer_id": buyer_id, "player_username": player.get("username"), "player_role": player.get("role")})
         if run:
             run_sold = run.get("sold_players", [])
             run_sold.append({"ts": int(time.time()), "player_id": player.get("user_id"), "player_name": player.get("name"), "price": price, "buyer_id": buyer_id, "player_username": player.get("username")})
             run["sold_players"] = run_sold
+            _track_sold(chat_id, player)
             run["current_slot"] = None
-            append_run_log(chat_id, run.get("run_id"), {"event": "sold", "player": player, "price": price, "buyer_id": buyer_id, "ts": int(time.time())})
             save_run(chat_id, run)
+            append_run_log(chat_id, run.get("run_id"), {"event": "sold", "player": player, "price": price, "buyer_id": buyer_id, "ts": int(time.time())})
         try:
             tb = session.get("team_budgets", {}) or {}
             if buyer_team:
@@ -2317,32 +2548,23 @@ async def _finalize_current_slot(chat_id: int, context: ContextTypes.DEFAULT_TYP
                    f"👾 Player        : {name_link}\n"
                    f"🔥 Role Type   : {player.get('role') or 'None'}\n\n"
                    f"Final Status: UNSOLD\n")
-        try:
-            vid = random.choice(UNSOLD_VIDEO_IDS) if UNSOLD_VIDEO_IDS else None
-            if vid:
-                sent = await context.bot.send_video(chat_id=chat_id, video=vid, caption=caption, parse_mode=ParseMode.HTML)
-                try:
-                    await context.bot.pin_chat_message(chat_id=chat_id, message_id=sent.message_id, disable_notification=True)
-                except Exception:
-                    pass
-            else:
-                sent = await context.bot.send_message(chat_id=chat_id, text=caption, parse_mode=ParseMode.HTML)
-        except Exception:
-            await context.bot.send_message(chat_id=chat_id, text=caption, parse_mode=ParseMode.HTML)
+        side_effects.submit(chat_id, _post_result_card, chat_id, context, caption, "unsold")
         session["logs"].append({"ts": int(time.time()), "player_id": player.get("user_id"), "player_name": player.get("name"), "price": None, "buyer_id": None, "player_username": player.get("username"), "player_role": player.get("role")})
         if run:
             run_unsold = run.get("unsold_players", [])
             run_unsold.append({"ts": int(time.time()), "player_id": player.get("user_id"), "player_name": player.get("name"), "base_price": slot.get("start_price"), "player_username": player.get("username")})
             run["unsold_players"] = run_unsold
             run["current_slot"] = None
-            append_run_log(chat_id, run.get("run_id"), {"event": "unsold", "player": player, "base_price": slot.get("start_price"), "ts": int(time.time())})
             save_run(chat_id, run)
+            append_run_log(chat_id, run.get("run_id"), {"event": "unsold", "player": player, "base_price": slot.get("start_price"), "ts": int(time.time())})
     try:
-        await _remove_player_from_auto_and_pending(session, player)
+        await _remove_player_from_auto_and_pending(chat_id, session, player, sold=bool(highest))
     except Exception:
         pass
     session["current_slot"] = None
     save_session(chat_id, session)
+    countdown_views.pop(chat_id, None)
+    bid_confirmations.pop(chat_id, None)
     try:
         t = countdown_tasks.get(chat_id)
         if t and not t.done():
@@ -2357,6 +2579,106 @@ async def _finalize_current_slot(chat_id: int, context: ContextTypes.DEFAULT_TYP
         pass
     return True, "finalized"
 
+async def _post_result_card(chat_id: int, context: ContextTypes.DEFAULT_TYPE, caption: str, asset: str):
+    try:
+        if media.has(asset):
+            sent = await media.send(context.bot, chat_id, asset, caption=caption, parse_mode=ParseMode.HTML, **gateway.priority(context.bot, gateway.CRITICAL))
+            try:
+                await context.bot.pin_chat_message(chat_id=chat_id, message_id=sent.message_id, disable_notification=True, **gateway.priority(context.bot, gateway.CRITICAL))
+            except Exception:
+                pass
+        else:
+            sent = await context.bot.send_message(chat_id=chat_id, text=caption, parse_mode=ParseMode.HTML, **gateway.priority(context.bot, gateway.CRITICAL))
+    except Exception:
+        sent = await context.bot.send_message(chat_id=chat_id, text=caption, parse_mode=ParseMode.HTML, **gateway.priority(context.bot, gateway.CRITICAL))
+    return sent
+
+async def _post_completion_photo(chat_id: int, context: ContextTypes.DEFAULT_TYPE, caption: str):
+    try:
+        return await media.send(context.bot, chat_id, "auction_done", caption=caption, parse_mode=ParseMode.HTML, **gateway.priority(context.bot, gateway.CRITICAL))
+    except Exception:
+        return await context.bot.send_message(chat_id=chat_id, text=caption, parse_mode=ParseMode.HTML, **gateway.priority(context.bot, gateway.CRITICAL))
+
+def _build_squad_messages(session: Dict[str, Any], teams: Dict[str, Any], logs: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    buyer_team = {}
+    for tname, members in (teams or {}).items():
+        for m in members or []:
+            if m:
+                buyer_team.setdefault(str(m), tname)
+    for tname, aid in (session.get("assistants") or {}).items():
+        if aid:
+            buyer_team.setdefault(str(aid), tname)
+    rosters = {tname: [] for tname in (teams or {})}
+    for l in logs or []:
+        if not l.get("buyer_id") or not l.get("price"):
+            continue
+        tname = buyer_team.get(str(l.get("buyer_id")))
+        if tname in rosters:
+            rosters[tname].append(l)
+    deliveries = {}
+    for tname, members in (teams or {}).items():
+        if not members or not members[0]:
+            continue
+        owner_id = members[0]
+        lines = []
+        total_spent = 0
+        for l in rosters[tname]:
+            lines.append(f"Player Name: {l.get('player_name')}\nUsername   : @{(l.get('player_username') or '')}\nBuy At     : Cr.{l.get('price')}\n")
+            total_spent += int(l.get("price") or 0)
+        text = f"⟦ YOUR FINAL TEAM SQUAD — {tname} ⟧\n\nTotal Players : {len(lines)}\n\nPlayers:\n\n"
+        if lines:
+            text += "\n".join(lines)
+        else:
+            text += "No players bought.\n\n"
+        text += f"\nTotal Spent : Cr.{total_spent}\n\n— End of Squad —\n\nI hope your tournament goes well. Wishing you all the best!"
+        deliveries[str(owner_id)] = {"team": tname, "owner_id": owner_id, "text": text, "ok": False, "error": None, "ts": None}
+    return deliveries
+
+def _squad_status(deliveries: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    return {k: {f: d.get(f) for f in ("team", "owner_id", "ok", "error", "ts")} for k, d in deliveries.items()}
+
+def _rebuild_squad_messages(run: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    status = run.get("squad_delivery") or {}
+    if "final_teams" not in run:
+        # runs ended before the texts stopped being stored still carry them
+        return status
+    deliveries = _build_squad_messages({"assistants": run.get("final_assistants")}, run.get("final_teams") or {}, run.get("sold_players") or [])
+    for k, entry in deliveries.items():
+        prev = status.get(k) or {}
+        entry.update({f: prev[f] for f in ("ok", "error", "ts") if f in prev})
+    return deliveries
+
+async def _deliver_squads(bot, deliveries: Dict[str, Dict[str, Any]]):
+    async def deliver(entry):
+        if not entry.get("text"):
+            entry["error"] = "squad text unavailable"
+            return
+        try:
+            await bot.send_message(chat_id=entry["owner_id"], text=entry["text"], **gateway.priority(bot, gateway.NORMAL))
+            entry["ok"] = True
+            entry["error"] = None
+        except Exception as e:
+            entry["ok"] = False
+            entry["error"] = str(e)
+        entry["ts"] = int(time.time())
+    await asyncio.gather(*(deliver(e) for e in deliveries.values() if not e.get("ok")))
+    return deliveries
+
+async def _report_squad_failures(chat_id: int, context: ContextTypes.DEFAULT_TYPE, run_id: Optional[str], deliveries: Dict[str, Dict[str, Any]]):
+    failed = [d for d in deliveries.values() if not d.get("ok")]
+    if not failed:
+        return
+    lines = [f"⚠️ Could not deliver {len(failed)} squad DM(s):", ""]
+    for d in failed:
+        lines.append(f"• {d.get('team')} — <a href='tg://user?id={d.get('owner_id')}'>owner</a>: {d.get('error') or 'unknown error'}")
+    lines.append("")
+    lines.append("Owners must start the bot in private chat before a retry can succeed.")
+    markup = InlineKeyboardMarkup([[InlineKeyboardButton("Retry failed DMs", callback_data=f"end_retry:{run_id}")]]) if run_id else None
+    try:
+        await _send_message(context.bot, chat_id, "\n".join(lines), reply_markup=markup)
+    except Exception:
+        pass
+
 def _parse_amount_token(tok: str) -> Optional[float]:
     if not tok:
         return None
@@ -2417,6 +2739,7 @@ async def next_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         attempts = run.get("attempts", {}) or {}
         attempts[player_key] = attempts.get(player_key, 0) + 1
         run["attempts"] = attempts
+        _track_attempt(chat_id, player_key, attempts[player_key])
         save_run(chat_id, run)
     profile_fullname = player.get("profile_fullname") or player.get("name") or None
     if not profile_fullname and pre_text:
@@ -2435,37 +2758,118 @@ async def next_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 next_handler = CommandHandler("next", next_cmd)
 
-async def check_auction_completion(chat_id: int, session: Dict[str, Any], run: Optional[Dict[str, Any]], context: ContextTypes.DEFAULT_TYPE):
-    if not session or not run:
-        return
+def _completion_tracker(chat_id: int, session: Dict[str, Any], run: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not run:
+        return None
     players = session.get("players_list") or []
-    if not players:
-        return
+    tracker = completion_trackers.get(chat_id)
+    if tracker and tracker["run_id"] == run.get("run_id") and tracker["count"] == len(players):
+        return tracker
     attempts = run.get("attempts", {}) or {}
     sold_ids = {str(s.get("player_id")) for s in (run.get("sold_players") or []) if s.get("player_id")}
-    all_done = True
-    for p in players:
-        p2 = _normalize_player_entry(p)
+    remaining = set()
+    for p2 in _player_table(chat_id, session)["by_pid"].values():
         key = str(p2.get("user_id") or (p2.get("username") or "")).strip()
-        if key in sold_ids:
+        if key in sold_ids or attempts.get(key, 0) >= 2:
             continue
-        if attempts.get(key, 0) >= 2:
-            continue
-        all_done = False
-        break
-    if all_done and not session.get("completed"):
+        remaining.add(key)
+    tracker = {"run_id": run.get("run_id"), "count": len(players), "remaining": remaining}
+    completion_trackers[chat_id] = tracker
+    return tracker
+
+def _track_sold(chat_id: int, player: Dict[str, Any]):
+    tracker = completion_trackers.get(chat_id)
+    if tracker and player.get("user_id"):
+        tracker["remaining"].discard(str(player.get("user_id")))
+
+def _track_attempt(chat_id: int, key: str, attempts: int):
+    tracker = completion_trackers.get(chat_id)
+    if tracker and attempts >= 2:
+        tracker["remaining"].discard(key)
+
+async def check_auction_completion(chat_id: int, session: Dict[str, Any], run: Optional[Dict[str, Any]], context: ContextTypes.DEFAULT_TYPE):
+    if not session or not run:
+        return
+    if not session.get("players_list"):
+        return
+    tracker = _completion_tracker(chat_id, session, run)
+    if not tracker["remaining"] and not session.get("completed"):
         caption = ("⟦ AUCTION HAS OFFICIALLY COMPLETED ⟧\n\n"
                    "All bidding rounds are now closed, and no further bids will be accepted.\n"
                    "It’s time to finalize your squads and proceed with the final review.\n\n"
                    "To fully close the auction and complete all processes,\n"
                    "please send the command: /end_auction")
-        try:
-            sent = await context.bot.send_photo(chat_id=chat_id, photo=AUCTION_DONE_IMAGE, caption=caption, parse_mode=ParseMode.HTML)
-        except Exception:
-            await _send_message(context.bot, chat_id, caption)
+        side_effects.submit(chat_id, _post_completion_photo, chat_id, context, caption)
         session["completed"] = True
         save_session(chat_id, session)
 
+def _countdown_mark(remaining: int) -> Optional[int]:
+    mark = None
+    for m in COUNTDOWN_EDIT_MARKS:
+        if remaining <= m:
+            mark = m
+    return mark
+
+def _countdown_edit_tick(chat_id: int, context: ContextTypes.DEFAULT_TYPE, session: Dict[str, Any], slot: Dict[str, Any], view: Dict[str, Any], remaining: int):
+    task = view.get("task")
+    if task and not task.done():
+        return
+    highest = slot.get("highest") or {}
+    mark = _countdown_mark(remaining)
+    state = (mark or "open", highest.get("amount"))
+    if state == view.get("state"):
+        return
+    if time.monotonic() - view.get("last_edit", 0.0) < COUNTDOWN_MIN_EDIT_GAP:
+        return
+    mg = slot.get("mg_message")
+    if not mg:
+        return
+    try:
+        message_id = int(str(mg).split(":")[1])
+    except Exception:
+        view["fallback"] = True
+        return
+    view["state"] = state
+    view["last_edit"] = time.monotonic()
+    view["task"] = asyncio.create_task(_countdown_render(chat_id, context, session, slot, view, message_id, remaining))
+
+async def _countdown_render(chat_id: int, context: ContextTypes.DEFAULT_TYPE, session: Dict[str, Any], slot: Dict[str, Any], view: Dict[str, Any], message_id: int, remaining: int):
+    footer = ""
+    highest = slot.get("highest")
+    if highest:
+        team = _get_team_of_user(session, highest.get("user_id")) or highest.get("name") or "—"
+        footer += f"💰 Highest Bid : Cr.{highest.get('amount')} ({team})\n"
+    if remaining <= COUNTDOWN_EDIT_MARKS[0]:
+        footer += f"⏳ {remaining} second{'s' if remaining != 1 else ''} remaining for bid\n"
+    else:
+        footer += f"⏳ Timer reset to {get_countdown(session)} seconds — send your bid: /bid amount\n"
+    text = await _slot_card_caption(session, slot.get("player") or {}, slot.get("start_price"), footer)
+    for _ in range(2):
+        try:
+            if view.get("media"):
+                await context.bot.edit_message_caption(chat_id=chat_id, message_id=message_id, caption=text, parse_mode=ParseMode.HTML, **gateway.priority(context.bot, gateway.LOW))
+            else:
+                await context.bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=text, parse_mode=ParseMode.HTML, **gateway.priority(context.bot, gateway.LOW))
+            return
+        except BadRequest as e:
+            err = str(e).lower()
+            if "not modified" in err:
+                return
+            if "no caption" in err or "no text" in err:
+                view["media"] = not view.get("media")
+                continue
+            view["fallback"] = True
+            return
+        except gateway.MessageDropped:
+            view["state"] = None
+            return
+        except TelegramError:
+            view["fallback"] = True
+            return
+        except Exception:
+            return
+    view["fallback"] = True
+
 async def slot_countdown(chat_id: int, context: ContextTypes.DEFAULT_TYPE):
     try:
         while True:
@@ -2489,19 +2893,29 @@ async def slot_countdown(chat_id: int, context: ContextTypes.DEFAULT_TYPE):
                         continue
                 await _finalize_current_slot(chat_id, context)
                 return
+            if session.get("countdown_mode") == "edit":
+                view = countdown_views.get(chat_id)
+                if not view or view.get("key") != _slot_key(slot):
+                    view = {"key": _slot_key(slot), "media": True, "state": ("open", None), "last_edit": 0.0, "task": None, "fallback": False}
+                    countdown_views[chat_id] = view
+                if not view.get("fallback"):
+                    _countdown_edit_tick(chat_id, context, session, slot, view, remaining)
+                    await asyncio.sleep(1)
+                    continue
             if remaining == 10 and not slot.get("announced", {}).get("10"):
-                try:
-                    await context.bot.send_message(chat_id=chat_id, text="🔟 10 seconds remaining for bid")
-                except Exception:
-                    pass
+                # save before the send: a LOW message can wait in the gateway while bids land
                 slot.setdefault("announced", {})["10"] = True
                 session["current_slot"] = slot
                 save_session(chat_id, session)
+                try:
+                    await context.bot.send_message(chat_id=chat_id, text="🔟 10 seconds remaining for bid", **gateway.priority(context.bot, gateway.LOW))
+                except Exception:
+                    pass
                 await asyncio.sleep(1)
                 continue
             if remaining <= 5 and remaining > 0:
                 try:
-                    await context.bot.send_message(chat_id=chat_id, text=f"{remaining} second{'s' if remaining!=1 else ''} remaining for bid")
+                    await context.bot.send_message(chat_id=chat_id, text=f"{remaining} second{'s' if remaining!=1 else ''} remaining for bid", **gateway.priority(context.bot, gateway.LOW))
                 except Exception:
                     pass
                 await asyncio.sleep(1)
@@ -2512,6 +2926,53 @@ async def slot_countdown(chat_id: int, context: ContextTypes.DEFAULT_TYPE):
     except Exception:
         return
 
+def reset_runtime_state():
+    # everything here was derived from the database that was just replaced
+    for t in list(countdown_tasks.values()):
+        if not t.done():
+            t.cancel()
+    for agg in list(bid_confirmations.values()):
+        if agg.get("task") and not agg["task"].done():
+            agg["task"].cancel()
+    for cache in (countdown_tasks, bid_confirmations, countdown_views, auto_queues, prepared_slots, completion_trackers, player_tables, run_event_logs):
+        cache.clear()
+
+async def recover_sessions(app) -> Dict[str, Any]:
+    # countdown tasks and auto-mode sends only live in memory; rebuild them from the persisted sessions
+    started = time.perf_counter()
+    context = CallbackContext(app)
+    report = {"sessions": 0, "missed_deadlines": 0, "rearmed": 0, "auto_resumed": 0, "errors": 0, "max_late_seconds": 0}
+    now = int(time.time())
+    for key, session in (load_db().get("auction_sessions", {}) or {}).items():
+        report["sessions"] += 1
+        try:
+            chat_id = int(key)
+            t = countdown_tasks.get(chat_id)
+            if t and not t.done():
+                continue
+            slot = session.get("current_slot")
+            if slot:
+                deadline = int(slot.get("deadline") or now)
+                if deadline <= now and not session.get("paused"):
+                    ok, _ = await _finalize_current_slot(chat_id, context)
+                    if ok:
+                        report["missed_deadlines"] += 1
+                        report["max_late_seconds"] = max(report["max_late_seconds"], now - deadline)
+                        metrics.inc("auction_recovered_slots_total", action="finalized")
+                    continue
+                countdown_tasks[chat_id] = asyncio.create_task(slot_countdown(chat_id, context))
+                report["rearmed"] += 1
+                metrics.inc("auction_recovered_slots_total", action="rearmed")
+            elif session.get("active") and session.get("auto_mode") and not session.get("completed") and not session.get("paused") and not session.get("pending_slots"):
+                asyncio.create_task(_try_send_next_auto(chat_id, context))
+                report["auto_resumed"] += 1
+                metrics.inc("auction_recovered_slots_total", action="auto_resumed")
+        except Exception:
+            report["errors"] += 1
+            logger.exception("recovery failed for chat %s", key)
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    return report
+
 async def bid_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     msg = update.effective_message
     chat = update.effective_chat or (msg.chat if msg else None)
@@ -2652,15 +3113,122 @@ async def bid_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "━━━━━━━━━━━━━━━━━━━━━\n"
             f"You have {get_countdown(session)} seconds for the next bid.\n")
     try:
-        vid = random.choice(BID_CONFIRMED_VIDEO_IDS) if BID_CONFIRMED_VIDEO_IDS else None
-        if vid:
-            await context.bot.send_video(chat_id=chat_id, video=vid, caption=text, parse_mode=ParseMode.HTML)
-        else:
-            await _send_message(context.bot, chat_id, text, parse_mode=ParseMode.HTML)
+        await _confirm_bid(chat_id, context, session, slot, text)
     except:
         await msg.reply_text(text)
     return
 
+async def _settle_bid_confirmation(chat_id: int, context: ContextTypes.DEFAULT_TYPE):
+    # the last aggregated bid must reach the chat before the result card does
+    agg = bid_confirmations.get(chat_id)
+    if not agg:
+        return
+    task = agg.get("task")
+    if agg.get("pending"):
+        if task and not task.done():
+            task.cancel()
+        await _deliver_pending_confirmation(chat_id, context, agg)
+    elif task and not task.done():
+        await asyncio.wait({task})
+
+def _bid_confirm_window(session: Dict[str, Any]) -> float:
+    try:
+        return max(0.0, float(session.get("bid_confirm_window", BID_CONFIRM_WINDOW)))
+    except:
+        return float(BID_CONFIRM_WINDOW)
+
+async def _send_bid_confirmation(chat_id: int, context: ContextTypes.DEFAULT_TYPE, agg: Dict[str, Any], text: str):
+    has_video = media.has("bid_confirmed")
+    if has_video:
+        sent = await media.send(context.bot, chat_id, "bid_confirmed", caption=text, parse_mode=ParseMode.HTML)
+    else:
+        sent = await _send_message(context.bot, chat_id, text, parse_mode=ParseMode.HTML)
+    agg["message_id"] = getattr(sent, "message_id", None)
+    agg["media"] = has_video
+    agg["last_sent"] = time.monotonic()
+
+async def _confirm_bid(chat_id: int, context: ContextTypes.DEFAULT_TYPE, session: Dict[str, Any], slot: Dict[str, Any], text: str):
+    key = _slot_key(slot)
+    agg = bid_confirmations.get(chat_id)
+    if not agg or agg.get("key") != key:
+        if agg and agg.get("task") and not agg["task"].done():
+            agg["task"].cancel()
+        agg = {"key": key, "message_id": None, "media": False, "last_sent": 0.0, "pending": None, "task": None}
+        bid_confirmations[chat_id] = agg
+    window = _bid_confirm_window(session)
+    wait = agg["last_sent"] + window - time.monotonic()
+    if wait <= 0 and not (agg.get("task") and not agg["task"].done()):
+        agg["last_sent"] = time.monotonic()
+        await _send_bid_confirmation(chat_id, context, agg, text)
+        return
+    agg["pending"] = text
+    if not agg.get("task") or agg["task"].done():
+        agg["task"] = asyncio.create_task(_flush_bid_confirmation(chat_id, context, agg, max(wait, 0)))
+
+async def _flush_bid_confirmation(chat_id: int, context: ContextTypes.DEFAULT_TYPE, agg: Dict[str, Any], delay: float):
+    try:
+        await asyncio.sleep(delay)
+    except asyncio.CancelledError:
+        return
+    if bid_confirmations.get(chat_id) is not agg:
+        return
+    await _deliver_pending_confirmation(chat_id, context, agg)
+
+async def _deliver_pending_confirmation(chat_id: int, context: ContextTypes.DEFAULT_TYPE, agg: Dict[str, Any]):
+    text = agg.get("pending")
+    agg["pending"] = None
+    if not text:
+        return
+    agg["last_sent"] = time.monotonic()
+    try:
+        if agg.get("message_id"):
+            if agg.get("media"):
+                await context.bot.edit_message_caption(chat_id=chat_id, message_id=agg["message_id"], caption=text, parse_mode=ParseMode.HTML)
+            else:
+                await context.bot.edit_message_text(chat_id=chat_id, message_id=agg["message_id"], text=text, parse_mode=ParseMode.HTML)
+            return
+    except BadRequest as e:
+        if "not modified" in str(e).lower():
+            return
+    except Exception:
+        pass
+    try:
+        await _send_bid_confirmation(chat_id, context, agg, text)
+    except Exception:
+        pass
+
+async def bid_window_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    msg = update.effective_message
+    if not msg:
+        return
+    chat = update.effective_chat
+    user = update.effective_user
+    if not chat or not user:
+        return
+    chat_id = chat.id
+    session = get_session(chat_id)
+    if session.get("host_id") != user.id:
+        await msg.reply_text("Only the host can change the bid confirmation window.")
+        return
+    parts = (msg.text or "").split()
+    if len(parts) < 2:
+        await msg.reply_text(f"Usage: /bid_window <seconds> (0 to confirm every bid separately)\nCurrent window: {_bid_confirm_window(session):g} seconds")
+        return
+    try:
+        val = float(parts[1])
+    except:
+        await msg.reply_text("Please provide a number of seconds between 0 and 30.")
+        return
+    if val < 0 or val > 30:
+        await msg.reply_text("Window must be between 0 and 30 seconds.")
+        return
+    session["bid_confirm_window"] = val
+    save_session(chat_id, session)
+    await msg.reply_text(f"Bid confirmations will be sent at most once every {val:g} seconds.")
+    return
+
+bid_window_handler = CommandHandler("bid_window", bid_window_cmd)
+
 bid_handler = CommandHandler("bid", bid_cmd)
 
 async def pause_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -2740,7 +3308,15 @@ async def summary_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     sold = len([l for l in session.get("logs", []) if l.get("price")])
     unsold = len([l for l in session.get("logs", []) if l.get("price") is None])
     available = players_count - sold - unsold
-    txt = ("🎯 Auction Summary 🎯\n\n" f"Total Tables: {teams_count}/{tables}\n" f"Auction Budget (per team): {budget}\n" f"Total Players Loaded: {players_count}\n" f"Available for Buying: {available}\n" f"Sold Players: {sold}\n" f"Unsold Players: {unsold}\n\n" "Keep the energy up — good luck!")
+    run_id = session.get("current_run_id")
+    tracker = completion_trackers.get(chat_id)
+    if run_id and (not tracker or tracker.get("run_id") != run_id):
+        tracker = _completion_tracker(chat_id, session, get_run(chat_id, run_id))
+    progress = ""
+    if tracker and players_count:
+        done = players_count - len(tracker["remaining"])
+        progress = f"Auction Progress: {done}/{players_count} done, {len(tracker['remaining'])} remaining\n"
+    txt = ("🎯 Auction Summary 🎯\n\n" f"Total Tables: {teams_count}/{tables}\n" f"Auction Budget (per team): {budget}\n" f"Total Players Loaded: {players_count}\n" f"Available for Buying: {available}\n" f"Sold Players: {sold}\n" f"Unsold Players: {unsold}\n" + progress + "\n" "Keep the energy up — good luck!")
     await _send_message(context.bot, chat_id, txt)
     return
 
@@ -2866,14 +3442,15 @@ async def status_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await msg.reply_text(f"Player {found_entry.get('player_name')} was UNSOLD.")
             return
     else:
-        for p in session.get("players_list") or []:
-            p2 = _normalize_player_entry(p)
-            if p2.get("user_id") and target_user_id and str(p2.get("user_id")) == str(target_user_id):
-                await msg.reply_text(f"Player {p2.get('name') or p2.get('username')} is loaded but not auctioned yet.")
-                return
-            if p2.get("username") and (target_username or "") and p2.get("username").lstrip("@").lower() == (target_username or "").lstrip("@").lower():
-                await msg.reply_text(f"Player {p2.get('name') or p2.get('username')} is loaded but not auctioned yet.")
-                return
+        table = _player_table(chat_id, session)
+        p2 = None
+        if target_user_id:
+            p2 = table["by_user_id"].get(str(target_user_id))
+        if not p2 and target_username:
+            p2 = table["by_username"].get(target_username.lstrip("@").lower())
+        if p2:
+            await msg.reply_text(f"Player {p2.get('name') or p2.get('username')} is loaded but not auctioned yet.")
+            return
         await msg.reply_text("Player not found in loaded list or auction logs.")
         return
 
@@ -3448,4 +4025,29 @@ async def time_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await msg.reply_text(f"Auction bidding time set to {val} seconds.")
     return
 
-time_handler = CommandHandler("time", time_cmd)
\ No newline at end of file
+time_handler = CommandHandler("time", time_cmd)
+
+async def countdown_mode_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    msg = update.effective_message
+    if not msg:
+        return
+    chat = update.effective_chat
+    user = update.effective_user
+    if not chat or not user:
+        return
+    chat_id = chat.id
+    session = get_session(chat_id)
+    if session.get("host_id") != user.id:
+        await msg.reply_text("Only the host can change the countdown mode.")
+        return
+    parts = (msg.text or "").split()
+    if len(parts) < 2 or parts[1].lower() not in COUNTDOWN_MODES:
+        current = session.get("countdown_mode") or "messages"
+        await msg.reply_text(f"Usage: /countdown edit|messages\nCurrent mode: {current}\n\nedit — the pinned player card is updated in place\nmessages — a new message for 10s and each of the last 5 seconds")
+        return
+    session["countdown_mode"] = parts[1].lower()
+    save_session(chat_id, session)
+    await msg.reply_text(f"Countdown mode set to {session['countdown_mode']}.")
+    return
+
+countdown_mode_handler = CommandHandler("countdown", countdown_mode_cmd)
\ No newline at end of file
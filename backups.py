@@ -0,0 +1,250 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, Any, Optional, List
+
+import sharding
+
+SCHEMA_VERSION = 1
+SNAPSHOT_INTERVAL_HOURS = 24
+DELTA_INTERVAL_MINUTES = 15
+KEEP_SNAPSHOTS = 7
+MANIFEST_NAME = "manifest.json"
+
+DICT_KEYS = ("tournaments", "started_users", "known_groups", "mg_map", "admin_add_tmp", "pending_remove", "reset_tokens", "auction_sessions", "auction_history", "owners", "username_to_owner")
+
+logger = logging.getLogger(__name__)
+
+_scheduler = None
+
+def backup_dir(data_file: str) -> str:
+    path = os.path.join(os.path.dirname(os.path.abspath(data_file)), "backups")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def _canonical(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+def _digest(obj: Any) -> str:
+    return hashlib.sha256(_canonical(obj)).hexdigest()
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _key_hashes(data: Dict[str, Any]) -> Dict[str, Any]:
+    hashes = {}
+    for k, v in data.items():
+        if isinstance(v, dict):
+            hashes[k] = {"items": {sk: _digest(sv) for sk, sv in v.items()}}
+        else:
+            hashes[k] = _digest(v)
+    return hashes
+
+def load_manifest(bdir: str) -> Dict[str, Any]:
+    path = os.path.join(bdir, MANIFEST_NAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if isinstance(manifest, dict):
+            manifest.setdefault("snapshots", [])
+            manifest.setdefault("deltas", [])
+            return manifest
+    except Exception:
+        pass
+    return {"schema_version": SCHEMA_VERSION, "snapshots": [], "deltas": []}
+
+def save_manifest(bdir: str, manifest: Dict[str, Any]) -> None:
+    path = os.path.join(bdir, MANIFEST_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+def validate_data(data: Any) -> List[str]:
+    if not isinstance(data, dict):
+        return ["top level is not a JSON object"]
+    problems = []
+    for k in DICT_KEYS:
+        if k in data and data[k] is not None and not isinstance(data[k], dict):
+            problems.append(f"{k} is not an object")
+    for tid, t in (data.get("tournaments") or {}).items():
+        if not isinstance(t, dict):
+            problems.append(f"tournament {tid} is not an object")
+        elif not isinstance(t.get("registrations", []), list):
+            problems.append(f"tournament {tid} registrations is not a list")
+    for cid, runs in (data.get("auction_history") or {}).items():
+        if not isinstance(runs, list):
+            problems.append(f"auction_history {cid} is not a list")
+    return problems
+
+def compute_delta(base_hashes: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    delta = {"set": {}, "set_items": {}, "del": [], "del_items": {}}
+    for k, v in data.items():
+        base = base_hashes.get(k)
+        if isinstance(v, dict) and isinstance(base, dict):
+            items = base.get("items", {})
+            changed = {sk: sv for sk, sv in v.items() if items.get(sk) != _digest(sv)}
+            removed = [sk for sk in items if sk not in v]
+            if changed:
+                delta["set_items"][k] = changed
+            if removed:
+                delta["del_items"][k] = removed
+        elif base is None or isinstance(base, dict) or base != _digest(v):
+            delta["set"][k] = v
+    delta["del"] = [k for k in base_hashes if k not in data]
+    return delta
+
+def apply_delta(base: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    data = dict(base)
+    for k in delta.get("del", []):
+        data.pop(k, None)
+    for k, v in delta.get("set", {}).items():
+        data[k] = v
+    for k, removed in delta.get("del_items", {}).items():
+        section = dict(data.get(k) or {})
+        for sk in removed:
+            section.pop(sk, None)
+        data[k] = section
+    for k, changed in delta.get("set_items", {}).items():
+        section = dict(data.get(k) or {})
+        section.update(changed)
+        data[k] = section
+    return data
+
+def _write_envelope(path: str, envelope: Dict[str, Any]) -> None:
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump(envelope, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def _read_data_file(data_file: str) -> Dict[str, Any]:
+    with open(data_file, "r", encoding="utf-8") as f:
+        data = json.load(f) or {}
+    return sharding.with_shards(data, data_file) if sharding.enabled() else data
+
+def create_snapshot(data_file: str) -> Dict[str, Any]:
+    bdir = backup_dir(data_file)
+    data = _read_data_file(data_file)
+    now = int(time.time())
+    snap_id = f"snapshot-{time.strftime('%Y%m%d-%H%M%S', time.gmtime(now))}"
+    path = os.path.join(bdir, snap_id + ".json.gz")
+    envelope = {"schema_version": SCHEMA_VERSION, "kind": "snapshot", "id": snap_id, "base": None, "created_at": now, "payload_sha256": _digest(data), "payload": data}
+    _write_envelope(path, envelope)
+    entry = {"id": snap_id, "file": os.path.basename(path), "created_at": now, "sha256": _file_sha256(path), "size": os.path.getsize(path), "key_hashes": _key_hashes(data)}
+    manifest = load_manifest(bdir)
+    manifest["schema_version"] = SCHEMA_VERSION
+    manifest["snapshots"].append(entry)
+    _prune(bdir, manifest)
+    save_manifest(bdir, manifest)
+    return {**entry, "path": path}
+
+def create_delta(data_file: str) -> Optional[Dict[str, Any]]:
+    bdir = backup_dir(data_file)
+    manifest = load_manifest(bdir)
+    if not manifest["snapshots"]:
+        return create_snapshot(data_file)
+    base = manifest["snapshots"][-1]
+    data = _read_data_file(data_file)
+    delta = compute_delta(base.get("key_hashes") or {}, data)
+    if not any(delta.values()):
+        return None
+    now = int(time.time())
+    delta_id = f"delta-{time.strftime('%Y%m%d-%H%M%S', time.gmtime(now))}"
+    path = os.path.join(bdir, delta_id + ".json.gz")
+    envelope = {"schema_version": SCHEMA_VERSION, "kind": "delta", "id": delta_id, "base": base["id"], "created_at": now, "payload_sha256": _digest(delta), "payload": delta}
+    _write_envelope(path, envelope)
+    entry = {"id": delta_id, "base": base["id"], "file": os.path.basename(path), "created_at": now, "sha256": _file_sha256(path), "size": os.path.getsize(path)}
+    manifest["deltas"].append(entry)
+    save_manifest(bdir, manifest)
+    return {**entry, "path": path}
+
+def _prune(bdir: str, manifest: Dict[str, Any]) -> None:
+    snapshots = manifest["snapshots"]
+    dropped = snapshots[:-KEEP_SNAPSHOTS] if len(snapshots) > KEEP_SNAPSHOTS else []
+    manifest["snapshots"] = snapshots[len(dropped):]
+    keep_ids = {s["id"] for s in manifest["snapshots"]}
+    stale = [d for d in manifest["deltas"] if d.get("base") not in keep_ids]
+    manifest["deltas"] = [d for d in manifest["deltas"] if d.get("base") in keep_ids]
+    for entry in dropped + stale:
+        try:
+            os.remove(os.path.join(bdir, entry["file"]))
+        except Exception:
+            pass
+
+def read_backup(path: str) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    if magic == b"\x1f\x8b":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            content = json.load(f)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            content = json.load(f)
+    if isinstance(content, dict) and "payload" in content and "kind" in content:
+        version = content.get("schema_version")
+        if not isinstance(version, int) or version > SCHEMA_VERSION:
+            raise ValueError(f"unsupported backup schema version: {version}")
+        if content.get("kind") not in ("snapshot", "delta"):
+            raise ValueError(f"unknown backup kind: {content.get('kind')}")
+        if _digest(content["payload"]) != content.get("payload_sha256"):
+            raise ValueError("backup checksum mismatch")
+        return content
+    # plain JSON database as produced by the old /backup
+    return {"schema_version": 0, "kind": "snapshot", "id": None, "base": None, "payload": content}
+
+def resolve_backup(envelope: Dict[str, Any], data_file: str) -> Dict[str, Any]:
+    if envelope["kind"] == "snapshot":
+        return envelope["payload"]
+    bdir = backup_dir(data_file)
+    manifest = load_manifest(bdir)
+    base = next((s for s in manifest["snapshots"] if s["id"] == envelope.get("base")), None)
+    if not base:
+        raise ValueError(f"base snapshot {envelope.get('base')} for this delta is not available")
+    base_path = os.path.join(bdir, base["file"])
+    if _file_sha256(base_path) != base.get("sha256"):
+        raise ValueError(f"base snapshot {base['id']} is corrupted")
+    base_env = read_backup(base_path)
+    return apply_delta(base_env["payload"], envelope["payload"])
+
+def restore_from_file(path: str, data_file: str) -> Dict[str, Any]:
+    envelope = read_backup(path)
+    data = resolve_backup(envelope, data_file)
+    problems = validate_data(data)
+    if problems:
+        raise ValueError("invalid backup: " + "; ".join(problems[:5]))
+    tmp = data_file + ".restore.swap"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, data_file)
+    if sharding.enabled():
+        sharding.restore_stores(data_file, data)
+    return data
+
+async def _scheduled(fn, data_file: str):
+    try:
+        entry = await asyncio.to_thread(fn, data_file)
+        if entry:
+            logger.info("backup written: %s (%s bytes)", entry.get("file"), entry.get("size"))
+    except Exception:
+        logger.exception("scheduled backup failed")
+
+def start_scheduler(data_file: str):
+    global _scheduler
+    if _scheduler is not None:
+        return _scheduler
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+    _scheduler = AsyncIOScheduler()
+    _scheduler.add_job(_scheduled, "interval", hours=SNAPSHOT_INTERVAL_HOURS, args=[create_snapshot, data_file], id="backup_snapshot", coalesce=True, max_instances=1)
+    _scheduler.add_job(_scheduled, "interval", minutes=DELTA_INTERVAL_MINUTES, args=[create_delta, data_file], id="backup_delta", coalesce=True, max_instances=1)
+    _scheduler.start()
+    return _scheduler
@@ -0,0 +1,331 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict, deque
+from typing import Dict, Any, List, Optional, Tuple
+
+from aiohttp import web
+from telegram.request import BaseRequest, RequestData
+
+BOT_USER = {"id": 1000001, "is_bot": True, "first_name": "Auction Test Bot", "username": "auction_test_bot", "can_join_groups": True, "can_read_all_group_messages": True, "supports_inline_queries": False}
+
+SEND_METHODS = {"sendMessage", "sendPhoto", "sendVideo", "sendAnimation", "sendDocument", "sendAudio", "sendVoice", "sendSticker", "copyMessage", "forwardMessage"}
+EDIT_METHODS = {"editMessageText", "editMessageCaption", "editMessageMedia", "editMessageReplyMarkup"}
+LIMITED_METHODS = SEND_METHODS | EDIT_METHODS | {"pinChatMessage", "unpinChatMessage", "sendMediaGroup"}
+JSON_FIELDS = {"reply_markup", "entities", "caption_entities", "media", "allowed_updates", "link_preview_options", "reply_parameters"}
+
+def decode_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    for k in list(params):
+        if k in JSON_FIELDS and isinstance(params[k], str):
+            try:
+                params[k] = json.loads(params[k])
+            except ValueError:
+                pass
+    return params
+
+class FakeBotAPI:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, rate_429: float = 0.0, retry_after: int = 1, error_rate: float = 0.0, enforce_limits: bool = False, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.enforce_limits = enforce_limits
+        self.rnd = random.Random(seed)
+        self.updates: List[Dict[str, Any]] = []
+        self.next_update_id = 1
+        self.outbound: List[Dict[str, Any]] = []
+        self.listeners = []
+        self.users: Dict[int, Dict[str, Any]] = {}
+        self.usernames: Dict[str, int] = {}
+        self.counts: Dict[str, int] = defaultdict(int)
+        self.injected = {"429": 0, "error": 0, "limit_429": 0}
+        self._message_ids: Dict[Any, int] = defaultdict(int)
+        self._chat_sends: Dict[Any, deque] = defaultdict(deque)
+        self._global_sends: deque = deque()
+        self._updates_event = asyncio.Event()
+        self._runner = None
+        self.webhook: Optional[Dict[str, Any]] = None
+        self.delivery_failures = 0
+        self._client = None
+        self._deliveries = set()
+
+    def add_user(self, user_id: int, first_name: str, username: Optional[str] = None) -> Dict[str, Any]:
+        user = {"id": user_id, "is_bot": False, "first_name": first_name}
+        if username:
+            user["username"] = username
+            self.usernames[username.lower()] = user_id
+        self.users[user_id] = user
+        return user
+
+    def _push(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        update = {"update_id": self.next_update_id, **payload}
+        self.next_update_id += 1
+        if self.webhook:
+            task = asyncio.ensure_future(self._deliver(update, self.webhook))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+            return update
+        self.updates.append(update)
+        self._updates_event.set()
+        return update
+
+    async def _deliver(self, update: Dict[str, Any], hook: Dict[str, Any]):
+        from aiohttp import ClientSession, ClientError
+        if self._client is None:
+            self._client = ClientSession()
+        headers = {"X-Telegram-Bot-Api-Secret-Token": hook["secret"]} if hook.get("secret") else {}
+        async with hook["slots"]:
+            for attempt in range(5):
+                if self.latency or self.jitter:
+                    await asyncio.sleep(max(0.0, self.latency + self.rnd.uniform(-self.jitter, self.jitter)))
+                try:
+                    async with self._client.post(hook["url"], json=update, headers=headers) as resp:
+                        if resp.status == 200:
+                            return
+                except ClientError:
+                    pass
+                self.delivery_failures += 1
+                await asyncio.sleep(min(2.0, 0.1 * 2 ** attempt))
+
+    def _chat(self, chat_id) -> Dict[str, Any]:
+        chat_id = int(chat_id)
+        if chat_id > 0:
+            user = self.users.get(chat_id) or {"first_name": f"User {chat_id}"}
+            out = {"id": chat_id, "type": "private", "first_name": user.get("first_name")}
+            if user.get("username"):
+                out["username"] = user["username"]
+            return out
+        return {"id": chat_id, "type": "supergroup", "title": f"Load test {chat_id}"}
+
+    def push_message(self, chat_id: int, user: Dict[str, Any], text: str) -> Dict[str, Any]:
+        self._message_ids[chat_id] += 1
+        message = {"message_id": self._message_ids[chat_id], "date": int(time.time()), "chat": self._chat(chat_id), "from": user, "text": text}
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return self._push({"message": message})
+
+    def push_callback(self, user: Dict[str, Any], data: str, message: Dict[str, Any]) -> Dict[str, Any]:
+        query = {"id": str(self.rnd.getrandbits(48)), "from": user, "chat_instance": str(message["chat"]["id"]), "data": data, "message": message}
+        return self._push({"callback_query": query})
+
+    def _message(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        chat_id = int(params.get("chat_id"))
+        if method in EDIT_METHODS and params.get("message_id"):
+            message_id = int(params["message_id"])
+        else:
+            self._message_ids[chat_id] += 1
+            message_id = self._message_ids[chat_id]
+        message = {"message_id": message_id, "date": int(time.time()), "chat": self._chat(chat_id), "from": BOT_USER}
+        if params.get("text") is not None:
+            message["text"] = params["text"]
+        if params.get("caption") is not None:
+            message["caption"] = params["caption"]
+        if method == "sendVideo" or (method == "editMessageMedia" and (params.get("media") or {}).get("type") == "video"):
+            fid = params.get("video") if isinstance(params.get("video"), str) else f"video-{message_id}"
+            message["video"] = {"file_id": fid, "file_unique_id": fid[-16:], "width": 640, "height": 360, "duration": 5}
+        elif method == "sendPhoto" or method == "editMessageMedia":
+            fid = params.get("photo") if isinstance(params.get("photo"), str) else f"photo-{message_id}"
+            message["photo"] = [{"file_id": fid, "file_unique_id": fid[-16:], "width": 640, "height": 360}]
+        if isinstance(params.get("reply_markup"), dict):
+            message["reply_markup"] = params["reply_markup"]
+        return message
+
+    def _limit_wait(self, chat_id, now: float) -> float:
+        window, limit = (1.0, 1) if chat_id is not None and int(chat_id) > 0 else (60.0, 20)
+        sends = self._chat_sends[chat_id] if chat_id is not None else None
+        waits = []
+        while self._global_sends and now - self._global_sends[0] >= 1.0:
+            self._global_sends.popleft()
+        if len(self._global_sends) >= 30:
+            waits.append(1.0 - (now - self._global_sends[0]))
+        if sends is not None:
+            while sends and now - sends[0] >= window:
+                sends.popleft()
+            if len(sends) >= limit:
+                waits.append(window - (now - sends[0]))
+        if waits:
+            return max(waits)
+        self._global_sends.append(now)
+        if sends is not None:
+            sends.append(now)
+        return 0.0
+
+    def _result(self, method: str, params: Dict[str, Any]):
+        if method == "getMe":
+            return BOT_USER
+        if method == "getUpdates":
+            return None
+        if method == "setWebhook":
+            self.webhook = {"url": params.get("url"), "secret": params.get("secret_token"), "slots": asyncio.Semaphore(int(params.get("max_connections") or 40))}
+            return True
+        if method == "deleteWebhook":
+            self.webhook = None
+            return True
+        if method == "getWebhookInfo":
+            return {"url": (self.webhook or {}).get("url") or "", "has_custom_certificate": False, "pending_update_count": len(self.updates) + len(self._deliveries)}
+        if method == "getChat":
+            chat_id = params.get("chat_id")
+            if isinstance(chat_id, str) and chat_id.startswith("@"):
+                uid = self.usernames.get(chat_id[1:].lower())
+                if uid is None:
+                    raise LookupError("Bad Request: chat not found")
+                chat_id = uid
+            return self._chat(chat_id)
+        if method == "getChatMember":
+            return {"status": "administrator", "user": self.users.get(int(params.get("user_id", 0))) or BOT_USER, "can_be_edited": False, "is_anonymous": False,
+                    "can_manage_chat": True, "can_delete_messages": True, "can_manage_video_chats": True, "can_restrict_members": True, "can_promote_members": False,
+                    "can_change_info": True, "can_invite_users": True, "can_post_stories": False, "can_edit_stories": False, "can_delete_stories": False, "can_pin_messages": True}
+        if method == "getUserProfilePhotos":
+            return {"total_count": 0, "photos": []}
+        if method == "getFile":
+            fid = str(params.get("file_id"))
+            return {"file_id": fid, "file_unique_id": fid[-16:], "file_size": 1024, "file_path": f"files/{fid[-16:]}"}
+        if method in SEND_METHODS or method in EDIT_METHODS:
+            if method == "editMessageReplyMarkup" and not params.get("chat_id"):
+                return True
+            return self._message(method, params)
+        return True
+
+    async def _params(self, request: web.Request) -> Dict[str, Any]:
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = {}
+            for k, v in (await request.post()).items():
+                params[k] = v if isinstance(v, str) else f"upload-{k}"
+        return decode_params(params)
+
+    async def _get_updates(self, params: Dict[str, Any]):
+        offset = int(params.get("offset") or 0)
+        timeout = float(params.get("timeout") or 0)
+        if offset:
+            self.updates = [u for u in self.updates if u["update_id"] >= offset]
+        if not self.updates and timeout > 0:
+            self._updates_event.clear()
+            try:
+                await asyncio.wait_for(self._updates_event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return list(self.updates[: int(params.get("limit") or 100)])
+
+    def _error(self, code: int, description: str, retry_after: Optional[int] = None) -> Tuple[int, Dict[str, Any]]:
+        body = {"ok": False, "error_code": code, "description": description}
+        if retry_after is not None:
+            body["parameters"] = {"retry_after": retry_after}
+        return code, body
+
+    async def call(self, method: str, params: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        self.counts[method] += 1
+        if method == "getUpdates":
+            if self.webhook:
+                return self._error(409, "Conflict: can't use getUpdates method while webhook is active; use deleteWebhook to delete the webhook first")
+            updates = await self._get_updates(params)
+            if updates and (self.latency or self.jitter):
+                await asyncio.sleep(max(0.0, self.latency + self.rnd.uniform(-self.jitter, self.jitter)))
+            return 200, {"ok": True, "result": updates}
+        if self.latency or self.jitter:
+            await asyncio.sleep(max(0.0, self.latency + self.rnd.uniform(-self.jitter, self.jitter)))
+        if method in LIMITED_METHODS:
+            if self.enforce_limits:
+                wait = self._limit_wait(params.get("chat_id"), time.monotonic())
+                if wait > 0:
+                    self.injected["limit_429"] += 1
+                    ra = max(1, int(wait + 0.999))
+                    return self._error(429, f"Too Many Requests: retry after {ra}", ra)
+            if self.rate_429 and self.rnd.random() < self.rate_429:
+                self.injected["429"] += 1
+                return self._error(429, f"Too Many Requests: retry after {self.retry_after}", self.retry_after)
+            if self.error_rate and self.rnd.random() < self.error_rate:
+                self.injected["error"] += 1
+                return self._error(400, "Bad Request: simulated failure")
+        try:
+            result = self._result(method, params)
+        except LookupError as e:
+            return self._error(400, str(e))
+        if method in LIMITED_METHODS:
+            record = {"t": time.monotonic(), "method": method, "chat_id": params.get("chat_id"), "text": params.get("text") or params.get("caption") or "",
+                      "message": result if isinstance(result, dict) else None, "reply_to": (params.get("reply_parameters") or {}).get("message_id") or params.get("reply_to_message_id")}
+            self.outbound.append(record)
+            for listener in list(self.listeners):
+                listener(record)
+        return 200, {"ok": True, "result": result}
+
+    async def handle(self, request: web.Request) -> web.Response:
+        params = await self._params(request)
+        status, body = await self.call(request.match_info["method"], params)
+        return web.json_response(body, status=status)
+
+    async def handle_file(self, request: web.Request) -> web.Response:
+        return web.Response(body=b"\x00" * 16)
+
+    def request(self) -> "LocalRequest":
+        return LocalRequest(self)
+
+    def make_app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        app.router.add_get("/bot{token}/{method}", self.handle)
+        app.router.add_get("/file/bot{token}/{path:.*}", self.handle_file)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        for task in list(self._deliveries):
+            task.cancel()
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+class LocalRequest(BaseRequest):
+    """Answers python-telegram-bot requests from a FakeBotAPI without going over HTTP."""
+
+    def __init__(self, api: FakeBotAPI):
+        self.api = api
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(self, url: str, method: str, request_data: Optional[RequestData] = None, read_timeout=None, write_timeout=None, connect_timeout=None, pool_timeout=None) -> Tuple[int, bytes]:
+        if "/file/bot" in url:
+            return 200, b"\x00" * 16
+        params = decode_params(dict(request_data.json_parameters)) if request_data else {}
+        status, body = await self.api.call(url.rsplit("/", 1)[-1], params)
+        return status, json.dumps(body).encode("utf-8")
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Telegram Bot API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every call")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of send/edit calls answered with RetryAfter")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of send/edit calls answered with 400")
+    parser.add_argument("--enforce-limits", action="store_true", help="answer 429 when Telegram's per-chat/global limits are exceeded")
+    args = parser.parse_args()
+    api = FakeBotAPI(args.latency, args.jitter, args.rate_429, args.retry_after, args.error_rate, args.enforce_limits)
+    print(f"Fake Bot API on http://{args.host}:{args.port} (set BOT_API_BASE_URL to this)")
+    web.run_app(api.make_app(), host=args.host, port=args.port, access_log=None, print=None)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Any, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bot_api import FakeBotAPI
+
+CHAT_ID = -1002000000000
+HOST_ID = 510000000
+OWNER_BASE = 610000000
+TEAMS = 8
+LOADED_PLAYERS = 300
+SOLD_PER_RUN = 60
+BIDS_PER_SOLD = 5
+
+def _players_from_regs(regs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{"user_id": r["user_id"], "username": r["username"], "name": r["name"], "role": r["role"], "player_code": r["player_code"], "base_price": 10} for r in regs]
+
+def make_db(registrations: int, runs: int, seed: int = 7) -> Dict[str, Any]:
+    import models
+    rnd = random.Random(seed)
+    roles = ["Batter", "Bowler", "All-rounder", "Wicket-keeper"]
+    regs = [{"id": f"r{i:06d}", "user_id": 800000000 + i, "name": f"Bench Player {i}", "username": f"bench_{i}", "role": rnd.choice(roles), "price": "10",
+             "status": "accepted", "player_code": f"{i:05d}"} for i in range(registrations)]
+    owners = [OWNER_BASE + t for t in range(TEAMS)]
+    history = []
+    t0 = int(time.time()) - runs * 86400
+    for r in range(runs):
+        events = models.EventLog()
+        sold = []
+        for i, p in enumerate(_players_from_regs(rnd.sample(regs, min(SOLD_PER_RUN, len(regs))))):
+            ts = t0 + r * 86400 + i * 60
+            amount = 10
+            for b in range(BIDS_PER_SOLD):
+                amount += rnd.choice([1, 2, 5])
+                events.append("bid", ts + b, p, amount, user_id=owners[b % TEAMS])
+            buyer = owners[(BIDS_PER_SOLD - 1) % TEAMS]
+            events.append("sold", ts + BIDS_PER_SOLD, p, amount, buyer_id=buyer)
+            sold.append({"player_id": p["user_id"], "player_name": p["name"], "price": amount, "buyer_id": buyer, "ts": ts + BIDS_PER_SOLD})
+        history.append({"run_id": f"{t0 + r * 86400}-bench{r:04d}", "chat_id": CHAT_ID, "started_at": t0 + r * 86400, "ended_at": t0 + r * 86400 + 7200,
+                        "host_id": HOST_ID, "tables": TEAMS, "teams": {}, "budget": 1000, "players_loaded": LOADED_PLAYERS, "current_slot": None,
+                        "sold_players": sold, "unsold_players": [], "logs": [], "events": events.to_dict(), "attempts": {}})
+    db = {
+        "tournaments": {"bench": {"id": "bench", "name": "Bench Cup", "is_posted": True, "registration_open": True, "registrations": regs, "pending": {}}},
+        "started_users": {}, "known_groups": {}, "mg_map": {},
+        "auction_history": {str(CHAT_ID): history},
+        "auction_sessions": {},
+    }
+    return db
+
+def seed_session(auction, players: List[Dict[str, Any]]):
+    session = auction.get_session(CHAT_ID)
+    session.update({
+        "active": True, "host_id": HOST_ID, "host_name": "Host", "tables": TEAMS,
+        "teams": {f"Team {t + 1}": [OWNER_BASE + t] for t in range(TEAMS)},
+        "team_budgets": {f"Team {t + 1}": 10_000_000 for t in range(TEAMS)},
+        "budget": 10_000_000, "countdown_seconds": 30, "bid_confirm_window": 0,
+        "players_list": auction._normalize_loaded_players([dict(p) for p in players]),
+        "players_version": 1,
+    })
+    auction.start_new_run(CHAT_ID, session)
+    auction.save_session(CHAT_ID, session)
+
+def arm_slot(auction, player: Dict[str, Any], expired: bool = False):
+    session = auction.get_session(CHAT_ID)
+    now = int(time.time())
+    slot = {"player": dict(player), "start_price": 10, "deadline": now - 1 if expired else now + 300, "highest": None, "last_bid": None, "mg_message": None, "started_at": now, "announced": {}}
+    if expired:
+        slot["highest"] = {"user_id": OWNER_BASE, "amount": 25, "name": "Owner", "ts": now}
+        slot["last_bid"] = dict(slot["highest"])
+    session["current_slot"] = slot
+    auction.save_session(CHAT_ID, session)
+    run = auction.get_run(CHAT_ID, session.get("current_run_id"))
+    if run:
+        run["current_slot"] = dict(slot)
+        auction.save_run(CHAT_ID, run)
+
+class Bench:
+    def __init__(self, app, api: FakeBotAPI):
+        self.app = app
+        self.api = api
+        self.msg_id = 0
+
+    def update(self, chat_id: int, user: Dict[str, Any], text: str, reply_text: str = None):
+        from telegram import Update
+        self.msg_id += 1
+        chat = {"id": chat_id, "type": "private", "first_name": user["first_name"]} if chat_id > 0 else {"id": chat_id, "type": "supergroup", "title": "Bench"}
+        message = {"message_id": self.msg_id, "date": int(time.time()), "chat": chat, "from": user, "text": text,
+                   "entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]}
+        if reply_text is not None:
+            message["reply_to_message"] = {"message_id": self.msg_id - 1, "date": int(time.time()), "chat": chat, "from": user, "text": reply_text}
+        return Update.de_json({"update_id": self.msg_id, "message": message}, self.app.bot)
+
+    def context(self, update):
+        from telegram.ext import CallbackContext
+        return CallbackContext.from_update(update, self.app)
+
+    async def run(self, handler, update):
+        await handler(update, self.context(update))
+
+async def timed(fn, setup=None, min_iterations: int = 3, max_iterations: int = 30, budget: float = 2.0) -> Dict[str, Any]:
+    samples = []
+    spent = 0.0
+    while len(samples) < max_iterations and (len(samples) < min_iterations or spent < budget):
+        if setup:
+            await setup()
+        t = time.perf_counter()
+        await fn()
+        dt = time.perf_counter() - t
+        samples.append(dt)
+        spent += dt
+    return {"iterations": len(samples), "min_ms": round(min(samples) * 1000, 3), "median_ms": round(statistics.median(samples) * 1000, 3),
+            "mean_ms": round(statistics.mean(samples) * 1000, 3), "max_ms": round(max(samples) * 1000, 3)}
+
+async def run_size(registrations: int, runs: int, args) -> List[Dict[str, Any]]:
+    import auction
+    import gaming
+    import side_effects
+    from telegram.ext import ApplicationBuilder, BaseRateLimiter
+
+    class PassThrough(BaseRateLimiter):
+        async def initialize(self):
+            pass
+
+        async def shutdown(self):
+            pass
+
+        async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+            return await callback(*args, **kwargs)
+
+    db = make_db(registrations, runs)
+    auction.save_db(db)
+    gaming.DATA.clear()
+    gaming.DATA.update(auction.load_db())
+    gaming.rebuild_indexes()
+    for cache in (auction.player_tables, auction.completion_trackers, auction.auto_queues, auction.prepared_slots):
+        cache.clear()
+
+    api = FakeBotAPI()
+    app = ApplicationBuilder().token("123456:BENCH").request(api.request()).get_updates_request(api.request()).rate_limiter(PassThrough()).build()
+    await app.initialize()
+    bench = Bench(app, api)
+    host = api.add_user(HOST_ID, "Host", "bench_host")
+    owners = [api.add_user(OWNER_BASE + t, f"Owner {t}", f"bench_owner_{t}") for t in range(TEAMS)]
+    regs = db["tournaments"]["bench"]["registrations"]
+    for r in regs[:LOADED_PLAYERS]:
+        api.add_user(r["user_id"], r["name"], r["username"])
+    players = _players_from_regs(regs[:LOADED_PLAYERS])
+    seed_session(auction, players)
+    rnd = random.Random(registrations * 1000 + runs)
+    out = []
+
+    def record(name: str, stats: Dict[str, Any]):
+        out.append({"bench": name, "registrations": registrations, "runs": runs, "db_bytes": os.path.getsize(auction.DB_PATH), **stats})
+        print(f"{name:<24} regs={registrations:<6} runs={runs:<4} median={stats['median_ms']:>10.2f} ms  (n={stats['iterations']})", flush=True)
+
+    kw = {"min_iterations": args.min_iterations, "max_iterations": args.max_iterations, "budget": args.budget}
+
+    async def storage():
+        auction.save_db(auction.load_db())
+    record("save_db+load_db", await timed(storage, **kw))
+
+    async def find_player():
+        p = rnd.choice(players)
+        await auction.find_player_async(auction.get_session(CHAT_ID), "@" + p["username"], CHAT_ID, bench.context(bench.update(CHAT_ID, host, "/next")))
+    record("find_player_async", await timed(find_player, **kw))
+
+    async def status():
+        p = rnd.choice(players)
+        await bench.run(auction.status_cmd, bench.update(CHAT_ID, host, f"/status @{p['username']}"))
+    record("status_cmd", await timed(status, **kw))
+
+    load_text = "\n".join(f"@{r['username']}" for r in rnd.sample(regs, min(100, len(regs))))
+
+    async def load():
+        await bench.run(auction.load_cmd, bench.update(CHAT_ID, host, "/load", reply_text=load_text))
+    record("load_cmd(100 names)", await timed(load, **kw))
+    seed_session(auction, players)
+
+    bid_state = {"amount": 10, "turn": 0}
+
+    async def bid_setup():
+        if not auction.get_session(CHAT_ID).get("current_slot"):
+            arm_slot(auction, rnd.choice(players))
+            bid_state["amount"] = 10
+
+    async def bid():
+        bid_state["amount"] += 1
+        bid_state["turn"] += 1
+        await bench.run(auction.bid_cmd, bench.update(CHAT_ID, owners[bid_state["turn"] % TEAMS], f"/bid {bid_state['amount']}"))
+    record("bid_cmd", await timed(bid, setup=bid_setup, **kw))
+
+    async def finalize_setup():
+        session = auction.get_session(CHAT_ID)
+        session["current_slot"] = None
+        auction.save_session(CHAT_ID, session)
+        arm_slot(auction, rnd.choice(players), expired=True)
+
+    async def finalize():
+        ok, reason = await auction._finalize_current_slot(CHAT_ID, bench.context(bench.update(CHAT_ID, host, "/bid end")))
+        assert ok, reason
+    record("_finalize_current_slot", await timed(finalize, setup=finalize_setup, **kw))
+
+    reg_state = {"uid": 900000000}
+
+    async def register():
+        reg_state["uid"] += 1
+        user = api.add_user(reg_state["uid"], "New Player", f"new_{reg_state['uid']}")
+        await bench.run(gaming.register_cmd, bench.update(reg_state["uid"], user, "/register"))
+    record("register_cmd", await timed(register, **kw))
+
+    while side_effects.pending():
+        await asyncio.sleep(0.05)
+    await app.shutdown()
+    return out
+
+def _git_rev() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=10).stdout.strip()
+    except Exception:
+        return ""
+
+async def main_async(args) -> Dict[str, Any]:
+    results = []
+    for registrations in args.registrations:
+        for runs in args.runs:
+            results.extend(await run_size(registrations, runs, args))
+    return {"meta": {"git_rev": _git_rev(), "python": platform.python_version(), "platform": platform.platform(), "created_at": int(time.time())}, "results": results}
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the auction hot paths against synthetic databases of increasing size")
+    parser.add_argument("--registrations", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--runs", type=int, nargs="+", default=[1, 10, 100], help="historical auction runs in the database")
+    parser.add_argument("--min-iterations", type=int, default=3)
+    parser.add_argument("--max-iterations", type=int, default=30)
+    parser.add_argument("--budget", type=float, default=2.0, help="seconds to spend per benchmark once min iterations are done")
+    parser.add_argument("--output", default=None, help="JSON results file (default: hotpaths-<git rev>.json in the current directory)")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output or f"hotpaths-{_git_rev() or 'local'}.json")
+    logging.basicConfig(level=logging.ERROR)
+    os.environ.setdefault("BOT_TOKEN", "123456:BENCH")
+    os.chdir(tempfile.mkdtemp(prefix="auction-hotpaths-"))
+    report = asyncio.run(main_async(args))
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, Any, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bot_api import FakeBotAPI
+
+CONFIRM_RE = re.compile(r"Bid Confirmed Price : Cr\. ([\d.]+)")
+
+def _pct(values: List[float], q: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 1)
+
+class Harness:
+    def __init__(self, api: FakeBotAPI, args):
+        self.api = api
+        self.args = args
+        self.pending: Dict[Any, float] = {}
+        self.latencies: List[float] = []
+        self.bids_sent = 0
+        self.drift: List[float] = []
+        self.slots = 0
+        self.bid_phase = 0.0
+        self.countdown = args.countdown
+        self.waiters = defaultdict(list)
+        api.listeners.append(self.on_outbound)
+
+    def on_outbound(self, record: Dict[str, Any]):
+        chat_id = int(record["chat_id"]) if record.get("chat_id") is not None else None
+        for m in CONFIRM_RE.finditer(record["text"]):
+            sent = self.pending.pop((chat_id, float(m.group(1))), None)
+            if sent is not None:
+                self.latencies.append(record["t"] - sent)
+        for pred, fut in list(self.waiters[chat_id]):
+            if not fut.done() and pred(record):
+                fut.set_result(record)
+
+    async def wait_for(self, chat_id: int, pred, timeout: float):
+        fut = asyncio.get_running_loop().create_future()
+        entry = (pred, fut)
+        self.waiters[chat_id].append(entry)
+        try:
+            return await asyncio.wait_for(fut, timeout)
+        finally:
+            self.waiters[chat_id].remove(entry)
+
+    def seed(self, auction, chat_id: int, host: Dict[str, Any], owners: List[Dict[str, Any]], players: List[Dict[str, Any]]):
+        session = auction.get_session(chat_id)
+        session.update({
+            "active": True, "host_id": host["id"], "host_name": host["first_name"], "tables": len(owners),
+            "teams": {f"Team {i + 1}": [o["id"]] for i, o in enumerate(owners)},
+            "team_budgets": {f"Team {i + 1}": 1_000_000 for i in range(len(owners))},
+            "budget": 1_000_000, "countdown_seconds": self.args.countdown,
+            "players_list": auction._normalize_loaded_players([dict(p) for p in players]),
+            "players_version": 1,
+        })
+        # the bot clamps the countdown, so measure drift against what it will actually use
+        self.countdown = auction.get_countdown(session)
+        if self.args.confirm_window is not None:
+            session["bid_confirm_window"] = self.args.confirm_window
+        auction.start_new_run(chat_id, session)
+        auction.save_session(chat_id, session)
+
+    async def drive_chat(self, chat_id: int, host: Dict[str, Any], owners: List[Dict[str, Any]], players: List[Dict[str, Any]]):
+        interval = 1.0 / self.args.bids_per_second
+        for p in players[: self.args.slots]:
+            card_wait = asyncio.ensure_future(self.wait_for(chat_id, lambda r: "auto_start:" in json.dumps((r.get("message") or {}).get("reply_markup") or {}), 30))
+            self.api.push_message(chat_id, host, f"/next @{p['username']} 10")
+            card = await card_wait
+            data = next(b["callback_data"] for row in card["message"]["reply_markup"]["inline_keyboard"] for b in row if b.get("callback_data", "").startswith("auto_start:"))
+            live_wait = asyncio.ensure_future(self.wait_for(chat_id, lambda r: "NEW PLAYER FOR AUCTION" in r["text"], 30))
+            self.api.push_callback(host, data, card["message"])
+            await live_wait
+            amount = 10
+            phase_start = last_bid_at = time.monotonic()
+            for i in range(self.args.bids_per_slot):
+                amount += 1
+                bidder = owners[i % len(owners)]
+                self.pending[(chat_id, float(amount))] = time.monotonic()
+                self.api.push_message(chat_id, bidder, f"/bid {amount}")
+                self.bids_sent += 1
+                last_bid_at = time.monotonic()
+                await asyncio.sleep(interval)
+            self.bid_phase += time.monotonic() - phase_start
+            result = await self.wait_for(chat_id, lambda r: "PLAYER SOLD" in r["text"] or "PLAYER UNSOLD" in r["text"], self.countdown + 30)
+            self.drift.append(result["t"] - (last_bid_at + self.countdown))
+            self.slots += 1
+
+async def run(args) -> Dict[str, Any]:
+    api = FakeBotAPI(args.latency, args.jitter, args.rate_429, args.retry_after, args.error_rate, args.enforce_limits, seed=1)
+    base_url = await api.start()
+    os.environ["BOT_TOKEN"] = "123456:LOADTEST"
+    os.environ["BOT_API_BASE_URL"] = base_url
+    import gaming
+    import auction
+    app = gaming.build_app()
+    await app.initialize()
+    if app.post_init:
+        await app.post_init(app)
+    await app.start()
+    await app.updater.start_polling(poll_interval=0.0, timeout=10)
+
+    harness = Harness(api, args)
+    chats = []
+    for c in range(args.chats):
+        chat_id = -1001000000000 - c
+        host = api.add_user(500000000 + c, f"Host {c}", f"host_{c}")
+        owners = [api.add_user(600000000 + c * 1000 + t, f"Owner {c}-{t}", f"owner_{c}_{t}") for t in range(args.teams)]
+        players = []
+        for i in range(args.slots):
+            uid = 700000000 + c * 1000 + i
+            api.add_user(uid, f"Player {c}-{i}", f"player_{c}_{i}")
+            players.append({"user_id": uid, "username": f"player_{c}_{i}", "name": f"Player {c}-{i}", "role": "Batter", "base_price": 10})
+        harness.seed(auction, chat_id, host, owners, players)
+        chats.append((chat_id, host, owners, players))
+
+    started = time.monotonic()
+    outbound_before = len(api.outbound)
+    results = await asyncio.gather(*(harness.drive_chat(*c) for c in chats), return_exceptions=True)
+    elapsed = time.monotonic() - started
+    errors = [repr(r) for r in results if isinstance(r, Exception)]
+    await asyncio.sleep(1)
+
+    await app.updater.stop()
+    await app.stop()
+    await app.shutdown()
+    await api.stop()
+
+    sent = len(api.outbound) - outbound_before
+    bidding_time = harness.bid_phase / max(1, args.chats)
+    return {
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "effective_countdown": harness.countdown,
+        "elapsed_seconds": round(elapsed, 2),
+        "slots_completed": harness.slots,
+        "bids_sent": harness.bids_sent,
+        "bids_confirmed": len(harness.latencies),
+        "bids_per_second": round(harness.bids_sent / bidding_time, 2) if bidding_time else None,
+        "confirm_latency_ms": {"p50": _pct(harness.latencies, 0.5), "p99": _pct(harness.latencies, 0.99), "max": _pct(harness.latencies, 1.0)},
+        "countdown_drift_ms": {"p50": _pct(harness.drift, 0.5), "max": _pct(harness.drift, 1.0), "mean": round(statistics.mean(harness.drift) * 1000, 1) if harness.drift else None},
+        "messages_per_slot": round(sent / harness.slots, 2) if harness.slots else None,
+        "api_calls": dict(sorted(api.counts.items())),
+        "injected": api.injected,
+        "gateway": gaming.OUTBOUND.stats(),
+        "errors": errors,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive scripted auctions against a local fake Bot API")
+    parser.add_argument("--chats", type=int, default=2)
+    parser.add_argument("--teams", type=int, default=4)
+    parser.add_argument("--slots", type=int, default=2, help="players auctioned per chat")
+    parser.add_argument("--bids-per-slot", type=int, default=10)
+    parser.add_argument("--bids-per-second", type=float, default=2.0, help="bids per second in each chat")
+    parser.add_argument("--countdown", type=int, default=15)
+    parser.add_argument("--confirm-window", type=float, default=None, help="override the bid confirmation batching window")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--enforce-limits", action="store_true")
+    parser.add_argument("--workdir", default=None, help="directory for the bot's data files (default: fresh temp dir)")
+    parser.add_argument("--output", default=None, help="write the JSON report here")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="auction-loadtest-")
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    report = asyncio.run(run(args))
+    report["workdir"] = workdir
+    out = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(out)
+    print(out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models
+
+def make_players(n: int, seed: int):
+    rnd = random.Random(seed)
+    roles = ["Batter", "Bowler", "All-rounder", "Wicket-keeper"]
+    return [{"pid": f"{seed:03d}{i:05d}", "user_id": 10_000_000 + seed * 1000 + i, "username": f"player_{seed}_{i}", "name": f"Player {i}", "role": rnd.choice(roles),
+             "player_code": f"P{i:04d}", "base_price": 10, "profile_username": f"player_{seed}_{i}", "profile_fullname": f"Player Number {i}"} for i in range(n)]
+
+def make_logs(players, bids_per_slot: int, seed: int):
+    rnd = random.Random(seed)
+    ts = int(time.time())
+    logs = []
+    for p in players:
+        amount = 10
+        for _ in range(rnd.randint(0, bids_per_slot * 2)):
+            amount += rnd.choice([1, 2, 5])
+            ts += rnd.randint(1, 5)
+            logs.append({"event": "bid", "user_id": 20_000_000 + rnd.randint(0, 15), "amount": amount, "player": dict(p), "ts": ts})
+        if amount > 10:
+            logs.append({"event": "sold", "player": dict(p), "price": amount, "buyer_id": 20_000_000 + rnd.randint(0, 15), "ts": ts})
+        else:
+            logs.append({"event": "unsold", "player": dict(p), "base_price": 10, "ts": ts})
+    return logs
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.take_snapshot()
+    obj = build()
+    gc.collect()
+    used = sum(s.size_diff for s in tracemalloc.take_snapshot().compare_to(start, "filename"))
+    tracemalloc.stop()
+    return obj, used
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory footprint of auction run event logs: dict entries vs columnar models.EventLog")
+    parser.add_argument("--auctions", type=int, default=100)
+    parser.add_argument("--players", type=int, default=120)
+    parser.add_argument("--bids", type=int, default=6, help="average bids per slot")
+    args = parser.parse_args()
+
+    stored = []
+    for a in range(args.auctions):
+        players = make_players(args.players, a)
+        stored.append(make_logs(players, args.bids, a))
+    events = sum(len(l) for l in stored)
+    old_json = [json.dumps(l) for l in stored]
+    new_json = [json.dumps(models.EventLog.from_logs(l).to_dict()) for l in stored]
+    del stored
+
+    old, old_bytes = measure(lambda: [json.loads(s) for s in old_json])
+    del old
+    new, new_bytes = measure(lambda: [models.EventLog.from_dict(json.loads(s)) for s in new_json])
+    del new
+
+    result = {
+        "auctions": args.auctions,
+        "events": events,
+        "dict_logs": {"heap_bytes": old_bytes, "stored_bytes": sum(len(s) for s in old_json)},
+        "event_log": {"heap_bytes": new_bytes, "stored_bytes": sum(len(s) for s in new_json)},
+    }
+    result["heap_ratio"] = round(new_bytes / old_bytes, 3) if old_bytes else None
+    result["stored_ratio"] = round(result["event_log"]["stored_bytes"] / result["dict_logs"]["stored_bytes"], 3)
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
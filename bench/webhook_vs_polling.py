@@ -0,0 +1,149 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Any, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bot_api import FakeBotAPI
+
+SECRET = "bench-secret"
+
+def _pct(values: List[float], q: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def run_mode(args) -> Dict[str, Any]:
+    from aiohttp import ClientSession
+    api = FakeBotAPI(args.latency, args.jitter, seed=3)
+    base_url = await api.start()
+    os.environ["BOT_TOKEN"] = "123456:WEBHOOKBENCH"
+    os.environ["BOT_API_BASE_URL"] = base_url
+    os.environ["WEBHOOK_SECRET"] = SECRET
+    os.environ["WEBHOOK_CONCURRENCY"] = str(args.concurrency)
+    os.environ.setdefault("METRICS_PORT", "0")
+    import gaming
+    import webhook
+    app = gaming.build_app()
+    extra: Dict[str, Any] = {}
+    stop = asyncio.Event()
+    if args.mode == "webhook":
+        port = _free_port()
+        url = f"http://127.0.0.1:{port}{webhook.WEBHOOK_PATH}"
+        server = asyncio.create_task(webhook.serve(app, url=url, host="127.0.0.1", port=port, stop_event=stop))
+        for _ in range(200):
+            if api.webhook or server.done():
+                break
+            await asyncio.sleep(0.05)
+        if server.done():
+            server.result()
+        async with ClientSession() as http:
+            async with http.post(url, json={"update_id": 1}, headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"}) as resp:
+                extra["bad_secret_status"] = resp.status
+            async with http.get(f"http://127.0.0.1:{port}/healthz") as resp:
+                extra["healthz_status"] = resp.status
+    else:
+        await app.initialize()
+        if app.post_init:
+            await app.post_init(app)
+        await app.start()
+        await app.updater.start_polling(poll_interval=0.0, timeout=10)
+
+    pushed: Dict[Any, float] = {}
+    latencies: List[float] = []
+    done = asyncio.Event()
+
+    def on_outbound(record):
+        key = (int(record["chat_id"]), record.get("reply_to"))
+        sent = pushed.pop(key, None)
+        if sent is not None:
+            latencies.append(record["t"] - sent)
+            if len(latencies) >= args.updates:
+                done.set()
+    api.listeners.append(on_outbound)
+
+    users = [api.add_user(520000000 + i, f"Bidder {i}", f"bench_bidder_{i}") for i in range(args.chats)]
+    interval = 1.0 / args.rate
+    started = time.monotonic()
+    for i in range(args.updates):
+        c = i % args.chats
+        chat_id = -1003000000000 - c
+        update = api.push_message(chat_id, users[c], "/bid 10")
+        pushed[(chat_id, update["message"]["message_id"])] = time.monotonic()
+        await asyncio.sleep(interval)
+    try:
+        await asyncio.wait_for(done.wait(), args.timeout)
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.monotonic() - started
+
+    if args.mode == "webhook":
+        stop.set()
+        await server
+    else:
+        await app.updater.stop()
+        await app.stop()
+        await app.shutdown()
+    await api.stop()
+    return {
+        "mode": args.mode,
+        "updates": args.updates,
+        "answered": len(latencies),
+        "elapsed_seconds": round(elapsed, 2),
+        "latency_ms": {"p50": _pct(latencies, 0.5), "p99": _pct(latencies, 0.99), "max": _pct(latencies, 1.0),
+                       "mean": round(statistics.mean(latencies) * 1000, 2) if latencies else None},
+        "get_updates_calls": api.counts.get("getUpdates", 0),
+        "webhook_delivery_failures": api.delivery_failures,
+        **extra,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare update-to-reply latency in polling and webhook mode against the fake Bot API")
+    parser.add_argument("--mode", choices=["polling", "webhook", "both"], default="both")
+    parser.add_argument("--updates", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=50.0, help="updates per second")
+    parser.add_argument("--chats", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.03, help="simulated network latency per hop")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--concurrency", type=int, default=40)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    if args.mode != "both":
+        os.chdir(tempfile.mkdtemp(prefix=f"auction-{args.mode}-"))
+        print(json.dumps(asyncio.run(run_mode(args))))
+        return
+    results = {}
+    for mode in ("polling", "webhook"):
+        cmd = [sys.executable, os.path.abspath(__file__), "--mode", mode] + [a for a in sys.argv[1:] if a != "--output" and not a.endswith(".json")]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            results[mode] = {"error": proc.stderr.strip().splitlines()[-1:] }
+            continue
+        results[mode] = json.loads(proc.stdout.strip().splitlines()[-1])
+    out = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(out)
+    print(out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import time
+from typing import Dict, Any, Awaitable, Optional
+
+from telegram.ext import BaseUpdateProcessor
+
+import metrics
+
+UPDATE_WORKERS = int(os.environ.get("UPDATE_WORKERS", "16"))
+UPDATE_MAX_PENDING = int(os.environ.get("UPDATE_MAX_PENDING", "256"))
+
+def chat_key(update: object) -> Optional[str]:
+    chat = getattr(update, "effective_chat", None)
+    if chat is not None:
+        return f"chat:{chat.id}"
+    user = getattr(update, "effective_user", None)
+    if user is not None:
+        return f"user:{user.id}"
+    return None
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Runs updates from different chats concurrently on a bounded pool while
+    keeping updates from the same chat strictly in arrival order."""
+
+    def __init__(self, workers: int = UPDATE_WORKERS, max_pending: int = UPDATE_MAX_PENDING):
+        super().__init__(max(1, workers))
+        self.max_pending = max(self.max_concurrent_updates, max_pending)
+        self._admission = asyncio.Semaphore(self.max_pending)
+        self._chats: Dict[str, asyncio.Lock] = {}
+        self._queued: Dict[str, int] = {}
+        self.stats = {"processed": 0, "failed": 0, "max_chat_backlog": 0}
+
+    async def admit(self):
+        await self._admission.acquire()
+
+    def pending(self) -> int:
+        return self.max_pending - self._admission._value
+
+    def chats_waiting(self) -> int:
+        return sum(1 for n in self._queued.values() if n > 1)
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        admitted = time.perf_counter()
+        key = chat_key(update)
+        lock = None
+        if key is not None:
+            lock = self._chats.get(key)
+            if lock is None:
+                lock = self._chats[key] = asyncio.Lock()
+            self._queued[key] = self._queued.get(key, 0) + 1
+            self.stats["max_chat_backlog"] = max(self.stats["max_chat_backlog"], self._queued[key])
+        try:
+            # the chat lock is taken before a worker slot so a backlog in one chat
+            # holds at most one worker and never starves the other chats
+            if lock is not None:
+                await lock.acquire()
+            try:
+                async with self._semaphore:
+                    metrics.observe("auction_update_wait_seconds", time.perf_counter() - admitted)
+                    await self.do_process_update(update, coroutine)
+            finally:
+                if lock is not None:
+                    lock.release()
+        finally:
+            if key is not None:
+                self._queued[key] -= 1
+                if not self._queued[key]:
+                    del self._queued[key]
+                    self._chats.pop(key, None)
+            self._admission.release()
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        try:
+            await coroutine
+            self.stats["processed"] += 1
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def summary(self) -> Dict[str, Any]:
+        return {"workers": self.max_concurrent_updates, "running": self.current_concurrent_updates, "pending": self.pending(),
+                "max_pending": self.max_pending, "chats_waiting": self.chats_waiting(), **self.stats}
+
+class AdmissionQueue(asyncio.Queue):
+    """Update queue that only hands an update to the application once the
+    processor has room for it, so a full pool backs up into polling/webhook."""
+
+    def __init__(self, processor: ChatOrderedUpdateProcessor, maxsize: int = UPDATE_MAX_PENDING):
+        super().__init__(maxsize=maxsize)
+        self.processor = processor
+
+    async def get(self):
+        update = await super().get()
+        await self.processor.admit()
+        return update
@@ -0,0 +1,65 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+REGISTRATION_FIELDS = ["id", "user_id", "name", "username", "role", "price", "status", "player_code"]
+RUN_EVENT_FIELDS = ["ts", "event", "player_id", "player_name", "player_username", "player_role", "amount", "buyer_id", "bidder_id"]
+RUN_EVENT_KINDS = ("bid", "sold", "unsold")
+
+def iter_registrations(registrations: Iterable[Dict[str, Any]], statuses: Optional[tuple] = None) -> Iterator[Dict[str, Any]]:
+    for r in registrations:
+        if not r:
+            continue
+        if statuses and r.get("status") not in statuses:
+            continue
+        yield {f: r.get(f) for f in REGISTRATION_FIELDS}
+
+def iter_run_events(logs: Iterable[Dict[str, Any]], kinds: tuple = RUN_EVENT_KINDS) -> Iterator[Dict[str, Any]]:
+    for l in logs:
+        if not l or l.get("event") not in kinds:
+            continue
+        player = l.get("player") or {}
+        event = l.get("event")
+        yield {
+            "ts": l.get("ts"),
+            "event": event,
+            "player_id": player.get("user_id"),
+            "player_name": player.get("profile_fullname") or player.get("name"),
+            "player_username": player.get("username"),
+            "player_role": player.get("role"),
+            "amount": l.get("price") if event == "sold" else (l.get("amount") if event == "bid" else l.get("base_price")),
+            "buyer_id": l.get("buyer_id"),
+            "bidder_id": l.get("user_id") if event == "bid" else None,
+        }
+
+def write_rows(rows: Iterable[Dict[str, Any]], fields: List[str], fmt: str, path: str) -> int:
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8", newline="") as fh:
+        if fmt == "csv":
+            writer = csv.DictWriter(fh, fieldnames=fields, extrasaction="ignore")
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in rows:
+                fh.write(json.dumps(row, ensure_ascii=False))
+                fh.write("\n")
+                count += 1
+    return count
+
+def export_to_tempfile(rows: Iterable[Dict[str, Any]], fields: List[str], fmt: str, prefix: str):
+    fd, path = tempfile.mkstemp(prefix=prefix + "-", suffix=f".{fmt}.gz")
+    os.close(fd)
+    try:
+        count = write_rows(rows, fields, fmt, path)
+    except Exception:
+        try:
+            os.remove(path)
+        except Exception:
+            pass
+        raise
+    return path, count
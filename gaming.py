@@ -3,9 +3,21 @@ import json
 import uuid
 import random
 import logging
+import time
 import auction
 import asyncio
-from functools import wraps
+import exporter
+import backups
+import dispatcher
+import gateway
+import metrics
+import loopwatch
+import models
+import profiler
+import sharding
+import tracing
+import webhook
+from functools import partial, wraps
 from io import BytesIO
 from PIL import Image, ImageDraw
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update, InputMediaPhoto
@@ -19,7 +31,8 @@ from telegram.ext import (
     ChatMemberHandler,
 )
 
-BOT_TOKEN = "8518014438:AAFmPR4ocSYRd70xUPTxuPXJ5iQF7ldpSu8"
+BOT_TOKEN = os.environ.get("BOT_TOKEN") or "8518014438:AAFmPR4ocSYRd70xUPTxuPXJ5iQF7ldpSu8"
+BOT_API_BASE_URL = os.environ.get("BOT_API_BASE_URL")
 DATA_FILE = "/mnt/data/auction_bot_data.json"
 if not os.path.exists(DATA_FILE):
     DATA_FILE = "auction_bot_data.json"
@@ -44,6 +57,7 @@ AVATAR_FALLBACK = os.path.join(BASE_DIR, "Avatar.png")
 
 PROFILE_CACHE = {}
 
+@metrics.track_io("load_data", "read", lambda: DATA_FILE)
 def load_data() -> dict:
     if not os.path.exists(DATA_FILE):
         base = {
@@ -77,6 +91,8 @@ def load_data() -> dict:
             save_data(base)
             return base
 
+@metrics.track_io("save_data", "write", lambda: DATA_FILE)
+@tracing.traced("save_data", "disk")
 def save_data(data: dict):
     tmp = DATA_FILE + ".tmp"
     with open(tmp, "w", encoding="utf-8") as f:
@@ -85,6 +101,154 @@ def save_data(data: dict):
 
 DATA = load_data()
 
+MG_REVERSE = {}
+REG_INDEX = {}
+REGLIST_VIEWS = {}
+REGLIST_PER_PAGE = 10
+REGLIST_VISIBLE = ("accepted", "accepted_pending", "requested")
+
+def rebuild_indexes():
+    MG_REVERSE.clear()
+    REG_INDEX.clear()
+    REGLIST_VIEWS.clear()
+    for tid, t in DATA.get("tournaments", {}).items():
+        for r in t.get("registrations", []) or []:
+            if r.get("id"):
+                REG_INDEX[r["id"]] = (tid, r)
+    for key, val in (DATA.get("mg_map") or {}).items():
+        reg_id = (val or {}).get("reg_id")
+        if reg_id:
+            MG_REVERSE.setdefault(reg_id, set()).add(key)
+
+def index_registration(tourn: dict, reg: dict):
+    REG_INDEX[reg["id"]] = (tourn.get("id"), reg)
+
+def mg_map_add(key: str, reg: dict):
+    DATA.setdefault("mg_map", {})[key] = {"user_id": reg["user_id"], "reg_id": reg["id"]}
+    MG_REVERSE.setdefault(reg["id"], set()).add(key)
+
+def mg_map_drop_reg(reg_id: str) -> int:
+    mg = DATA.setdefault("mg_map", {})
+    keys = MG_REVERSE.pop(reg_id, None) or ()
+    for key in keys:
+        mg.pop(key, None)
+    return len(keys)
+
+def gc_mg_map(closed_tid: str = None) -> int:
+    # Drops management-message entries whose registration is gone, finished
+    # (declined/removed) or belongs to a tournament whose registration closed.
+    removed = 0
+    for reg_id in list(MG_REVERSE.keys()):
+        entry = REG_INDEX.get(reg_id)
+        if entry is None or entry[1].get("status") in ("declined", "removed") or (closed_tid and entry[0] == closed_tid):
+            removed += mg_map_drop_reg(reg_id)
+    mg = DATA.get("mg_map") or {}
+    for key in [k for k, v in mg.items() if not (v or {}).get("reg_id")]:
+        mg.pop(key, None)
+        removed += 1
+    return removed
+
+def _reglist_count(view: dict, r: dict, delta: int):
+    role = r.get("role") or "Unknown"
+    view["roles"][role] = view["roles"].get(role, 0) + delta
+    if view["roles"][role] <= 0:
+        view["roles"].pop(role, None)
+    country = r.get("country")
+    if country:
+        view["countries"][country] = view["countries"].get(country, 0) + delta
+        if view["countries"][country] <= 0:
+            view["countries"].pop(country, None)
+    view["stats"] = None
+
+def reglist_view(tourn: dict) -> dict:
+    tid = tourn.get("id")
+    view = REGLIST_VIEWS.get(tid)
+    if view is None:
+        visible = [r for r in tourn.get("registrations", []) if r.get("status") in REGLIST_VISIBLE]
+        view = {"visible": visible, "roles": {}, "countries": {}, "pages": {}, "stats": None}
+        for r in visible:
+            _reglist_count(view, r, 1)
+        REGLIST_VIEWS[tid] = view
+    return view
+
+def _reglist_drop_pages(view: dict, from_index: int):
+    first = from_index // REGLIST_PER_PAGE + 1
+    for page in [p for p in view["pages"] if p >= first]:
+        view["pages"].pop(page, None)
+
+def set_registration_status(tid: str, reg: dict, status: str):
+    old = reg.get("status")
+    reg["status"] = status
+    view = REGLIST_VIEWS.get(tid)
+    if view is None:
+        return
+    was_visible = old in REGLIST_VISIBLE
+    now_visible = status in REGLIST_VISIBLE
+    visible = view["visible"]
+    if was_visible and now_visible:
+        for i, r in enumerate(visible):
+            if r is reg:
+                view["pages"].pop(i // REGLIST_PER_PAGE + 1, None)
+                break
+    elif was_visible:
+        for i, r in enumerate(visible):
+            if r is reg:
+                visible.pop(i)
+                _reglist_count(view, reg, -1)
+                _reglist_drop_pages(view, i)
+                break
+    elif now_visible:
+        regs = (DATA.get("tournaments", {}).get(tid) or {}).get("registrations", [])
+        if regs and regs[-1] is reg:
+            visible.append(reg)
+            _reglist_count(view, reg, 1)
+            _reglist_drop_pages(view, len(visible) - 1)
+        else:
+            REGLIST_VIEWS.pop(tid, None)
+
+def render_reglist_page(tourn: dict, page: int):
+    view = reglist_view(tourn)
+    visible = view["visible"]
+    total = len(visible)
+    pages = max(1, (total + REGLIST_PER_PAGE - 1) // REGLIST_PER_PAGE)
+    page = min(max(page, 1), pages)
+    body = view["pages"].get(page)
+    if body is None:
+        start = (page - 1) * REGLIST_PER_PAGE
+        lines = ["📋 <b>Tournament Registration List</b>\n"]
+        for i, r in enumerate(visible[start:start + REGLIST_PER_PAGE], start=start + 1):
+            uname = f"@{r.get('username')}" if r.get('username') else "-"
+            pc = r.get("player_code") or "-"
+            tidv = r.get("user_id") or "-"
+            lines.append(f"({i})\nName: {r.get('name')}\nUsername: {uname}\nTelegram ID: {tidv}\nRole: {r.get('role')}\nBase Price: {r.get('price')}\nPlayerCode: {pc}\n")
+        body = "\n".join(lines)
+        view["pages"][page] = body
+    text = body + f"\n\n✅ Total Players Registered: {total}\nPage {page}/{pages}"
+    tid = tourn.get("id")
+    prev_cb = InlineKeyboardButton("◀ Previous", callback_data=f"reglist|{tid}|{max(1, page - 1)}")
+    stats_cb = InlineKeyboardButton("Status", callback_data=f"regstats|{tid}|{page}")
+    next_cb = InlineKeyboardButton("Next ▶", callback_data=f"reglist|{tid}|{min(pages, page + 1)}")
+    kb = [[prev_cb, stats_cb, next_cb], [InlineKeyboardButton("Close", callback_data=f"reglist_close|{tid}")]]
+    return text, InlineKeyboardMarkup(kb)
+
+def render_reglist_stats(tourn: dict) -> str:
+    view = reglist_view(tourn)
+    if view["stats"] is None:
+        lines = ["📊 <b>Registration Status Summary</b>\n"]
+        lines.append("<b>By Role:</b>")
+        for k, v in view["roles"].items():
+            lines.append(f"{k} → {v}")
+        if view["countries"]:
+            lines.append("\n<b>By Country:</b>")
+            for k, v in view["countries"].items():
+                lines.append(f"{k} → {v}")
+        else:
+            lines.append("\nCountry data not available.")
+        view["stats"] = "\n".join(lines)
+    return view["stats"]
+
+rebuild_indexes()
+
 def admin_only(func):
     @wraps(func)
     async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
@@ -470,6 +634,7 @@ async def stop_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await msg.reply_text("No posted tournament found.")
         return
     tourn["registration_open"] = False
+    gc_mg_map(tourn.get("id"))
     save_data(DATA)
     await msg.reply_text("⛔ Registration closed.")
 
@@ -491,29 +656,8 @@ async def registered_list_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE
     if not tourn:
         await msg.reply_text("No posted tournament.")
         return
-    regs = tourn.get("registrations", [])
-    visible = [r for r in regs if r.get("status") in ("accepted", "accepted_pending", "requested")]
-    per_page = 10
-    total = len(visible)
-    pages = max(1, (total + per_page - 1) // per_page)
-    page = 1
-    start = (page - 1) * per_page
-    end = start + per_page
-    chunk = visible[start:end]
-    lines = ["📋 <b>Tournament Registration List</b>\n"]
-    for i, r in enumerate(chunk, start=start + 1):
-        uname = f"@{r.get('username')}" if r.get('username') else "-"
-        pc = r.get("player_code") or "-"
-        tid = r.get("user_id") or "-"
-        lines.append(f"({i})\nName: {r.get('name')}\nUsername: {uname}\nTelegram ID: {tid}\nRole: {r.get('role')}\nBase Price: {r.get('price')}\nPlayerCode: {pc}\n")
-    lines.append(f"\n✅ Total Players Registered: {total}")
-    kb = []
-    prev_cb = InlineKeyboardButton("◀ Previous", callback_data=f"reglist|{tourn.get('id')}|{max(1,page-1)}")
-    stats_cb = InlineKeyboardButton("Status", callback_data=f"regstats|{tourn.get('id')}|{page}")
-    next_cb = InlineKeyboardButton("Next ▶", callback_data=f"reglist|{tourn.get('id')}|{min(pages,page+1)}")
-    kb.append([prev_cb, stats_cb, next_cb])
-    kb.append([InlineKeyboardButton("Close", callback_data=f"reglist_close|{tourn.get('id')}")])
-    await msg.reply_text("\n".join(lines), parse_mode="HTML", reply_markup=InlineKeyboardMarkup(kb))
+    text, kb = render_reglist_page(tourn, 1)
+    await msg.reply_text(text, parse_mode="HTML", reply_markup=kb)
 
 async def reglist_cb_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     cq = update.callback_query
@@ -535,28 +679,8 @@ async def reglist_cb_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
         if not tourn:
             await cq.edit_message_text("Tournament not found.")
             return
-        regs = tourn.get("registrations", [])
-        visible = [r for r in regs if r.get("status") in ("accepted", "accepted_pending", "requested")]
-        role_counts = {}
-        country_counts = {}
-        for r in visible:
-            role = r.get("role") or "Unknown"
-            role_counts[role] = role_counts.get(role, 0) + 1
-            country = r.get("country")
-            if country:
-                country_counts[country] = country_counts.get(country, 0) + 1
-        lines = ["📊 <b>Registration Status Summary</b>\n"]
-        lines.append("<b>By Role:</b>")
-        for k, v in role_counts.items():
-            lines.append(f"{k} → {v}")
-        if country_counts:
-            lines.append("\n<b>By Country:</b>")
-            for k, v in country_counts.items():
-                lines.append(f"{k} → {v}")
-        else:
-            lines.append("\nCountry data not available.")
         try:
-            await cq.edit_message_text("\n".join(lines), parse_mode="HTML", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Back to list", callback_data=f"reglist|{tourn.get('id')}|1")]]))
+            await cq.edit_message_text(render_reglist_stats(tourn), parse_mode="HTML", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Back to list", callback_data=f"reglist|{tourn.get('id')}|1")]]))
         except Exception:
             pass
         return
@@ -573,33 +697,9 @@ async def reglist_cb_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
     if not tourn:
         await cq.edit_message_text("Tournament not found.")
         return
-    regs = tourn.get("registrations", [])
-    visible = [r for r in regs if r.get("status") in ("accepted", "accepted_pending", "requested")]
-    per_page = 10
-    total = len(visible)
-    pages = max(1, (total + per_page - 1) // per_page)
-    if page < 1:
-        page = 1
-    if page > pages:
-        page = pages
-    start = (page - 1) * per_page
-    end = start + per_page
-    chunk = visible[start:end]
-    lines = ["📋 <b>Tournament Registration List</b>\n"]
-    for i, r in enumerate(chunk, start=start + 1):
-        uname = f"@{r.get('username')}" if r.get('username') else "-"
-        pc = r.get("player_code") or "-"
-        tidv = r.get("user_id") or "-"
-        lines.append(f"({i})\nName: {r.get('name')}\nUsername: {uname}\nTelegram ID: {tidv}\nRole: {r.get('role')}\nBase Price: {r.get('price')}\nPlayerCode: {pc}\n")
-    lines.append(f"\n✅ Total Players Registered: {total}\nPage {page}/{pages}")
-    prev_page = max(1, page - 1)
-    next_page = min(pages, page + 1)
-    prev_cb = InlineKeyboardButton("◀ Previous", callback_data=f"reglist|{tourn.get('id')}|{prev_page}")
-    stats_cb = InlineKeyboardButton("Status", callback_data=f"regstats|{tourn.get('id')}|{page}")
-    next_cb = InlineKeyboardButton("Next ▶", callback_data=f"reglist|{tourn.get('id')}|{next_page}")
-    kb = [[prev_cb, stats_cb, next_cb], [InlineKeyboardButton("Close", callback_data=f"reglist_close|{tourn.get('id')}")]]
+    text, kb = render_reglist_page(tourn, page)
     try:
-        await cq.edit_message_text("\n".join(lines), parse_mode="HTML", reply_markup=InlineKeyboardMarkup(kb))
+        await cq.edit_message_text(text, parse_mode="HTML", reply_markup=kb)
     except Exception:
         pass
 
@@ -879,7 +979,7 @@ async def send_registration_to_management(context: ContextTypes.DEFAULT_TYPE, re
             try:
                 sent_msg = await context.bot.send_photo(chat_id=MANAGEMENT_GROUP_ID, photo=bio, caption=mg_text, parse_mode="HTML", reply_markup=mg_kb)
                 key = f"{sent_msg.chat.id}:{sent_msg.message_id}"
-                DATA.setdefault("mg_map", {})[key] = {"user_id": reg["user_id"], "reg_id": reg["id"]}
+                mg_map_add(key, reg)
                 DATA["management_chat_id"] = MANAGEMENT_GROUP_ID
                 save_data(DATA)
                 sent += 1
@@ -896,7 +996,7 @@ async def send_registration_to_management(context: ContextTypes.DEFAULT_TYPE, re
     try:
         sent_msg = await context.bot.send_message(chat_id=MANAGEMENT_GROUP_ID, text=mg_text, parse_mode="HTML", reply_markup=mg_kb)
         key = f"{sent_msg.chat.id}:{sent_msg.message_id}"
-        DATA.setdefault("mg_map", {})[key] = {"user_id": reg["user_id"], "reg_id": reg["id"]}
+        mg_map_add(key, reg)
         DATA["management_chat_id"] = MANAGEMENT_GROUP_ID
         save_data(DATA)
         sent += 1
@@ -914,7 +1014,7 @@ async def send_registration_to_management(context: ContextTypes.DEFAULT_TYPE, re
                     await context.bot.send_photo(chat_id=int(stored), photo=bio)
                 sent_msg = await context.bot.send_message(chat_id=int(stored), text=mg_text, parse_mode="HTML", reply_markup=mg_kb)
                 key = f"{sent_msg.chat.id}:{sent_msg.message_id}"
-                DATA.setdefault("mg_map", {})[key] = {"user_id": reg["user_id"], "reg_id": reg["id"]}
+                mg_map_add(key, reg)
                 save_data(DATA)
                 sent += 1
                 return sent
@@ -936,13 +1036,13 @@ async def send_registration_to_management(context: ContextTypes.DEFAULT_TYPE, re
                     await context.bot.send_photo(chat_id=gid, photo=bio)
                 sent_msg = await context.bot.send_message(chat_id=gid, text=mg_text, parse_mode="HTML", reply_markup=mg_kb)
                 key = f"{sent_msg.chat.id}:{sent_msg.message_id}"
-                DATA.setdefault("mg_map", {})[key] = {"user_id": reg["user_id"], "reg_id": reg["id"]}
+                mg_map_add(key, reg)
                 save_data(DATA)
                 sent += 1
             except Exception:
                 sent_msg = await context.bot.send_message(chat_id=gid, text=mg_text, parse_mode="HTML", reply_markup=mg_kb)
                 key = f"{sent_msg.chat.id}:{sent_msg.message_id}"
-                DATA.setdefault("mg_map", {})[key] = {"user_id": reg["user_id"], "reg_id": reg["id"]}
+                mg_map_add(key, reg)
                 save_data(DATA)
                 sent += 1
         except Exception:
@@ -1019,8 +1119,9 @@ async def submit_cb_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             except Exception:
                 pass
             return
-    reg["status"] = "requested"
     tourn.setdefault("registrations", []).append(reg)
+    index_registration(tourn, reg)
+    set_registration_status(tourn.get("id"), reg, "requested")
     pending.pop(reg_id, None)
     save_data(DATA)
     mg_text = ("<b>🆕 New Registration Request</b>\n\n"
@@ -1031,7 +1132,7 @@ async def submit_cb_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                f"Base Price: {reg['price']}\n\n"
                "⤵️ Actions:")
     mg_kb = InlineKeyboardMarkup([
-        [InlineKeyboardButton("✅ Accept", callback_data=f"mg_accept|{reg['id']}|{reg['user_id']}"), InlineKeyboardButton("❌ Decline", callback_data=f"mg_decline|{reg['id']}|{reg['user_id']}")]
+        [InlineKeyboardButton("✅ Accept", callback_data=f"mg_accept|{reg['id']}|{reg['user_id']}|{tourn.get('id')}"), InlineKeyboardButton("❌ Decline", callback_data=f"mg_decline|{reg['id']}|{reg['user_id']}|{tourn.get('id')}")]
     ])
     sent = await send_registration_to_management(context, reg, mg_text, mg_kb)
     try:
@@ -1066,18 +1167,17 @@ async def mg_cb_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_id = int(parts[2])
     except Exception:
         user_id = None
-    found = None
-    tourn = find_posted_tournament()
+    # buttons posted before the tournament id was added to the data act on the posted tournament
+    tid = parts[3] if len(parts) > 3 else None
+    tourn = DATA.get("tournaments", {}).get(tid) if tid else find_posted_tournament()
     if not tourn:
         try:
             await cq.edit_message_text("Tournament not found.")
         except Exception:
             pass
         return
-    for r in tourn.get("registrations", []):
-        if r.get("id") == reg_id:
-            found = r
-            break
+    entry = REG_INDEX.get(reg_id)
+    found = entry[1] if entry and str(entry[0]) == str(tourn.get("id")) else None
     if not found:
         try:
             await cq.edit_message_text("Registration not found.")
@@ -1088,7 +1188,7 @@ async def mg_cb_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if action == "mg_accept":
         if not found.get("player_code"):
             found["player_code"] = generate_unique_code()
-        found["status"] = "accepted"
+        set_registration_status(entry[0], found, "accepted")
         save_data(DATA)
         try:
             edited_caption = (
@@ -1134,7 +1234,8 @@ async def mg_cb_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         except Exception:
             pass
     elif action == "mg_decline":
-        found["status"] = "declined"
+        set_registration_status(entry[0], found, "declined")
+        mg_map_drop_reg(found.get("id"))
         save_data(DATA)
         try:
             edited_caption = (
@@ -1414,10 +1515,12 @@ async def add_submit_cb(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "username": reg["username"],
         "role": reg["role"],
         "price": reg["price"],
-        "status": "accepted",
+        "status": "draft",
         "player_code": generate_unique_code()
     }
     tourn.setdefault("registrations", []).append(reg_rec)
+    index_registration(tourn, reg_rec)
+    set_registration_status(tourn.get("id"), reg_rec, "accepted")
     save_data(DATA)
     DATA["admin_add_tmp"].pop(admin_key, None)
     save_data(DATA)
@@ -1446,17 +1549,14 @@ async def perform_remove_by_key(context: ContextTypes.DEFAULT_TYPE, update: Upda
         await msg.reply_text("No active posted tournament.")
         return
     regs = tourn.get("registrations", [])
-    visible = [r for r in regs if r.get("status") in ("accepted", "requested", "accepted_pending")]
+    visible = reglist_view(tourn)["visible"]
     k = key.strip()
     if k.isdigit():
         pos = int(k)
         if 1 <= pos <= len(visible):
             targ = visible[pos - 1]
-            targ["status"] = "removed"
-            for mm in list(DATA.get("mg_map", {}).keys()):
-                val = DATA["mg_map"].get(mm)
-                if val and val.get("reg_id") == targ.get("id"):
-                    DATA["mg_map"].pop(mm, None)
+            set_registration_status(tourn.get("id"), targ, "removed")
+            mg_map_drop_reg(targ.get("id"))
             save_data(DATA)
             try:
                 await context.bot.send_message(chat_id=int(targ.get("user_id")), text="⚠️ You have been removed from the tournament registration by admin.", parse_mode="HTML")
@@ -1472,11 +1572,8 @@ async def perform_remove_by_key(context: ContextTypes.DEFAULT_TYPE, update: Upda
     if not targ:
         await msg.reply_text("❌ Registration not found for that identifier.")
         return
-    targ["status"] = "removed"
-    for mm in list(DATA.get("mg_map", {}).keys()):
-        val = DATA["mg_map"].get(mm)
-        if val and val.get("reg_id") == targ.get("id"):
-            DATA["mg_map"].pop(mm, None)
+    set_registration_status(tourn.get("id"), targ, "removed")
+    mg_map_drop_reg(targ.get("id"))
     save_data(DATA)
     try:
         await context.bot.send_message(chat_id=int(targ.get("user_id")), text="⚠️ You have been removed from the tournament registration by admin.", parse_mode="HTML")
@@ -1564,6 +1661,7 @@ async def reset_confirm_cb(update: Update, context: ContextTypes.DEFAULT_TYPE):
     }
     save_data(newdata)
     DATA = load_data()
+    rebuild_indexes()
     await cq.edit_message_text("✅ Tournament posts, broadcasts and registration data have been deleted. Known users and groups are preserved.")
     # --- END modified reset behavior ---
 
@@ -1696,15 +1794,62 @@ async def backup_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     if not os.path.exists(DATA_FILE):
         save_data(DATA)
+    kind = (context.args[0].lower() if context.args else "snapshot")
+    if kind not in ("snapshot", "delta"):
+        await msg.reply_text("Usage: /backup [snapshot|delta]")
+        return
     try:
         await msg.reply_text("Preparing backup file...")
-        with open(DATA_FILE, "rb") as f:
-            await context.bot.send_document(chat_id=update.effective_user.id, document=f, filename=os.path.basename(DATA_FILE))
+        if kind == "delta":
+            entry = await asyncio.to_thread(backups.create_delta, DATA_FILE)
+            if not entry:
+                await msg.reply_text("No changes since the last snapshot.")
+                return
+        else:
+            entry = await asyncio.to_thread(backups.create_snapshot, DATA_FILE)
+        with open(entry["path"], "rb") as f:
+            await context.bot.send_document(chat_id=update.effective_user.id, document=f, filename=entry["file"], caption=f"{entry['id']}\nsha256: {entry['sha256']}\nsize: {entry['size']} bytes")
         await msg.reply_text("✅ Backup sent to your private chat.")
     except Exception as e:
         logger.exception("Backup failed")
         await msg.reply_text(f"❌ Failed to send backup: {e}")
 
+@admin_only
+async def profile_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    msg = update.message
+    if not msg:
+        return
+    try:
+        seconds = int(context.args[0]) if context.args else 10
+    except ValueError:
+        await msg.reply_text(f"Usage: /profile [seconds, 1-{profiler.MAX_SECONDS}]")
+        return
+    seconds = max(1, min(seconds, profiler.MAX_SECONDS))
+    if profiler.running():
+        await msg.reply_text("A profile is already running.")
+        return
+    await msg.reply_text(f"Profiling the event loop for {seconds}s...")
+    asyncio.create_task(_run_profile(context.bot, update.effective_user.id, seconds))
+
+async def _run_profile(bot, user_id: int, seconds: int):
+    try:
+        collapsed, stats = await profiler.profile(seconds)
+        name = f"profile-{time.strftime('%Y%m%d-%H%M%S')}.folded"
+        await bot.send_document(chat_id=user_id, document=BytesIO(collapsed.encode("utf-8")), filename=name, caption=profiler.format_stats(stats)[:1024])
+    except Exception as e:
+        logger.exception("Profile failed")
+        try:
+            await bot.send_message(chat_id=user_id, text=f"❌ Profile failed: {e}")
+        except Exception:
+            pass
+
+@admin_only
+async def loopwatch_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    msg = update.message
+    if not msg:
+        return
+    await msg.reply_text(loopwatch.summary()[:4000])
+
 @admin_only
 async def restore_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     msg = update.message
@@ -1716,32 +1861,126 @@ async def restore_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     elif msg.document:
         doc = msg.document
     if not doc:
-        await msg.reply_text("Reply to a backup file (JSON) with /restore or send the backup file with /restore as reply.")
+        await msg.reply_text("Reply to a backup file (JSON or .json.gz) with /restore or send the backup file with /restore as reply.")
+        return
+    if sharding.enabled() and sharding.SHARD_WORKERS > 1:
+        # the other workers keep their own auction state in memory and would overwrite the restored shards
+        await msg.reply_text("❌ /restore is not available while shard workers are running. Restart with SHARD_WORKERS=1, restore, then scale back up.")
         return
+    tmp_path = DATA_FILE + ".restore.tmp"
     try:
         file_obj = await context.bot.get_file(doc.file_id)
-        tmp_path = DATA_FILE + ".restore.tmp"
         await file_obj.download_to_drive(tmp_path)
-        with open(tmp_path, "r", encoding="utf-8") as f:
-            content = json.load(f)
-        if not isinstance(content, dict):
-            await msg.reply_text("❌ Invalid backup file format (expected JSON object).")
-            try:
-                os.remove(tmp_path)
-            except Exception:
-                pass
+        try:
+            await asyncio.to_thread(backups.restore_from_file, tmp_path, DATA_FILE)
+        except ValueError as e:
+            await msg.reply_text(f"❌ Invalid backup file: {e}")
             return
-        save_data(content)
         global DATA
         DATA = load_data()
+        rebuild_indexes()
+        auction.reset_runtime_state()
+        report = await auction.recover_sessions(context.application)
+        logger.info("Recovery after restore: %s", report)
+        await msg.reply_text("✅ Restore completed. Data loaded successfully.")
+    except Exception as e:
+        logger.exception("Restore failed")
+        await msg.reply_text(f"❌ Restore failed: {e}")
+    finally:
         try:
             os.remove(tmp_path)
         except Exception:
             pass
-        await msg.reply_text("✅ Restore completed. Data loaded successfully.")
+
+def _export_run(chat_id: int, run_id, fmt: str):
+    runs = sharding.chat_history(chat_id)
+    if run_id:
+        run = next((r for r in runs if r.get("run_id") == run_id), None)
+    else:
+        run = runs[-1] if runs else None
+    if not run:
+        return None
+    name = f"auction-{chat_id}-{run.get('run_id')}"
+    rows = exporter.iter_run_events(models.iter_run_logs(run))
+    return exporter.export_to_tempfile(rows, exporter.RUN_EVENT_FIELDS, fmt, name) + (name,)
+
+@admin_only
+async def export_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    msg = update.message
+    if not msg:
+        return
+    args = [a.strip() for a in (context.args or []) if a.strip()]
+    fmt = "csv"
+    for a in list(args):
+        if a.lower() in ("csv", "jsonl"):
+            fmt = a.lower()
+            args.remove(a)
+    kind = args[0].lower() if args else ""
+    if kind in ("regs", "registrations"):
+        tourn = DATA.get("tournaments", {}).get(args[1]) if len(args) > 1 else find_posted_tournament()
+        if not tourn:
+            await msg.reply_text("No posted tournament found.")
+            return
+        rows = exporter.iter_registrations(list(tourn.get("registrations", [])))
+        name = f"registrations-{tourn.get('id')}"
+        build = lambda: exporter.export_to_tempfile(rows, exporter.REGISTRATION_FIELDS, fmt, name) + (name,)
+    elif kind in ("run", "auction"):
+        chat_id = update.effective_chat.id
+        run_id = None
+        for a in args[1:]:
+            if a.lstrip("-").isdigit():
+                chat_id = int(a)
+            else:
+                run_id = a
+        build = partial(_export_run, chat_id, run_id, fmt)
+    else:
+        await msg.reply_text("Usage: /export regs [tournament_id] [csv|jsonl]\n/export run [chat_id] [run_id] [csv|jsonl]")
+        return
+    await msg.reply_text("Preparing export file...")
+    try:
+        built = await asyncio.to_thread(build)
     except Exception as e:
-        logger.exception("Restore failed")
-        await msg.reply_text(f"❌ Restore failed: {e}")
+        logger.exception("Export failed")
+        await msg.reply_text(f"❌ Failed to build export: {e}")
+        return
+    if not built:
+        await msg.reply_text("No auction run found for that chat.")
+        return
+    path, count, name = built
+    try:
+        with open(path, "rb") as f:
+            await context.bot.send_document(chat_id=update.effective_user.id, document=f, filename=f"{name}.{fmt}.gz", caption=f"{count} rows")
+        await msg.reply_text("✅ Export sent to your private chat.")
+    except Exception as e:
+        logger.exception("Export failed")
+        await msg.reply_text(f"❌ Failed to send export: {e}")
+    finally:
+        try:
+            os.remove(path)
+        except Exception:
+            pass
+
+@admin_only
+async def gateway_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    msg = update.message
+    if not msg:
+        return
+    s = OUTBOUND.stats()
+    lines = [
+        "<b>Outbound Gateway</b>",
+        f"Sent: critical {s['sent']['critical']} • normal {s['sent']['normal']} • low {s['sent']['low']}",
+        f"Failed: critical {s['failed']['critical']} • normal {s['failed']['normal']} • low {s['failed']['low']}",
+        f"Dropped (stale low priority): {s['dropped']}",
+        f"RetryAfter hits: {s['retry_after']} ({s['retry_after_seconds']:.1f}s total)",
+        f"Queue wait: {s['queue_wait_seconds']:.1f}s total",
+        f"Unthrottled calls: {s['passthrough']}",
+        f"Chats tracked: {s['chats_tracked']}",
+    ]
+    se = auction.side_effects.stats()
+    lines.append(f"Side effects: {se['done']} done • {se['failed']} failed • {se['pending']} pending in {se['chats']} chats")
+    us = UPDATES.summary()
+    lines.append(f"Updates: {us['running']}/{us['workers']} running • {us['pending']} pending • {us['chats_waiting']} chats backlogged • {us['processed']} done • {us['failed']} failed")
+    await msg.reply_text("\n".join(lines), parse_mode="HTML")
 
 async def doc_restore_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if update.effective_chat.type != "private":
@@ -1753,8 +1992,46 @@ async def doc_restore_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     if msg and msg.document:
         await msg.reply_text("Reply to this document with /restore to restore the database, or send /backup to get a copy.")
 
+OUTBOUND = gateway.OutboundGateway()
+UPDATES = dispatcher.ChatOrderedUpdateProcessor()
+metrics.gauge("auction_outbound_dropped", "Low-priority messages dropped by the outbound gateway", lambda: {(): OUTBOUND.metrics["dropped"]})
+metrics.gauge("auction_side_effects_pending", "Queued per-chat side effects", lambda: {(): auction.side_effects.pending()})
+metrics.gauge("auction_updates_pending", "Updates admitted but not yet finished", lambda: {(): UPDATES.pending()})
+metrics.gauge("auction_updates_running", "Updates currently holding a worker", lambda: {(): UPDATES.current_concurrent_updates})
+
+async def _post_init(app):
+    if not os.path.exists(DATA_FILE):
+        save_data(DATA)
+    if sharding.is_home():
+        backups.start_scheduler(DATA_FILE)
+    await metrics.start_server()
+    loopwatch.start()
+    try:
+        report = await auction.recover_sessions(app)
+        logger.info("Startup recovery: %s", report)
+    except Exception:
+        logger.exception("Startup recovery failed")
+    if sharding.is_home():
+        asyncio.create_task(_warm_media(app))
+    else:
+        auction.media.READ_ONLY = True
+
+async def _warm_media(app):
+    try:
+        report = await auction.media.warm(app.bot)
+        logger.info("Media cache ready: %s", report)
+    except Exception:
+        logger.exception("Media warm-up failed")
+
 def build_app():
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+    if gc_mg_map() and sharding.is_home():
+        save_data(DATA)
+    builder = ApplicationBuilder().token(BOT_TOKEN).rate_limiter(OUTBOUND).post_init(_post_init)
+    builder = builder.concurrent_updates(UPDATES).update_queue(dispatcher.AdmissionQueue(UPDATES))
+    if BOT_API_BASE_URL:
+        base = BOT_API_BASE_URL.rstrip("/")
+        builder = builder.base_url(f"{base}/bot").base_file_url(f"{base}/file/bot")
+    app = builder.build()
     app.add_handler(CommandHandler("start", start_cmd))
     app.add_handler(CommandHandler("broad", broad_cmd))
     app.add_handler(CommandHandler("start_reg", start_reg_cmd))
@@ -1781,10 +2058,14 @@ def build_app():
     app.add_handler(CallbackQueryHandler(reglist_cb_handler, pattern=r"^regstats\|"))
     app.add_handler(CallbackQueryHandler(reglist_cb_handler, pattern=r"^reglist_close\|"))
     app.add_handler(CommandHandler("backup", backup_cmd))
+    app.add_handler(CommandHandler("profile", profile_cmd))
+    app.add_handler(CommandHandler("loopwatch", loopwatch_cmd))
     app.add_handler(CommandHandler("restore", restore_cmd))
+    app.add_handler(CommandHandler("export", export_cmd))
+    app.add_handler(CommandHandler("gateway", gateway_cmd))
     app.add_handler(MessageHandler(filters.Document.ALL & filters.ChatType.PRIVATE, doc_restore_handler))
 
-    app.add_handler(CallbackQueryHandler(auction.callback_router, pattern=r"^(auction_host:|auction_table_choice:|auction_table_change:|auction_table_change_confirm:|auction_load:|auction_mode:|end_confirm:|min_buy:|max_buy:|time_confirm:|auto_start_confirm:|auto_start:|auto_launch:)"))
+    app.add_handler(CallbackQueryHandler(auction.callback_router, pattern=r"^(auction_host:|auction_table_choice:|auction_table_change:|auction_table_change_confirm:|auction_load:|auction_mode:|end_confirm:|end_retry:|min_buy:|max_buy:|time_confirm:|auto_start_confirm:|auto_start:|auto_launch:)"))
     app.add_handler(auction.start_auction_handler)
     app.add_handler(auction.set_table_handler)
     app.add_handler(auction.table_reply_handler)
@@ -1808,10 +2089,17 @@ def build_app():
     app.add_handler(auction.deduct_handler)
     app.add_handler(auction.plus_handler)
     app.add_handler(auction.time_handler)
+    app.add_handler(auction.countdown_mode_handler)
+    app.add_handler(auction.bid_window_handler)
     app.add_handler(CommandHandler("upload", upload_cmd))
     app.add_handler(CommandHandler("help", help_cmd))
+    metrics.instrument_app(app)
+    tracing.instrument_app(app)
     return app
     
 if __name__ == "__main__":
     application = build_app()
-    application.run_polling()
\ No newline at end of file
+    if webhook.WEBHOOK_URL:
+        webhook.run(application)
+    else:
+        application.run_polling()
\ No newline at end of file
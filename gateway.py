@@ -0,0 +1,214 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from typing import Dict, Any, Optional
+
+import metrics
+import tracing
+from telegram.error import BadRequest, NetworkError, RetryAfter, TelegramError
+from telegram.ext import BaseRateLimiter
+
+CRITICAL = 1
+NORMAL = 2
+LOW = 3
+PRIORITY_NAMES = {CRITICAL: "critical", NORMAL: "normal", LOW: "low"}
+
+GLOBAL_RATE = float(os.environ.get("GATEWAY_GLOBAL_RATE", "30"))
+GLOBAL_BURST = int(os.environ.get("GATEWAY_GLOBAL_BURST", "30"))
+GROUP_RATE = 20 / 60.0
+GROUP_BURST = 20
+PRIVATE_RATE = 1.0
+PRIVATE_BURST = 1
+NORMAL_MAX_RETRIES = 3
+LOW_MAX_WAIT = 2.0
+CRITICAL_MAX_SECONDS = float(os.environ.get("GATEWAY_CRITICAL_MAX_SECONDS", "120"))
+CRITICAL_NETWORK_BACKOFF = 1.0
+
+THROTTLED_ENDPOINTS = {
+    "sendMessage", "sendPhoto", "sendVideo", "sendAnimation", "sendDocument", "sendAudio", "sendVoice",
+    "sendSticker", "sendMediaGroup", "forwardMessage", "copyMessage", "editMessageText", "editMessageCaption",
+    "editMessageMedia", "editMessageReplyMarkup", "pinChatMessage", "unpinChatMessage",
+}
+
+logger = logging.getLogger(__name__)
+
+class MessageDropped(TelegramError):
+    pass
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._pump_task = None
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def pause(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    async def acquire(self, priority: int = NORMAL):
+        now = time.monotonic()
+        self._refill(now)
+        if not self._waiters and now >= self.blocked_until and self.tokens >= 1:
+            self.tokens -= 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump())
+        await fut
+
+    async def _pump(self):
+        while self._waiters:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+            self._refill(now)
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
+            _, _, fut = heapq.heappop(self._waiters)
+            if fut.done():
+                continue
+            self.tokens -= 1
+            fut.set_result(None)
+
+    def refund(self):
+        self.tokens = min(self.burst, self.tokens + 1)
+
+    def idle(self) -> bool:
+        return not self._waiters and time.monotonic() >= self.blocked_until and self.tokens >= self.burst
+
+def priority(bot, level: int) -> Dict[str, int]:
+    # bots built without a rate limiter reject rate_limit_args outright
+    if getattr(bot, "rate_limiter", None) is None:
+        return {}
+    return {"rate_limit_args": level}
+
+def _retry_seconds(exc: RetryAfter) -> float:
+    ra = exc.retry_after
+    if hasattr(ra, "total_seconds"):
+        return ra.total_seconds()
+    return float(ra)
+
+def _is_private(chat_id) -> bool:
+    try:
+        return int(chat_id) > 0
+    except Exception:
+        return False
+
+class OutboundGateway(BaseRateLimiter[int]):
+    def __init__(self):
+        self._global = TokenBucket(GLOBAL_RATE, GLOBAL_BURST)
+        self._chats: Dict[str, TokenBucket] = {}
+        self.metrics: Dict[str, Any] = {
+            "sent": {name: 0 for name in PRIORITY_NAMES.values()},
+            "failed": {name: 0 for name in PRIORITY_NAMES.values()},
+            "dropped": 0,
+            "retry_after": 0,
+            "retry_after_seconds": 0.0,
+            "queue_wait_seconds": 0.0,
+            "passthrough": 0,
+        }
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        self._chats.clear()
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        key = str(chat_id)
+        bucket = self._chats.get(key)
+        if bucket is None:
+            if len(self._chats) > 1000:
+                for k in [k for k, b in self._chats.items() if b.idle()]:
+                    self._chats.pop(k, None)
+            if _is_private(chat_id):
+                bucket = TokenBucket(PRIVATE_RATE, PRIVATE_BURST)
+            else:
+                bucket = TokenBucket(GROUP_RATE, GROUP_BURST)
+            self._chats[key] = bucket
+        return bucket
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args: Optional[int]):
+        if endpoint not in THROTTLED_ENDPOINTS:
+            self.metrics["passthrough"] += 1
+            with tracing.span(endpoint, "telegram"):
+                return await metrics.timed_call(endpoint, callback, *args, **kwargs)
+        priority = rate_limit_args if rate_limit_args in PRIORITY_NAMES else NORMAL
+        name = PRIORITY_NAMES[priority]
+        chat_id = data.get("chat_id")
+        bucket = self._chat_bucket(chat_id) if chat_id is not None else None
+        retries = 0
+        queued_at = first_queued = time.monotonic()
+        while True:
+            if bucket is not None:
+                await bucket.acquire(priority)
+                # a chat bucket with tokens to spare cannot be what Telegram throttled
+                chat_limited = bucket.tokens < 1
+            else:
+                chat_limited = False
+            await self._global.acquire(priority)
+            waited = time.monotonic() - queued_at
+            self.metrics["queue_wait_seconds"] += waited
+            tracing.add("gateway_wait", "queue", waited)
+            if priority == LOW and waited > LOW_MAX_WAIT:
+                self.metrics["dropped"] += 1
+                if bucket is not None:
+                    bucket.refund()
+                self._global.refund()
+                raise MessageDropped(f"{endpoint} to {chat_id} dropped after waiting {waited:.1f}s")
+            try:
+                with tracing.span(endpoint, "telegram"):
+                    result = await metrics.timed_call(endpoint, callback, *args, **kwargs)
+                self.metrics["sent"][name] += 1
+                return result
+            except RetryAfter as e:
+                delay = _retry_seconds(e) + 0.1
+                self.metrics["retry_after"] += 1
+                self.metrics["retry_after_seconds"] += delay
+                if bucket is not None:
+                    bucket.pause(delay)
+                if not chat_limited:
+                    self._global.pause(delay)
+                retries += 1
+                if priority == LOW or (priority == NORMAL and retries > NORMAL_MAX_RETRIES) \
+                        or (priority == CRITICAL and time.monotonic() + delay - first_queued > CRITICAL_MAX_SECONDS):
+                    self.metrics["failed"][name] += 1
+                    raise
+                logger.warning("RetryAfter %.1fs on %s to %s (%s, attempt %s)", delay, endpoint, chat_id, name, retries)
+                queued_at = time.monotonic()
+            except NetworkError as e:
+                if priority != CRITICAL or isinstance(e, BadRequest):
+                    self.metrics["failed"][name] += 1
+                    raise
+                retries += 1
+                delay = min(CRITICAL_NETWORK_BACKOFF * 2 ** (retries - 1), 10.0)
+                if time.monotonic() + delay - first_queued > CRITICAL_MAX_SECONDS:
+                    self.metrics["failed"][name] += 1
+                    raise
+                logger.warning("%s on %s to %s, retrying critical send in %.1fs (attempt %s)", type(e).__name__, endpoint, chat_id, delay, retries)
+                await asyncio.sleep(delay)
+                queued_at = time.monotonic()
+            except Exception:
+                self.metrics["failed"][name] += 1
+                raise
+
+    def stats(self) -> Dict[str, Any]:
+        out = {k: (dict(v) if isinstance(v, dict) else v) for k, v in self.metrics.items()}
+        out["chats_tracked"] = len(self._chats)
+        out["global_tokens"] = round(self._global.tokens, 2)
+        return out
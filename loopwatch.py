@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque, Counter
+from typing import Dict, Any, List, Optional
+
+import metrics
+
+HEARTBEAT_INTERVAL = 0.1
+CHECK_INTERVAL = 0.02
+BLOCK_THRESHOLD = float(os.environ.get("LOOP_BLOCK_SECONDS", "0.2"))
+KEEP_BLOCKS = 50
+KEEP_LAGS = 3000
+STACK_DEPTH = 12
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_last_beat = 0.0
+_captured_for = None
+_pending: Optional[Dict[str, Any]] = None
+_loop_ident = None
+_task = None
+_thread = None
+_stop = threading.Event()
+_lags: deque = deque(maxlen=KEEP_LAGS)
+_blocks: deque = deque(maxlen=KEEP_BLOCKS)
+_sites_time: Counter = Counter()
+_sites_count: Counter = Counter()
+
+def _site(frame) -> str:
+    leaf = frame
+    while frame is not None:
+        path = os.path.abspath(frame.f_code.co_filename)
+        if path.startswith(REPO_DIR) and os.path.basename(path) != "loopwatch.py":
+            return f"{frame.f_code.co_name} ({os.path.basename(path)}:{frame.f_lineno})"
+        frame = frame.f_back
+    return f"{leaf.f_code.co_name} ({os.path.basename(leaf.f_code.co_filename)}:{leaf.f_lineno})"
+
+def _watchdog():
+    global _pending, _captured_for
+    while not _stop.wait(CHECK_INTERVAL):
+        with _lock:
+            if not _last_beat or _pending is not None or _captured_for == _last_beat:
+                continue
+            stalled = time.monotonic() - _last_beat - HEARTBEAT_INTERVAL
+            if stalled < BLOCK_THRESHOLD:
+                continue
+            frame = sys._current_frames().get(_loop_ident)
+            if frame is None:
+                continue
+            _pending = {"site": _site(frame), "stack": traceback.format_stack(frame, limit=STACK_DEPTH)}
+            _captured_for = _last_beat
+
+def _beat(lag: float):
+    global _last_beat, _pending
+    with _lock:
+        pending = _pending
+        _pending = None
+        _last_beat = time.monotonic()
+    _lags.append(lag)
+    metrics.observe("auction_loop_lag_seconds", lag)
+    if lag < BLOCK_THRESHOLD:
+        return
+    site = pending["site"] if pending else "unknown"
+    block = {"ts": int(time.time()), "seconds": round(lag, 3), "site": site, "stack": pending["stack"] if pending else []}
+    _blocks.append(block)
+    _sites_time[site] += lag
+    _sites_count[site] += 1
+    metrics.inc("auction_loop_blocks_total", site=site)
+    metrics.inc("auction_loop_blocked_seconds_total", lag, site=site)
+    logger.warning("event loop blocked for %.3fs at %s", lag, site)
+
+async def _heartbeat():
+    loop = asyncio.get_running_loop()
+    while True:
+        t = loop.time()
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        _beat(max(0.0, loop.time() - t - HEARTBEAT_INTERVAL))
+
+def start():
+    global _task, _thread, _loop_ident, _last_beat
+    if _task is not None and not _task.done():
+        return
+    _loop_ident = threading.get_ident()
+    _last_beat = time.monotonic()
+    _stop.clear()
+    _task = asyncio.create_task(_heartbeat())
+    if _thread is None or not _thread.is_alive():
+        _thread = threading.Thread(target=_watchdog, name="loop-watchdog", daemon=True)
+        _thread.start()
+
+def stop():
+    global _task
+    _stop.set()
+    if _task is not None:
+        _task.cancel()
+        _task = None
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def stats() -> Dict[str, Any]:
+    lags = list(_lags)
+    return {
+        "samples": len(lags),
+        "lag_ms": {"p50": round(_percentile(lags, 0.5) * 1000, 1), "p99": round(_percentile(lags, 0.99) * 1000, 1), "max": round(max(lags) * 1000, 1) if lags else 0.0},
+        "threshold_ms": BLOCK_THRESHOLD * 1000,
+        "blocks": sum(_sites_count.values()),
+        "sites": [{"site": s, "count": _sites_count[s], "seconds": round(t, 3)} for s, t in _sites_time.most_common(10)],
+        "recent": list(_blocks)[-5:],
+    }
+
+def summary() -> str:
+    s = stats()
+    lag = s["lag_ms"]
+    lines = [f"Loop lag (last {s['samples']} beats) ms: p50 {lag['p50']} | p99 {lag['p99']} | max {lag['max']}",
+             f"Blocks over {s['threshold_ms']:g} ms: {s['blocks']}"]
+    if s["sites"]:
+        lines.append("Worst call sites (total blocked time):")
+        for site in s["sites"][:8]:
+            lines.append(f"{site['seconds']:.2f}s x{site['count']}  {site['site']}")
+    if s["recent"]:
+        last = s["recent"][-1]
+        lines.append(f"Last block: {last['seconds']}s at {time.strftime('%H:%M:%S', time.localtime(last['ts']))}")
+        lines.extend(line.rstrip() for line in last["stack"][-4:])
+    return "\n".join(lines)
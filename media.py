@@ -0,0 +1,177 @@
+import json
+import logging
+import os
+import random
+from typing import Dict, Any, List, Optional
+
+from telegram.error import BadRequest
+
+CACHE_FILE = "media_cache.json"
+MEDIA_DIR = "media"
+
+ASSETS: Dict[str, Dict[str, Any]] = {}
+_cache: Dict[str, List[str]] = {}
+_loaded = False
+_stamp = None
+_local: Optional[List[str]] = None
+# set in processes that share the cache file with a writer; they pick up its changes instead of saving their own
+READ_ONLY = False
+
+logger = logging.getLogger(__name__)
+
+def register(name: str, kind: str, file_ids: Optional[List[str]] = None, url: Optional[str] = None):
+    ASSETS[name] = {"kind": kind, "file_ids": list(file_ids or []), "url": url}
+
+def _cache_stamp():
+    try:
+        st = os.stat(CACHE_FILE)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+def _index_local():
+    global _local
+    try:
+        _local = sorted(os.listdir(MEDIA_DIR))
+    except OSError:
+        _local = []
+        logger.warning("Media directory %r not found; assets whose file_ids expire have no local fallback", MEDIA_DIR)
+
+def _load():
+    global _loaded, _cache, _stamp
+    if _local is None:
+        _index_local()
+    if _loaded and not READ_ONLY:
+        return
+    stamp = _cache_stamp()
+    if _loaded and stamp == _stamp:
+        return
+    _loaded = True
+    _stamp = stamp
+    try:
+        with open(CACHE_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            _cache = {k: [x for x in v if isinstance(x, str)] for k, v in data.items() if isinstance(v, list)}
+    except Exception:
+        _cache = {}
+
+def _save():
+    if READ_ONLY:
+        return
+    try:
+        tmp = CACHE_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(_cache, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, CACHE_FILE)
+    except Exception:
+        logger.exception("Failed to save media cache")
+
+def file_ids(name: str) -> List[str]:
+    _load()
+    if name in _cache:
+        return _cache[name]
+    return (ASSETS.get(name) or {}).get("file_ids") or []
+
+def local_path(name: str) -> Optional[str]:
+    _load()
+    for fname in _local:
+        if os.path.splitext(fname)[0] == name or fname.startswith(name + "_"):
+            return os.path.join(MEDIA_DIR, fname)
+    return None
+
+def has(name: str) -> bool:
+    asset = ASSETS.get(name)
+    if not asset:
+        return False
+    return bool(file_ids(name) or asset.get("url") or local_path(name))
+
+def pick(name: str) -> Optional[str]:
+    ids = file_ids(name)
+    if ids:
+        return random.choice(ids)
+    return (ASSETS.get(name) or {}).get("url")
+
+def _message_file_id(kind: str, message) -> Optional[str]:
+    if not message:
+        return None
+    if kind == "video" and getattr(message, "video", None):
+        return message.video.file_id
+    if kind == "photo" and getattr(message, "photo", None):
+        return message.photo[-1].file_id
+    return None
+
+def remember(name: str, message) -> Optional[str]:
+    asset = ASSETS.get(name)
+    if not asset:
+        return None
+    fid = _message_file_id(asset["kind"], message)
+    if not fid:
+        return None
+    ids = list(file_ids(name))
+    if fid not in ids:
+        ids.append(fid)
+        _cache[name] = ids
+        _save()
+    return fid
+
+def invalidate(name: str, file_id: str):
+    ids = [x for x in file_ids(name) if x != file_id]
+    _cache[name] = ids
+    _save()
+
+def _is_file_error(e: Exception) -> bool:
+    err = str(e).lower()
+    return "file" in err or "wrong type" in err or "wrong remote" in err or "failed to get http url content" in err
+
+async def send(bot, chat_id, name: str, **kwargs):
+    asset = ASSETS[name]
+    kind = asset["kind"]
+    method = bot.send_video if kind == "video" else bot.send_photo
+    ref = pick(name)
+    if ref:
+        try:
+            sent = await method(chat_id=chat_id, **{kind: ref}, **kwargs)
+            if ref == asset.get("url"):
+                remember(name, sent)
+            return sent
+        except BadRequest as e:
+            if not _is_file_error(e):
+                raise
+            logger.warning("Media %s rejected by Telegram (%s)", name, e)
+            if ref != asset.get("url"):
+                invalidate(name, ref)
+                if file_ids(name):
+                    return await send(bot, chat_id, name, **kwargs)
+    path = local_path(name)
+    if not path:
+        raise BadRequest(f"No usable media for {name}")
+    with open(path, "rb") as f:
+        sent = await method(chat_id=chat_id, **{kind: f}, **kwargs)
+    remember(name, sent)
+    return sent
+
+async def warm(bot) -> Dict[str, int]:
+    """Drops cached file_ids Telegram no longer accepts. Nothing is sent;
+    assets left without a file_id, url or local file are logged loudly."""
+    _load()
+    report = {}
+    for name, asset in ASSETS.items():
+        valid = []
+        for fid in file_ids(name):
+            try:
+                await bot.get_file(fid)
+                valid.append(fid)
+            except BadRequest as e:
+                if "too big" in str(e).lower():
+                    valid.append(fid)
+                else:
+                    logger.warning("Cached media %s file_id is no longer valid: %s", name, e)
+            except Exception:
+                valid.append(fid)
+        _cache[name] = valid
+        if not valid and not asset.get("url") and not local_path(name):
+            logger.error("Media %s has no valid file_id, url or file in %r; it will not be sent", name, MEDIA_DIR)
+        report[name] = len(valid)
+    _save()
+    return report
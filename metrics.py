@@ -0,0 +1,204 @@
+import functools
+import logging
+import os
+import time
+from typing import Dict, Any, Callable, Optional, Tuple
+
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9108"))
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "auction_handler_seconds": ("histogram", "Time spent in a Telegram update handler"),
+    "auction_handler_errors_total": ("counter", "Exceptions escaping a handler, by type"),
+    "auction_storage_seconds": ("histogram", "Time spent reading or writing the JSON stores"),
+    "auction_storage_bytes_total": ("counter", "Bytes read from or written to the JSON stores"),
+    "auction_storage_errors_total": ("counter", "Storage operations that raised, by type"),
+    "auction_telegram_seconds": ("histogram", "Bot API call latency, excluding rate-limit queueing"),
+    "auction_telegram_errors_total": ("counter", "Bot API calls that raised, by type"),
+    "auction_webhook_updates_total": ("counter", "Updates accepted by the webhook ingress"),
+    "auction_update_wait_seconds": ("histogram", "Time an update waited for its chat and a worker before running"),
+    "auction_shard_updates_total": ("counter", "Updates routed by the front process, by shard"),
+    "auction_shard_restarts_total": ("counter", "Shard worker processes restarted after exiting, by shard"),
+    "auction_recovered_slots_total": ("counter", "Slots handled by startup recovery, by action"),
+    "auction_loop_lag_seconds": ("histogram", "How late the event loop heartbeat woke up"),
+    "auction_loop_blocks_total": ("counter", "Event loop stalls over the threshold, by blocking call site"),
+    "auction_loop_blocked_seconds_total": ("counter", "Time the event loop spent stalled, by blocking call site"),
+}
+
+logger = logging.getLogger(__name__)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+_histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+_counters: Dict[str, Dict[LabelKey, float]] = {}
+_gauges: Dict[str, Tuple[str, Callable[[], Dict[LabelKey, float]]]] = {}
+_runner = None
+
+def _key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def observe(name: str, seconds: float, **labels):
+    series = _histograms.setdefault(name, {})
+    key = _key(labels)
+    h = series.get(key)
+    if h is None:
+        h = series[key] = Histogram()
+    h.observe(seconds)
+
+def inc(name: str, amount: float = 1, **labels):
+    series = _counters.setdefault(name, {})
+    key = _key(labels)
+    series[key] = series.get(key, 0) + amount
+
+def gauge(name: str, help_text: str, fn: Callable[[], Dict[LabelKey, float]]):
+    _gauges[name] = (help_text, fn)
+
+def _file_size(path: Optional[str]) -> int:
+    try:
+        return os.path.getsize(path) if path else 0
+    except OSError:
+        return 0
+
+def track_io(op: str, direction: str, path_fn: Callable[[], str]):
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                inc("auction_storage_errors_total", op=op, exception=type(e).__name__)
+                raise
+            finally:
+                observe("auction_storage_seconds", time.perf_counter() - start, op=op)
+                inc("auction_storage_bytes_total", _file_size(path_fn()), op=op, direction=direction)
+        return wrapper
+    return deco
+
+async def timed_call(endpoint: str, callback, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+        return await callback(*args, **kwargs)
+    except Exception as e:
+        inc("auction_telegram_errors_total", method=endpoint, exception=type(e).__name__)
+        raise
+    finally:
+        observe("auction_telegram_seconds", time.perf_counter() - start, method=endpoint)
+
+def handler_name(handler) -> str:
+    commands = getattr(handler, "commands", None)
+    if commands:
+        return "/" + sorted(commands)[0]
+    return getattr(handler.callback, "__name__", type(handler).__name__)
+
+def instrument_handler(handler):
+    callback = handler.callback
+    if getattr(callback, "_metrics_wrapped", False):
+        return handler
+    name = handler_name(handler)
+
+    @functools.wraps(callback)
+    async def wrapped(update, context):
+        start = time.perf_counter()
+        try:
+            return await callback(update, context)
+        except Exception as e:
+            inc("auction_handler_errors_total", handler=name, exception=type(e).__name__)
+            raise
+        finally:
+            observe("auction_handler_seconds", time.perf_counter() - start, handler=name)
+
+    wrapped._metrics_wrapped = True
+    handler.callback = wrapped
+    return handler
+
+def instrument_app(app):
+    for handlers in app.handlers.values():
+        for handler in handlers:
+            instrument_handler(handler)
+    return app
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+def _fmt(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+def render() -> str:
+    lines = []
+    for name in sorted(_histograms):
+        _, help_text = HELP.get(name, ("histogram", name))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for key, h in sorted(_histograms[name].items()):
+            cumulative = 0
+            for bound, c in zip(BUCKETS, h.counts):
+                cumulative += c
+                lines.append(f"{name}_bucket{_labels(key, ('le', _fmt(bound)))} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(key, ('le', '+Inf'))} {h.count}")
+            lines.append(f"{name}_sum{_labels(key)} {_fmt(h.sum)}")
+            lines.append(f"{name}_count{_labels(key)} {h.count}")
+    for name in sorted(_counters):
+        _, help_text = HELP.get(name, ("counter", name))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for key, v in sorted(_counters[name].items()):
+            lines.append(f"{name}{_labels(key)} {_fmt(v)}")
+    for name in sorted(_gauges):
+        help_text, fn = _gauges[name]
+        try:
+            values = fn()
+        except Exception:
+            logger.exception("gauge %s failed", name)
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for key, v in sorted(values.items()):
+            lines.append(f"{name}{_labels(key)} {_fmt(v)}")
+    return "\n".join(lines) + "\n"
+
+async def start_server(host: str = METRICS_HOST, port: int = METRICS_PORT):
+    global _runner
+    if _runner is not None:
+        return _runner
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(text=render(), content_type="text/plain", charset="utf-8", headers={"X-Prometheus-Format": "0.0.4"})
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        logger.warning("Metrics endpoint not started on %s:%s: %s", host, port, e)
+        await runner.cleanup()
+        return None
+    _runner = runner
+    logger.info("Metrics on http://%s:%s/metrics", host, port)
+    return runner
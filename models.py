@@ -0,0 +1,171 @@
+import base64
+import sys
+from array import array
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+EVENT_KINDS = ("bid", "sold", "unsold")
+AMOUNT_FIELD = {"bid": "amount", "sold": "price", "unsold": "base_price"}
+_NONE = -1
+_COLUMNS = (("ts", "q"), ("kind", "b"), ("player", "i"), ("amount", "d"), ("user_id", "q"), ("buyer_id", "q"))
+
+def _decode_column(code: str, data: Optional[str]) -> array:
+    col = array(code, base64.b64decode(data or ""))
+    if sys.byteorder != "little":
+        col.byteswap()
+    return col
+
+def _player_key(player: Dict[str, Any]) -> str:
+    return str(player.get("pid") or player.get("user_id") or (player.get("username") or "").lower() or player.get("name") or "")
+
+class EventLog:
+    __slots__ = ("ts", "kind", "player", "amount", "user_id", "buyer_id", "players", "_player_index")
+
+    def __init__(self):
+        for name, code in _COLUMNS:
+            setattr(self, name, array(code))
+        self.players: List[Dict[str, Any]] = []
+        self._player_index: Dict[str, int] = {}
+
+    def _intern_player(self, player: Optional[Dict[str, Any]]) -> int:
+        if not player:
+            return _NONE
+        key = _player_key(player)
+        idx = self._player_index.get(key)
+        if idx is None:
+            idx = len(self.players)
+            self.players.append(player)
+            self._player_index[key] = idx
+        return idx
+
+    def append(self, kind: str, ts: int, player: Optional[Dict[str, Any]] = None, amount: Optional[float] = None, user_id: Optional[int] = None, buyer_id: Optional[int] = None) -> None:
+        self.ts.append(int(ts or 0))
+        self.kind.append(EVENT_KINDS.index(kind))
+        self.player.append(self._intern_player(player))
+        self.amount.append(float("nan") if amount is None else float(amount))
+        self.user_id.append(_NONE if user_id is None else int(user_id))
+        self.buyer_id.append(_NONE if buyer_id is None else int(buyer_id))
+
+    def append_log(self, log: Dict[str, Any]) -> bool:
+        kind = log.get("event")
+        if kind not in EVENT_KINDS:
+            return False
+        try:
+            self.append(kind, log.get("ts"), log.get("player"), log.get(AMOUNT_FIELD[kind]), user_id=log.get("user_id") if kind == "bid" else None, buyer_id=log.get("buyer_id") if kind == "sold" else None)
+        except (TypeError, ValueError):
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self.ts)):
+            yield self.row(i)
+
+    def _amount(self, i: int):
+        a = self.amount[i]
+        if a != a:
+            return None
+        return int(a) if a.is_integer() else a
+
+    def row(self, i: int) -> Dict[str, Any]:
+        kind = EVENT_KINDS[self.kind[i]]
+        pidx = self.player[i]
+        out = {"event": kind, "player": self.players[pidx] if pidx != _NONE else None, AMOUNT_FIELD[kind]: self._amount(i), "ts": self.ts[i]}
+        if kind == "bid":
+            out["user_id"] = self.user_id[i] if self.user_id[i] != _NONE else None
+        elif kind == "sold":
+            out["buyer_id"] = self.buyer_id[i] if self.buyer_id[i] != _NONE else None
+        return out
+
+    @classmethod
+    def from_logs(cls, logs: Iterable[Dict[str, Any]]) -> "EventLog":
+        log = cls()
+        for l in logs or []:
+            if l:
+                log.append_log(l)
+        return log
+
+    def to_logs(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        # columns are stored as base64 of the little-endian array bytes so a save
+        # costs a memcpy per column instead of a Python object per event
+        out = {"encoding": "b64", "n": len(self.ts), "players": self.players}
+        for name, _ in _COLUMNS:
+            col = getattr(self, name)
+            if sys.byteorder != "little":
+                col = array(col.typecode, col)
+                col.byteswap()
+            out[name] = base64.b64encode(col.tobytes()).decode("ascii")
+        return out
+
+    @classmethod
+    def from_dict(cls, d: Optional[Dict[str, Any]]) -> "EventLog":
+        log = cls()
+        if not d:
+            return log
+        log.players = list(d.get("players") or [])
+        log._player_index = {_player_key(p): i for i, p in enumerate(log.players)}
+        if d.get("encoding") == "b64":
+            for name, code in _COLUMNS:
+                setattr(log, name, _decode_column(code, d.get(name)))
+        else:
+            log._extend_lists(d)
+        n = len(log.ts)
+        if any(len(getattr(log, name)) != n for name, _ in _COLUMNS):
+            raise ValueError("event log columns have different lengths")
+        return log
+
+    def _extend_lists(self, d: Dict[str, Any]) -> None:
+        self.ts.extend(int(x or 0) for x in d.get("ts") or [])
+        self.kind.extend(int(x) for x in d.get("kind") or [])
+        self.player.extend(_NONE if x is None else int(x) for x in d.get("player") or [])
+        self.amount.extend(float("nan") if x is None else float(x) for x in d.get("amount") or [])
+        self.user_id.extend(_NONE if x is None else int(x) for x in d.get("user_id") or [])
+        self.buyer_id.extend(_NONE if x is None else int(x) for x in d.get("buyer_id") or [])
+
+def stored_length(d: Optional[Dict[str, Any]]) -> int:
+    if not d:
+        return 0
+    if d.get("encoding") == "b64":
+        return int(d.get("n") or 0)
+    return len(d.get("ts") or [])
+
+def iter_run_logs(run: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Yields the run's bid/sold/unsold entries in the same order as
+    run_events, read straight off the stored columns."""
+    for l in run.get("logs") or []:
+        if l and l.get("event") in EVENT_KINDS:
+            yield l
+    d = run.get("events")
+    if not d:
+        return
+    players = d.get("players") or []
+    if d.get("encoding") == "b64":
+        cols = [_decode_column(code, d.get(name)) for name, code in _COLUMNS]
+    else:
+        cols = [d.get(name) or [] for name, _ in _COLUMNS]
+    for ts, kind, pidx, amount, user_id, buyer_id in zip(*cols):
+        kind = EVENT_KINDS[kind]
+        if amount is not None and amount == amount:
+            amount = int(amount) if float(amount).is_integer() else amount
+        else:
+            amount = None
+        out = {"event": kind, "player": players[pidx] if pidx is not None and pidx != _NONE else None, AMOUNT_FIELD[kind]: amount, "ts": int(ts or 0)}
+        if kind == "bid":
+            out["user_id"] = user_id if user_id is not None and user_id != _NONE else None
+        elif kind == "sold":
+            out["buyer_id"] = buyer_id if buyer_id is not None and buyer_id != _NONE else None
+        yield out
+
+def run_events(run: Dict[str, Any]) -> EventLog:
+    log = EventLog.from_dict(run.get("events"))
+    legacy = [l for l in run.get("logs") or [] if l and l.get("event") in EVENT_KINDS]
+    if not legacy:
+        return log
+    merged = EventLog.from_logs(legacy)
+    for row in log:
+        merged.append_log(row)
+    return merged
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Any, List, Tuple
+
+DEFAULT_INTERVAL = 0.005
+LAG_PROBE_INTERVAL = 0.05
+MAX_SECONDS = 120
+MAX_DEPTH = 128
+
+_running = False
+
+def running() -> bool:
+    return _running
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _is_idle(frame) -> bool:
+    return os.path.basename(frame.f_code.co_filename) == "selectors.py"
+
+class _Sampler(threading.Thread):
+    def __init__(self, target_ident: int, interval: float):
+        super().__init__(name="auction-profiler", daemon=True)
+        self.target_ident = target_ident
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.idle = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_ident)
+            if frame is None:
+                continue
+            self.samples += 1
+            if _is_idle(frame):
+                self.idle += 1
+            stack = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[";".join(stack)] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join(timeout=5)
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def _top_functions(stacks: Counter, n: int = 10) -> List[Tuple[str, int]]:
+    own: Counter = Counter()
+    for stack, count in stacks.items():
+        leaf = stack.rsplit(";", 1)[-1]
+        if "(selectors.py:" not in leaf:
+            own[leaf] += count
+    return own.most_common(n)
+
+async def profile(seconds: float, interval: float = DEFAULT_INTERVAL) -> Tuple[str, Dict[str, Any]]:
+    global _running
+    if _running:
+        raise RuntimeError("a profile is already running")
+    seconds = max(1.0, min(float(seconds), MAX_SECONDS))
+    _running = True
+    sampler = _Sampler(threading.get_ident(), interval)
+    lags: List[float] = []
+    started = time.monotonic()
+    sampler.start()
+    try:
+        loop = asyncio.get_running_loop()
+        end = loop.time() + seconds
+        while loop.time() < end:
+            t = loop.time()
+            await asyncio.sleep(LAG_PROBE_INTERVAL)
+            lags.append(max(0.0, loop.time() - t - LAG_PROBE_INTERVAL))
+    finally:
+        sampler.stop()
+        _running = False
+    collapsed = "\n".join(f"{stack} {count}" for stack, count in sampler.stacks.most_common()) + "\n"
+    stats = {
+        "seconds": round(time.monotonic() - started, 2),
+        "interval_ms": interval * 1000,
+        "samples": sampler.samples,
+        "busy_pct": round(100.0 * (sampler.samples - sampler.idle) / sampler.samples, 1) if sampler.samples else 0.0,
+        "lag_ms": {
+            "p50": round(_percentile(lags, 0.5) * 1000, 1),
+            "p99": round(_percentile(lags, 0.99) * 1000, 1),
+            "max": round(max(lags) * 1000, 1) if lags else 0.0,
+            "mean": round(sum(lags) / len(lags) * 1000, 1) if lags else 0.0,
+        },
+        "top": _top_functions(sampler.stacks),
+    }
+    return collapsed, stats
+
+def format_stats(stats: Dict[str, Any]) -> str:
+    lag = stats["lag_ms"]
+    lines = [
+        f"Profile: {stats['seconds']}s, {stats['samples']} samples every {stats['interval_ms']:g} ms",
+        f"Event loop busy: {stats['busy_pct']}%",
+        f"Loop lag ms: p50 {lag['p50']} | p99 {lag['p99']} | max {lag['max']} | mean {lag['mean']}",
+    ]
+    if stats["top"]:
+        lines.append("Top functions (own samples):")
+        for name, count in stats["top"][:8]:
+            lines.append(f"{count} {name}")
+    return "\n".join(lines)
@@ -0,0 +1,413 @@
+import argparse
+import asyncio
+import copy
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import types
+import zlib
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SHARD_WORKERS = int(os.environ.get("SHARD_WORKERS", "1"))
+SHARD_INDEX = int(os.environ["SHARD_INDEX"]) if os.environ.get("SHARD_INDEX") else None
+SHARED_DB_PATH = os.environ.get("AUCTION_SHARED_DB_PATH")
+USER_INDEX_PATH = os.environ.get("AUCTION_USER_INDEX_PATH")
+SHARD_QUEUE_SIZE = int(os.environ.get("SHARD_QUEUE_SIZE", "1000"))
+HOME_SHARD = 0
+PER_CHAT_KEYS = ("auction_sessions", "auction_history")
+REGISTRY_KEYS = ("tournaments",)
+USER_INDEX_KEYS = ("owners", "username_to_owner")
+SHARD_FILE = "auction_shard{}.json"
+USER_INDEX_FILE = "auction_users.json"
+BOT_GLOBAL_RATE = 30.0
+BOT_GLOBAL_BURST = 30
+
+logger = logging.getLogger(__name__)
+
+def shard_for(chat_id, workers: int) -> int:
+    return zlib.crc32(str(chat_id).encode()) % max(1, workers)
+
+def enabled() -> bool:
+    return SHARD_INDEX is not None
+
+def is_home() -> bool:
+    return SHARD_INDEX is None or SHARD_INDEX == HOME_SHARD
+
+def shard_db_path(shared_path: str, index: int) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(shared_path)), SHARD_FILE.format(index))
+
+def user_index_path(shared_path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(shared_path)), USER_INDEX_FILE)
+
+def _read_json(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f) or {}
+    except Exception:
+        return {}
+
+def _write_json(path: str, data: Dict[str, Any]):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+# Shared store. Registrations live in the main data file, which only the home
+# worker writes; the owners index is written by every worker under a file lock.
+
+_cache: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+
+def _cached(path: Optional[str]) -> Dict[str, Any]:
+    if not path:
+        return {}
+    try:
+        st = os.stat(path)
+    except OSError:
+        return {}
+    stamp = (st.st_mtime_ns, st.st_size)
+    hit = _cache.get(path)
+    if hit and hit[0] == stamp:
+        return hit[1]
+    data = _read_json(path)
+    _cache[path] = (stamp, data)
+    return data
+
+def attach_shared(data: Dict[str, Any]) -> Dict[str, Any]:
+    registry = _cached(SHARED_DB_PATH)
+    for key in REGISTRY_KEYS:
+        data[key] = registry.get(key, {})
+    index = _cached(USER_INDEX_PATH)
+    for key in USER_INDEX_KEYS:
+        data[key] = copy.deepcopy(index.get(key, {}))
+    return data
+
+def detach_shared(data: Dict[str, Any]) -> Dict[str, Any]:
+    data = dict(data)
+    for key in REGISTRY_KEYS:
+        data.pop(key, None)
+    base = _cached(USER_INDEX_PATH)
+    changes = {}
+    for key in USER_INDEX_KEYS:
+        value = data.pop(key, None) or {}
+        current = base.get(key, {})
+        diff = {k: v for k, v in value.items() if current.get(k) != v}
+        if diff:
+            changes[key] = diff
+    if changes and USER_INDEX_PATH:
+        _merge_user_index(changes)
+    return data
+
+def _merge_user_index(changes: Dict[str, Dict[str, Any]]):
+    with open(USER_INDEX_PATH + ".lock", "a") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            index = _read_json(USER_INDEX_PATH)
+            for key, diff in changes.items():
+                index.setdefault(key, {}).update(diff)
+            _write_json(USER_INDEX_PATH, index)
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+def chat_history(chat_id) -> List[Dict[str, Any]]:
+    if enabled():
+        db = _read_json(shard_db_path(SHARED_DB_PATH, shard_for(chat_id, SHARD_WORKERS)))
+    else:
+        import auction
+        db = auction.load_db()
+    return db.get("auction_history", {}).get(str(chat_id), []) or []
+
+def prepare_stores(shared_path: str, workers: int):
+    """Partitions sessions and history into one file per shard, re-splitting
+    when the worker count changed and seeding from the single-process file on
+    first start."""
+    existing = _shard_files(shared_path)
+    sources = [_read_json(p) for p in existing]
+    index_path = user_index_path(shared_path)
+    if not os.path.exists(index_path):
+        index = {key: {} for key in USER_INDEX_KEYS}
+        for src in sources or [_read_json(shared_path)]:
+            for key in USER_INDEX_KEYS:
+                index[key].update(src.get(key) or {})
+        _write_json(index_path, index)
+    if existing and len(existing) == workers and all((s.get("shard") or {}).get("workers") == workers for s in sources):
+        return
+    if not existing:
+        sources = [_read_json(shared_path)]
+    _write_partition(shared_path, sources, workers, existing)
+
+def _write_partition(shared_path: str, sources: List[Dict[str, Any]], workers: int, existing: List[str]):
+    shards = [{key: {} for key in PER_CHAT_KEYS} for _ in range(workers)]
+    moved = 0
+    for src in sources:
+        for key in PER_CHAT_KEYS:
+            for chat_id, value in (src.get(key) or {}).items():
+                shards[shard_for(chat_id, workers)][key][chat_id] = value
+                moved += 1
+    # write the whole new partition before touching the old files; a crash midway
+    # leaves at worst duplicated chats, which the next start re-partitions
+    staged = []
+    for i, shard in enumerate(shards):
+        shard["shard"] = {"index": i, "workers": workers}
+        path = shard_db_path(shared_path, i)
+        with open(path + ".new", "w", encoding="utf-8") as f:
+            json.dump(shard, f, ensure_ascii=False, indent=2)
+        staged.append(path)
+    for path in staged:
+        os.replace(path + ".new", path)
+    for path in existing:
+        if path not in staged:
+            os.remove(path)
+    logger.info("Partitioned %s chat records into %s shards", moved, workers)
+
+def _shard_files(shared_path: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(shared_path)), SHARD_FILE.format("*"))))
+
+def with_shards(data: Dict[str, Any], shared_path: str) -> Dict[str, Any]:
+    """The single-process view of the data: the main file with sessions,
+    history and the owners index taken from the shard stores. Used for backups."""
+    data = dict(data)
+    for key in PER_CHAT_KEYS:
+        data[key] = {}
+    for path in _shard_files(shared_path):
+        src = _read_json(path)
+        for key in PER_CHAT_KEYS:
+            data[key].update(src.get(key) or {})
+    index = _read_json(user_index_path(shared_path))
+    for key in USER_INDEX_KEYS:
+        data[key] = index.get(key) or {}
+    return data
+
+def restore_stores(shared_path: str, data: Dict[str, Any]):
+    _write_partition(shared_path, [data], SHARD_WORKERS, _shard_files(shared_path))
+    index_path = user_index_path(shared_path)
+    with open(index_path + ".lock", "a") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            _write_json(index_path, {key: data.get(key) or {} for key in USER_INDEX_KEYS})
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+def merge_stores(shared_path: str) -> int:
+    existing = _shard_files(shared_path)
+    data = _read_json(shared_path)
+    for path in existing:
+        src = _read_json(path)
+        for key in PER_CHAT_KEYS:
+            data.setdefault(key, {}).update(src.get(key) or {})
+    index = _read_json(user_index_path(shared_path))
+    for key in USER_INDEX_KEYS:
+        data.setdefault(key, {}).update(index.get(key) or {})
+    _write_json(shared_path, data)
+    for path in existing:
+        os.remove(path)
+    return len(existing)
+
+# Worker processes
+
+def _worker_main(index: int, workers: int, shared_path: str, inbox, metrics_port: int):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    os.environ.update({
+        "SHARD_INDEX": str(index),
+        "SHARD_WORKERS": str(workers),
+        "AUCTION_DB_PATH": shard_db_path(shared_path, index),
+        "AUCTION_SHARED_DB_PATH": shared_path,
+        "AUCTION_USER_INDEX_PATH": user_index_path(shared_path),
+        "METRICS_PORT": str(metrics_port),
+        # the Bot API limit is per token, so the workers split it between them
+        "GATEWAY_GLOBAL_RATE": str(BOT_GLOBAL_RATE / workers),
+        "GATEWAY_GLOBAL_BURST": str(max(1, BOT_GLOBAL_BURST // workers)),
+    })
+    import gaming
+    asyncio.run(_worker_loop(gaming.build_app(), inbox))
+
+async def _worker_loop(app, inbox):
+    from telegram import Update
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+
+    async def enqueue(data):
+        await app.update_queue.put(Update.de_json(data, app.bot))
+
+    def pump():
+        while True:
+            data = inbox.get()
+            if data is None:
+                loop.call_soon_threadsafe(stop.set)
+                return
+            # blocks while the worker's own update queue is full, which backs up the inbox
+            asyncio.run_coroutine_threadsafe(enqueue(data), loop).result()
+
+    await app.initialize()
+    if app.post_init:
+        await app.post_init(app)
+    await app.start()
+    threading.Thread(target=pump, name="shard-inbox", daemon=True).start()
+    logger.info("Shard worker %s ready", os.environ.get("SHARD_INDEX"))
+    try:
+        await stop.wait()
+    finally:
+        await app.stop()
+        if app.post_stop:
+            await app.post_stop(app)
+        await app.shutdown()
+        if app.post_shutdown:
+            await app.post_shutdown(app)
+
+# Front process
+
+def route(app, update, workers: int) -> int:
+    """Auction traffic goes to the shard owning the chat; everything else
+    (registrations, admin commands, private chats) to the home shard, which is
+    the only writer of the shared data file."""
+    for handlers in app.handlers.values():
+        for handler in handlers:
+            check = handler.check_update(update)
+            if check is None or check is False:
+                continue
+            chat = update.effective_chat
+            if handler.callback.__module__ == "auction" and chat is not None:
+                return shard_for(chat.id, workers)
+            return HOME_SHARD
+    return HOME_SHARD
+
+class Front:
+    def __init__(self, build_app, workers: int):
+        import gaming
+        self.workers = max(1, workers)
+        self.shared_path = os.path.abspath(gaming.DATA_FILE)
+        self.app = build_app()
+        self.bot = self.app.bot
+        self.update_queue: asyncio.Queue = asyncio.Queue(maxsize=SHARD_QUEUE_SIZE)
+        self.running = False
+        self._ctx = multiprocessing.get_context("spawn")
+        self.inboxes = [self._ctx.Queue(maxsize=SHARD_QUEUE_SIZE) for _ in range(self.workers)]
+        self.procs: List[Optional[multiprocessing.Process]] = [None] * self.workers
+        self.routed = [0] * self.workers
+
+    def _spawn(self, index: int):
+        import metrics
+        p = self._ctx.Process(target=_worker_main, name=f"auction-shard-{index}",
+                              args=(index, self.workers, self.shared_path, self.inboxes[index], metrics.METRICS_PORT + 1 + index))
+        p.start()
+        self.procs[index] = p
+
+    async def _supervise(self):
+        import metrics
+        while self.running:
+            await asyncio.sleep(1.0)
+            for i, p in enumerate(self.procs):
+                if self.running and p is not None and not p.is_alive():
+                    logger.error("Shard worker %s exited with %s, restarting", i, p.exitcode)
+                    metrics.inc("auction_shard_restarts_total", shard=i)
+                    self._spawn(i)
+
+    async def _route_updates(self):
+        import metrics
+        while True:
+            update = await self.update_queue.get()
+            try:
+                target = route(self.app, update, self.workers)
+            except Exception:
+                logger.exception("Routing failed, sending update to the home shard")
+                target = HOME_SHARD
+            data = update.to_dict()
+            while True:
+                try:
+                    self.inboxes[target].put_nowait(data)
+                    break
+                except queue.Full:
+                    await asyncio.sleep(0.01)
+            self.routed[target] += 1
+            metrics.inc("auction_shard_updates_total", shard=target)
+
+    async def serve(self, url: Optional[str] = None, stop_event: Optional[asyncio.Event] = None):
+        import metrics
+        import webhook
+        from telegram import Update
+        from telegram.ext import Updater
+        prepare_stores(self.shared_path, self.workers)
+        await self.bot.initialize()
+        self.running = True
+        for i in range(self.workers):
+            self._spawn(i)
+        metrics.gauge("auction_shard_backlog", "Updates waiting in each shard inbox",
+                      lambda: {(("shard", str(i)),): _qsize(q) for i, q in enumerate(self.inboxes)})
+        await metrics.start_server()
+        tasks = [asyncio.create_task(self._route_updates()), asyncio.create_task(self._supervise())]
+        server = updater = None
+        if url:
+            server = webhook.WebhookServer(types.SimpleNamespace(bot=self.bot, update_queue=self.update_queue, running=True))
+            await server.start()
+            await self.bot.set_webhook(url=url, secret_token=server.secret, max_connections=server.concurrency, allowed_updates=Update.ALL_TYPES)
+        else:
+            updater = Updater(self.bot, self.update_queue)
+            await updater.initialize()
+            await updater.start_polling(allowed_updates=Update.ALL_TYPES)
+        logger.info("Front routing %s mode updates to %s shard workers", "webhook" if url else "polling", self.workers)
+        if stop_event is None:
+            stop_event = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.add_signal_handler(sig, stop_event.set)
+                except (NotImplementedError, RuntimeError):
+                    pass
+        try:
+            await stop_event.wait()
+        finally:
+            self.running = False
+            if updater:
+                await updater.stop()
+                await updater.shutdown()
+            if server:
+                await server.stop()
+            for t in tasks:
+                t.cancel()
+            for inbox in self.inboxes:
+                inbox.put(None)
+            await asyncio.to_thread(self._join)
+            await self.bot.shutdown()
+
+    def _join(self):
+        for p in self.procs:
+            if p is None:
+                continue
+            p.join(timeout=30)
+            if p.is_alive():
+                p.terminate()
+
+def _qsize(q) -> int:
+    try:
+        return q.qsize()
+    except NotImplementedError:
+        return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the bot as a front process routing updates to shard workers by chat_id")
+    parser.add_argument("--workers", type=int, default=SHARD_WORKERS if SHARD_WORKERS > 1 else (os.cpu_count() or 2))
+    parser.add_argument("--webhook-url", default=os.environ.get("WEBHOOK_URL"))
+    parser.add_argument("--merge", action="store_true", help="fold shard files back into the main data file and exit")
+    args = parser.parse_args()
+    import gaming
+    if args.merge:
+        n = merge_stores(gaming.DATA_FILE)
+        print(f"Merged {n} shard files into {gaming.DATA_FILE}")
+        return
+    asyncio.run(Front(gaming.build_app, args.workers).serve(args.webhook_url))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import asyncio
+import contextvars
+import logging
+from typing import Dict, Any
+
+IDLE_TIMEOUT = 60
+
+logger = logging.getLogger(__name__)
+
+_queues: Dict[Any, asyncio.Queue] = {}
+_workers: Dict[Any, asyncio.Task] = {}
+_stats = {"submitted": 0, "done": 0, "failed": 0}
+
+def submit(chat_id, fn, *args, **kwargs) -> asyncio.Future:
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+    q = _queues.get(chat_id)
+    if q is None:
+        q = asyncio.Queue()
+        _queues[chat_id] = q
+    q.put_nowait((fn, args, kwargs, fut, contextvars.copy_context()))
+    _stats["submitted"] += 1
+    w = _workers.get(chat_id)
+    if w is None or w.done():
+        _workers[chat_id] = asyncio.create_task(_worker(chat_id, q))
+    return fut
+
+async def _worker(chat_id, q: asyncio.Queue):
+    while True:
+        try:
+            fn, args, kwargs, fut, ctx = await asyncio.wait_for(q.get(), IDLE_TIMEOUT)
+        except asyncio.TimeoutError:
+            if q.empty():
+                _queues.pop(chat_id, None)
+                _workers.pop(chat_id, None)
+                return
+            continue
+        try:
+            result = await ctx.run(asyncio.ensure_future, fn(*args, **kwargs))
+            _stats["done"] += 1
+            if not fut.done():
+                fut.set_result(result)
+        except Exception as e:
+            _stats["failed"] += 1
+            logger.exception("side effect %s for chat %s failed", getattr(fn, "__name__", fn), chat_id)
+            if not fut.done():
+                fut.set_exception(e)
+                fut.exception()
+
+def pending(chat_id=None) -> int:
+    if chat_id is not None:
+        q = _queues.get(chat_id)
+        return q.qsize() if q else 0
+    return sum(q.qsize() for q in _queues.values())
+
+def stats() -> Dict[str, Any]:
+    out = dict(_stats)
+    out["pending"] = pending()
+    out["chats"] = len(_queues)
+    return out
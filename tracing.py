@@ -0,0 +1,156 @@
+import functools
+import inspect
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional
+
+import metrics
+
+SLOW_SECONDS = float(os.environ.get("TRACE_SLOW_SECONDS", "1.0"))
+MAX_SPANS = 500
+LOGGED_SPANS = 40
+BREAKDOWN_KINDS = ("disk", "telegram", "queue")
+
+logger = logging.getLogger(__name__)
+
+class Span:
+    __slots__ = ("name", "kind", "trace", "start", "end", "children")
+
+    def __init__(self, name: str, kind: str, trace: "Trace"):
+        self.name = name
+        self.kind = kind
+        self.trace = trace
+        self.start = time.perf_counter()
+        self.end = None
+        self.children: List["Span"] = []
+
+    def seconds(self, until: Optional[float] = None) -> float:
+        end = self.end or time.perf_counter()
+        if until is not None:
+            end = min(end, until)
+        return max(0.0, end - self.start)
+
+class Trace:
+    __slots__ = ("trace_id", "root", "spans", "closed", "update_id", "chat_id")
+
+    def __init__(self, name: str, update_id=None, chat_id=None):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.spans = 0
+        self.closed = False
+        self.update_id = update_id
+        self.chat_id = chat_id
+        self.root = Span(name, "handler", self)
+
+_current: ContextVar[Optional[Span]] = ContextVar("auction_trace_span", default=None)
+
+def current_trace_id() -> Optional[str]:
+    s = _current.get()
+    return s.trace.trace_id if s is not None else None
+
+@contextmanager
+def span(name: str, kind: str = "call"):
+    parent = _current.get()
+    if parent is None or parent.trace.closed or parent.trace.spans >= MAX_SPANS:
+        yield None
+        return
+    s = Span(name, kind, parent.trace)
+    parent.trace.spans += 1
+    parent.children.append(s)
+    token = _current.set(s)
+    try:
+        yield s
+    finally:
+        s.end = time.perf_counter()
+        _current.reset(token)
+
+def add(name: str, kind: str, seconds: float):
+    parent = _current.get()
+    if parent is None or parent.trace.closed or parent.trace.spans >= MAX_SPANS:
+        return
+    s = Span(name, kind, parent.trace)
+    s.end = s.start
+    s.start -= seconds
+    parent.trace.spans += 1
+    parent.children.append(s)
+
+def traced(name: Optional[str] = None, kind: str = "call"):
+    def deco(fn):
+        label = name or fn.__name__
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def awrapper(*args, **kwargs):
+                if _current.get() is None:
+                    return await fn(*args, **kwargs)
+                with span(label, kind):
+                    return await fn(*args, **kwargs)
+            return awrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            with span(label, kind):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+def _kind_totals(s: Span, totals: Dict[str, float], until: float):
+    # spans started by background tasks can outlive the handler; only count what overlapped it
+    for c in s.children:
+        if c.kind in BREAKDOWN_KINDS:
+            totals[c.kind] = totals.get(c.kind, 0.0) + c.seconds(until)
+        else:
+            _kind_totals(c, totals, until)
+
+def _flatten(s: Span, depth: int, out: List[Dict[str, Any]]):
+    for c in s.children:
+        if len(out) >= LOGGED_SPANS:
+            return
+        out.append({"name": c.name, "kind": c.kind, "depth": depth, "start_ms": round((c.start - s.trace.root.start) * 1000, 1), "ms": round(c.seconds() * 1000, 1)})
+        _flatten(c, depth + 1, out)
+
+def report(trace: Trace) -> Dict[str, Any]:
+    total = trace.root.seconds()
+    totals: Dict[str, float] = {}
+    _kind_totals(trace.root, totals, trace.root.end)
+    breakdown = {k + "_ms": round(totals.get(k, 0.0) * 1000, 1) for k in BREAKDOWN_KINDS}
+    breakdown["cpu_ms"] = round(max(0.0, total - sum(totals.values())) * 1000, 1)
+    spans: List[Dict[str, Any]] = []
+    _flatten(trace.root, 0, spans)
+    return {"trace_id": trace.trace_id, "handler": trace.root.name, "update_id": trace.update_id, "chat_id": trace.chat_id,
+            "total_ms": round(total * 1000, 1), **breakdown, "span_count": trace.spans, "spans": spans}
+
+def instrument_handler(handler):
+    callback = handler.callback
+    if getattr(callback, "_trace_wrapped", False):
+        return handler
+    name = metrics.handler_name(handler)
+
+    @functools.wraps(callback)
+    async def wrapped(update, context):
+        chat = getattr(update, "effective_chat", None)
+        trace = Trace(name, getattr(update, "update_id", None), getattr(chat, "id", None))
+        token = _current.set(trace.root)
+        try:
+            return await callback(update, context)
+        finally:
+            trace.root.end = time.perf_counter()
+            trace.closed = True
+            _current.reset(token)
+            if trace.root.seconds() >= SLOW_SECONDS:
+                logger.warning("slow handler %s", json.dumps(report(trace), ensure_ascii=False))
+
+    wrapped._trace_wrapped = True
+    handler.callback = wrapped
+    return handler
+
+def instrument_app(app):
+    for handlers in app.handlers.values():
+        for handler in handlers:
+            instrument_handler(handler)
+    return app
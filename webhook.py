@@ -0,0 +1,118 @@
+import asyncio
+import hmac
+import logging
+import os
+import secrets
+import signal
+import time
+from typing import Optional
+
+from aiohttp import web
+from telegram import Update
+
+import metrics
+
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL")
+WEBHOOK_LISTEN = os.environ.get("WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "/telegram")
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET")
+WEBHOOK_CONCURRENCY = int(os.environ.get("WEBHOOK_CONCURRENCY", "40"))
+ACQUIRE_TIMEOUT = 5.0
+
+logger = logging.getLogger(__name__)
+
+class WebhookServer:
+    def __init__(self, app, secret: Optional[str] = WEBHOOK_SECRET, concurrency: int = WEBHOOK_CONCURRENCY, path: str = WEBHOOK_PATH):
+        self.app = app
+        # without a secret anyone who can reach the URL could post forged updates
+        self.secret = secret or secrets.token_urlsafe(32)
+        self.path = path
+        self.concurrency = max(1, concurrency)
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._runner = None
+        self.stats = {"received": 0, "rejected": 0, "invalid": 0, "busy": 0, "last_update_at": None}
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if not hmac.compare_digest(token, self.secret):
+            self.stats["rejected"] += 1
+            return web.Response(status=403)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), ACQUIRE_TIMEOUT)
+        except asyncio.TimeoutError:
+            # Telegram redelivers on non-2xx, so shed load instead of queueing without bound
+            self.stats["busy"] += 1
+            return web.Response(status=503)
+        try:
+            try:
+                data = await request.json()
+                update = Update.de_json(data, self.app.bot)
+            except Exception:
+                self.stats["invalid"] += 1
+                return web.Response(status=400)
+            try:
+                await asyncio.wait_for(self.app.update_queue.put(update), ACQUIRE_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.stats["busy"] += 1
+                return web.Response(status=503)
+            self.stats["received"] += 1
+            self.stats["last_update_at"] = time.time()
+            metrics.inc("auction_webhook_updates_total")
+            return web.Response(status=200)
+        finally:
+            self._slots.release()
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        body = {"ok": bool(self.app.running), "mode": "webhook", "pending_updates": self.app.update_queue.qsize(), **self.stats}
+        return web.json_response(body, status=200 if self.app.running else 503)
+
+    async def start(self, host: str = WEBHOOK_LISTEN, port: int = WEBHOOK_PORT) -> int:
+        web_app = web.Application(client_max_size=1024 * 1024)
+        web_app.router.add_post(self.path, self.handle_update)
+        web_app.router.add_get("/healthz", self.handle_health)
+        self._runner = web.AppRunner(web_app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        return site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+async def serve(app, url: str = None, host: str = WEBHOOK_LISTEN, port: int = WEBHOOK_PORT, stop_event: Optional[asyncio.Event] = None):
+    url = url or WEBHOOK_URL
+    if not url:
+        raise ValueError("WEBHOOK_URL is not set")
+    await app.initialize()
+    if app.post_init:
+        await app.post_init(app)
+    server = WebhookServer(app)
+    await app.start()
+    try:
+        bound = await server.start(host, port)
+        await app.bot.set_webhook(url=url, secret_token=server.secret, max_connections=server.concurrency, allowed_updates=Update.ALL_TYPES)
+        logger.info("Webhook mode: listening on %s:%s%s for %s", host, bound, server.path, url)
+        if stop_event is None:
+            stop_event = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.add_signal_handler(sig, stop_event.set)
+                except (NotImplementedError, RuntimeError):
+                    pass
+        await stop_event.wait()
+    finally:
+        await server.stop()
+        if app.running:
+            await app.stop()
+        if app.post_stop:
+            await app.post_stop(app)
+        await app.shutdown()
+        if app.post_shutdown:
+            await app.post_shutdown(app)
+
+def run(app, url: str = None):
+    asyncio.run(serve(app, url))